@@ -1,451 +1,178 @@
 import sys
-import pyodbc
-import logging
+import atexit
+import argparse
+import urllib.request
 from datetime import datetime
-from flask import Flask, request
 from threading import Thread
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QPushButton, QTableWidget, QTableWidgetItem, QTabWidget,
                              QLineEdit, QComboBox, QFormLayout, QMessageBox, QGroupBox,
                              QTextEdit, QSplitter, QHeaderView)
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt6.QtGui import QColor, QFont, QIcon
 
-# Setup logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    filename='rfid_server.log',
-    filemode='a'
-)
-logger = logging.getLogger('rfid_server')
-
-# Console handler for debugging
-console = logging.StreamHandler()
-console.setLevel(logging.DEBUG)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console.setFormatter(formatter)
-logger.addHandler(console)
-
-# Database connection string
-CONNECTION_STRING = (
-    'DRIVER={ODBC Driver 18 for SQL Server};'
-    'SERVER=IHEB;'
-    'DATABASE=rfid;'
-    'Trusted_Connection=Yes;'
-    'Encrypt=no;'
-)
-
-# Flask server setup
-app = Flask(__name__)
-
-
-# Custom signal class for communication between Flask and PyQt
-class ServerSignals(QObject):
-    new_access_event = pyqtSignal(str, str, str, str)
-    log_message = pyqtSignal(str)
+from models import rfid_cache
+from models.change_feed import CHANGE_SAFETY_WINDOW
+from models.event_bus import EventBus
+from rfid_server import (app, logger, signals, DatabaseManager, check_database,
+                         start_background_workers, shutdown_background_workers)
+
+# Server events waiting for the GUI; past this the oldest are dropped
+UI_EVENT_BUFFER = 2000
+# How often the GUI drains the buffer, and how much it takes per tick
+UI_DRAIN_INTERVAL_MS = 200
+UI_DRAIN_BATCH = 200
+# Rows kept in the live access log and lines in the debug log
+ACCESS_LOG_MAX_ROWS = 500
+DEBUG_LOG_MAX_LINES = 1000
+# Refreshes only fetch what changed, so they can run often
+REFRESH_INTERVAL_MS = 5000
+# Events shown on the first load, and fetched at most per refresh after that
+INITIAL_EVENTS = 50
+NEW_EVENTS_PER_REFRESH = 500
+# Event ids below the last one read again, an insert can commit after a later id
+EVENT_SAFETY_WINDOW = 200
+
+
+def fetch_server_status(server_url):
+    if not server_url:
+        # Embedded development server, running as long as we are
+        return True
+    try:
+        with urllib.request.urlopen(f"{server_url}/status", timeout=2) as response:
+            return response.read().decode().strip() == "running"
+    except Exception as e:
+        logger.warning(f"RFID server at {server_url} unreachable: {str(e)}")
+        return False
 
 
-# Global signal instance
-signals = ServerSignals()
+class RefreshThread(QThread):
+    """Runs the periodic refresh queries away from the GUI thread.
 
+    Only what changed since the last run is fetched: events after
+    ``last_event_id`` and employees changed since ``employee_version``.
+    Both keysets are re-read a little below the last id, and what was
+    already handed back is dropped by id.
+    The result is handed back with ``refreshed`` and applied by the GUI.
+    """
 
-class DatabaseManager:
-    def __init__(self):
-        try:
-            self.conn = pyodbc.connect(CONNECTION_STRING)
-            self.cursor = self.conn.cursor()
-            logger.info("Database connection established")
-            signals.log_message.emit("Database connection established")
-        except Exception as e:
-            logger.error(f"Database connection error: {str(e)}")
-            signals.log_message.emit(f"Database error: {str(e)}")
-            self.conn = None
-            self.cursor = None
+    refreshed = pyqtSignal(object)
+    error_occurred = pyqtSignal(str)
 
-    def reconnect(self):
+    def __init__(self, server_url):
+        super().__init__()
+        self.server_url = server_url
+        self.last_event_id = None
+        self.employee_version = None
+        # Ids inside the re-read windows that the GUI already has
+        self.event_ids = set()
+        self.change_versions = set()
+        # Own connection, the GUI thread keeps using its DatabaseManager
+        self.db_manager = None
+
+    def run(self):
         try:
-            if self.conn:
-                self.conn.close()
-            self.conn = pyodbc.connect(CONNECTION_STRING)
-            self.cursor = self.conn.cursor()
-            logger.info("Database reconnection successful")
-            signals.log_message.emit("Database reconnection successful")
-            return True
+            self.refreshed.emit(self.fetch())
         except Exception as e:
-            logger.error(f"Database reconnection error: {str(e)}")
-            signals.log_message.emit(f"Database reconnection error: {str(e)}")
-            self.conn = None
-            self.cursor = None
-            return False
-
-    def verify_rfid(self, rfid_value):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return False
-
-            logger.debug(f"Verifying RFID: {rfid_value}")
-            signals.log_message.emit(f"Verifying RFID: {rfid_value}")
-
-            # Query to check if RFID exists in the Employe table
-            query = "SELECT * FROM Employe WHERE rfid = ?"
-            self.cursor.execute(query, (rfid_value,))
-            result = self.cursor.fetchone()
-
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            if result:
-                employee_name = f"{result.prenom} {result.nom}"
-                logger.info(f"RFID {rfid_value} authorized - Employee: {employee_name}")
-                signals.log_message.emit(f"Access granted for {employee_name}")
-
-                # Emit signal for UI update
-                signals.new_access_event.emit(
-                    current_time,
-                    rfid_value,
-                    employee_name,
-                    "ACCESS GRANTED"
-                )
-
-                # Log access event
-                self.record_access_event(rfid_value, "AUTHORIZED", "Door access granted")
-                return True
+            logger.error(f"Error refreshing data: {str(e)}")
+            self.error_occurred.emit(f"Error refreshing data: {str(e)}")
+
+    def fetch(self):
+        if self.db_manager is None:
+            self.db_manager = DatabaseManager()
+        db_manager = self.db_manager
+
+        result = {
+            'server_running': fetch_server_status(self.server_url),
+            'db_connected': bool(db_manager.conn),
+            'initial_events': self.last_event_id is None,
+        }
+
+        if self.last_event_id is None:
+            events = db_manager.get_recent_events(INITIAL_EVENTS)
+        else:
+            after_id = max(0, self.last_event_id - EVENT_SAFETY_WINDOW)
+            events = db_manager.get_recent_events(NEW_EVENTS_PER_REFRESH, after_id)
+            events = [event for event in events if event['id'] not in self.event_ids]
+        # Oldest first, the table grows downwards
+        result['events'] = events[::-1]
+        if events:
+            self.last_event_id = max(self.last_event_id or 0, max(event['id'] for event in events))
+            floor = self.last_event_id - EVENT_SAFETY_WINDOW
+            self.event_ids = {event_id for event_id in self.event_ids if event_id > floor}
+            self.event_ids.update(event['id'] for event in events if event['id'] > floor)
+
+        reload_lists = self.employee_version is None
+        feed = None
+        if self.employee_version is not None:
+            feed = db_manager.get_changes(self.employee_version)
+        if feed is not None and not feed['reset'] and not feed['more']:
+            feed['changes'] = [change for change in feed['changes'] if change['version'] not in self.change_versions]
+            tables = {change['table'] for change in feed['changes']}
+            # Team or position renames touch many rows, reload those fully
+            if tables <= {'Employe'}:
+                changed = [change['key'] for change in feed['changes'] if change['op'] != 'D']
+                result['employee_changes'] = feed['changes']
+                result['employees'] = db_manager.get_all_employees(changed) if changed else []
+                result['employee_version'] = feed['version']
+            reload_lists = bool(tables - {'Employe'})
+        if 'employee_changes' in result:
+            self.change_versions.update(change['version'] for change in feed['changes'])
+        else:
+            version = db_manager.get_change_version()
+            if version is None:
+                # Database unreachable: keep the lists shown and the feed position
+                reload_lists = False
             else:
-                logger.warning(f"RFID {rfid_value} unauthorized - No matching employee")
-                signals.log_message.emit(f"Access denied for RFID: {rfid_value}")
-
-                # Emit signal for UI update
-                signals.new_access_event.emit(
-                    current_time,
-                    rfid_value,
-                    "Unknown",
-                    "ACCESS DENIED"
-                )
-
-                # Log unauthorized attempt
-                self.record_access_event(rfid_value, "UNAUTHORIZED", "Unauthorized access attempt")
-                return False
-
-        except Exception as e:
-            logger.error(f"Database error during RFID verification: {str(e)}")
-            signals.log_message.emit(f"Database error: {str(e)}")
-            return False
-
-    def record_access_event(self, rfid, event_type, description):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return False
-
-            # Get current date info for Date table
-            current_date = datetime.now().date()
-            current_day = current_date.day
-            current_month = current_date.month
-            current_year = current_date.year
-            day_of_week = current_date.strftime("%A")
-
-            # Check if date exists in Date table, if not, insert it
-            self.cursor.execute('''
-                IF NOT EXISTS (SELECT * FROM Date WHERE date_complete = ?)
-                INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                VALUES (?, ?, ?, ?, ?, 0, '')
-            ''', (current_date, current_date, current_day, current_month, current_year, day_of_week))
-
-            # Get the date_id for the current date
-            self.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-            date_row = self.cursor.fetchone()
-            date_id = date_row.date_id if date_row else None
-
-            # Record in Evenement table
-            if rfid and date_id:
-                # Check if this RFID exists in Employe table
-                self.cursor.execute("SELECT * FROM Employe WHERE rfid = ?", (rfid,))
-                employee = self.cursor.fetchone()
-
-                if employee:
-                    # Valid employee - record normal event
-                    self.cursor.execute('''
-                        INSERT INTO Evenement (
-                            type_evenement, 
-                            date_evenement, 
-                            description, 
-                            rfid, 
-                            date_id
-                        )
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (event_type, datetime.now(), description, rfid, date_id))
-                else:
-                    # Unknown RFID - create an alert
-                    self.cursor.execute('''
-                        INSERT INTO Alerte (
-                            type_alerte,
-                            description,
-                            date_alerte,
-                            status,
-                            date_id
-                        )
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', ("SECURITY", f"Unknown RFID: {rfid}", datetime.now(), "NEW", date_id))
-
-                    # Get the alert_id that was just created
-                    self.cursor.execute("SELECT @@IDENTITY AS alert_id")
-                    alert_row = self.cursor.fetchone()
-                    alert_id = alert_row.alert_id if alert_row else None
-
-                    # Create event linked to the alert
-                    if alert_id:
-                        self.cursor.execute('''
-                            INSERT INTO Evenement (
-                                type_evenement, 
-                                date_evenement, 
-                                description, 
-                                alerte_id,
-                                date_id
-                            )
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (
-                        "SECURITY_ALERT", datetime.now(), f"Unauthorized access with RFID: {rfid}", alert_id, date_id))
-
-            self.conn.commit()
-            logger.debug(f"Successfully recorded access event for RFID: {rfid}")
-
-            return True
-
-        except Exception as e:
-            logger.error(f"Error recording access event: {str(e)}")
-            signals.log_message.emit(f"Error recording event: {str(e)}")
-            if self.conn:
-                try:
-                    self.conn.rollback()
-                except:
-                    pass
-            return False
-
-    def get_recent_events(self, limit=50):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return []
-
-            query = '''
-                SELECT TOP (?) e.evenement_id, e.type_evenement, e.date_evenement, e.description, 
-                       COALESCE(em.prenom + ' ' + em.nom, 'Unknown') as employee_name, 
-                       COALESCE(em.rfid, '') as rfid
-                FROM Evenement e
-                LEFT JOIN Employe em ON e.rfid = em.rfid
-                ORDER BY e.date_evenement DESC
-            '''
-
-            self.cursor.execute(query, (limit,))
-            results = self.cursor.fetchall()
-            events = []
-
-            for row in results:
-                events.append({
-                    'id': row.evenement_id,
-                    'type': row.type_evenement,
-                    'date': row.date_evenement,
-                    'description': row.description,
-                    'employee': row.employee_name,
-                    'rfid': row.rfid
-                })
-
-            return events
-
-        except Exception as e:
-            logger.error(f"Error fetching recent events: {str(e)}")
-            signals.log_message.emit(f"Error fetching events: {str(e)}")
-            return []
-
-    def get_all_employees(self):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return []
-
-            query = '''
-                SELECT e.rfid, e.nom, e.prenom, e.email, e.telephone,
-                       eq.nom_equipe, pc.titre_poste
-                FROM Employe e
-                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
-                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id
-                ORDER BY e.nom, e.prenom
-            '''
-
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            employees = []
-
-            for row in results:
-                employees.append({
-                    'rfid': row.rfid,
-                    'name': f"{row.prenom} {row.nom}",
-                    'email': row.email or '',
-                    'phone': row.telephone or '',
-                    'team': row.nom_equipe or '',
-                    'position': row.titre_poste or ''
-                })
-
-            return employees
-
-        except Exception as e:
-            logger.error(f"Error fetching employees: {str(e)}")
-            signals.log_message.emit(f"Error fetching employees: {str(e)}")
-            return []
-
-    def add_new_employee(self, rfid, first_name, last_name, email, phone, team_id=None, position_id=None):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return False
-
-            # Check if RFID already exists
-            self.cursor.execute("SELECT COUNT(*) FROM Employe WHERE rfid = ?", (rfid,))
-            count = self.cursor.fetchone()[0]
-
-            if count > 0:
-                logger.warning(f"RFID {rfid} already exists in database")
-                signals.log_message.emit(f"RFID {rfid} already exists in database")
-                return False
-
-            # Current date for date_id reference
-            current_date = datetime.now().date()
-            self.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-            date_row = self.cursor.fetchone()
-
-            if not date_row:
-                # Insert current date if it doesn't exist
-                current_day = current_date.day
-                current_month = current_date.month
-                current_year = current_date.year
-                day_of_week = current_date.strftime("%A")
-
-                self.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, 0, '')
-                ''', (current_date, current_day, current_month, current_year, day_of_week))
-
-                self.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-                date_row = self.cursor.fetchone()
-
-            date_id = date_row.date_id if date_row else None
-
-            # Insert new employee
-            query = '''
-                INSERT INTO Employe (rfid, nom, prenom, email, telephone, date_embauche, equipe_id, poste_id, date_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            '''
-
-            self.cursor.execute(query, (
-                rfid, last_name, first_name, email, phone, current_date,
-                team_id, position_id, date_id
-            ))
-
-            self.conn.commit()
-            logger.info(f"Added new employee with RFID {rfid}: {first_name} {last_name}")
-            signals.log_message.emit(f"Added new employee: {first_name} {last_name}")
-            return True
-
-        except Exception as e:
-            logger.error(f"Error adding new employee: {str(e)}")
-            signals.log_message.emit(f"Error adding employee: {str(e)}")
-            if self.conn:
-                try:
-                    self.conn.rollback()
-                except:
-                    pass
-            return False
-
-    def get_teams(self):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return []
-
-            self.cursor.execute("SELECT equipe_id, nom_equipe FROM Equipe ORDER BY nom_equipe")
-            results = self.cursor.fetchall()
-            teams = []
-
-            for row in results:
-                teams.append({
-                    'id': row.equipe_id,
-                    'name': row.nom_equipe
-                })
-
-            return teams
-
-        except Exception as e:
-            logger.error(f"Error fetching teams: {str(e)}")
-            return []
-
-    def get_positions(self):
-        try:
-            if not self.conn or not self.cursor:
-                if not self.reconnect():
-                    return []
-
-            self.cursor.execute("SELECT poste_id, titre_poste FROM Poste_Competence ORDER BY titre_poste")
-            results = self.cursor.fetchall()
-            positions = []
-
-            for row in results:
-                positions.append({
-                    'id': row.poste_id,
-                    'title': row.titre_poste
-                })
-
-            return positions
-
-        except Exception as e:
-            logger.error(f"Error fetching positions: {str(e)}")
-            return []
+                result['employee_version'] = version
+                result['employees'] = db_manager.get_all_employees()
+                reload_lists = True
+                self.change_versions = set()
+        if 'employee_version' in result:
+            self.employee_version = result['employee_version']
+            floor = self.employee_version - CHANGE_SAFETY_WINDOW
+            self.change_versions = {version for version in self.change_versions if version > floor}
+
+        if reload_lists:
+            result['teams'] = db_manager.get_teams()
+            result['positions'] = db_manager.get_positions()
+        return result
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            logger.info("Database connection closed")
-
-
-# Flask routes
-@app.route('/verify', methods=['GET'])
-def verify():
-    rfid = request.args.get('rfid')
-
-    if not rfid:
-        logger.warning("Verification request received without RFID parameter")
-        return "error: missing rfid parameter", 400
-
-    logger.info(f"Verification request received for RFID: {rfid}")
-
-    db_manager = DatabaseManager()
-    if db_manager.verify_rfid(rfid):
-        db_manager.close()
-        return "authorized"
-    else:
-        db_manager.close()
-        return "unauthorized"
-
-
-@app.route('/status', methods=['GET'])
-def status():
-    return "running", 200
+        if self.db_manager:
+            self.db_manager.close()
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, server_url=None):
         super().__init__()
+        # Set when attached to a separately running rfid_server
+        self.server_url = server_url
         self.initUI()
         self.db_manager = DatabaseManager()
 
-        # Connect to signal
-        signals.new_access_event.connect(self.add_access_log_entry)
-        signals.log_message.connect(self.add_debug_log)
+        # Refresh queries run on their own thread and only ever fetch changes
+        self.refresh_thread = RefreshThread(server_url)
+        self.refresh_thread.refreshed.connect(self.apply_refresh)
+        self.refresh_thread.error_occurred.connect(self.add_debug_log)
+
+        # Server callbacks run on request threads and only append to the bus;
+        # the GUI thread drains it in batches so a burst cannot flood Qt
+        self.event_bus = EventBus(UI_EVENT_BUFFER)
+        self.bus_callbacks = [
+            (signals.new_access_event, self.event_bus.subscribe('access')),
+            (signals.log_message, self.event_bus.subscribe('log')),
+        ]
+        for signal, callback in self.bus_callbacks:
+            signal.connect(callback)
+        self.drain_timer = QTimer(self)
+        self.drain_timer.timeout.connect(self.drain_server_events)
+        self.drain_timer.start(UI_DRAIN_INTERVAL_MS)
 
         # Setup refresh timer
         self.refresh_timer = QTimer(self)
         self.refresh_timer.timeout.connect(self.refresh_data)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
+        self.refresh_timer.start(REFRESH_INTERVAL_MS)
 
         # Initial data load
         self.refresh_data()
@@ -500,6 +227,7 @@ class MainWindow(QMainWindow):
 
         self.debug_log = QTextEdit()
         self.debug_log.setReadOnly(True)
+        self.debug_log.document().setMaximumBlockCount(DEBUG_LOG_MAX_LINES)
 
         debug_log_layout.addWidget(self.debug_log)
         dashboard_splitter.addWidget(debug_log_group)
@@ -620,7 +348,36 @@ class MainWindow(QMainWindow):
         self.add_debug_log("Application started")
         self.add_debug_log("Initializing server...")
 
-    def add_access_log_entry(self, timestamp, rfid, employee, status):
+    def drain_server_events(self):
+        events, dropped = self.event_bus.drain(UI_DRAIN_BATCH)
+        if not events and not dropped:
+            return
+
+        access_events = [args for kind, args in events if kind == 'access']
+        messages = [args[0] for kind, args in events if kind == 'log']
+        backlog = self.event_bus.pending()
+        if dropped:
+            messages.append(f"GUI fell behind, {dropped} server events skipped")
+        if backlog:
+            messages.append(f"{backlog} server events still queued")
+
+        # One repaint and one scroll for the whole batch
+        self.access_log_table.setUpdatesEnabled(False)
+        try:
+            for timestamp, rfid, employee, status in access_events:
+                self.add_access_log_entry(timestamp, rfid, employee, status, scroll=False)
+            overflow = self.access_log_table.rowCount() - ACCESS_LOG_MAX_ROWS
+            for _ in range(max(overflow, 0)):
+                self.access_log_table.removeRow(0)
+        finally:
+            self.access_log_table.setUpdatesEnabled(True)
+        if access_events:
+            self.access_log_table.scrollToBottom()
+
+        if messages:
+            self.add_debug_log("\n".join(messages))
+
+    def add_access_log_entry(self, timestamp, rfid, employee, status, scroll=True):
         row_position = self.access_log_table.rowCount()
         self.access_log_table.insertRow(row_position)
 
@@ -642,85 +399,144 @@ class MainWindow(QMainWindow):
             self.access_log_table.setItem(row_position, 4, QTableWidgetItem("Access denied"))
 
         # Scroll to the new row
-        self.access_log_table.scrollToBottom()
+        if scroll:
+            self.access_log_table.scrollToBottom()
 
     def add_debug_log(self, message):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.debug_log.append(f"[{timestamp}] {message}")
+        # A batch of messages arrives as one string, one line each
+        self.debug_log.append("\n".join(f"[{timestamp}] {line}" for line in message.split("\n")))
         # Scroll to bottom
         scrollbar = self.debug_log.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
 
     def refresh_data(self):
+        if self.refresh_thread.isRunning():
+            # The previous refresh is still querying, this tick is covered by it
+            return
         self.add_debug_log("Refreshing data...")
+        self.refresh_thread.start()
 
+    def apply_refresh(self, result):
         # Update server status
-        self.server_status_label.setText("Server Status: Running")
-        self.server_status_label.setStyleSheet("font-weight: bold; color: green;")
+        if result['server_running']:
+            self.server_status_label.setText("Server Status: Running")
+            self.server_status_label.setStyleSheet("font-weight: bold; color: green;")
+        else:
+            self.server_status_label.setText("Server Status: Unreachable")
+            self.server_status_label.setStyleSheet("font-weight: bold; color: red;")
 
         # Update database status
-        if self.db_manager.conn:
+        if result['db_connected']:
             self.db_status_label.setText("Database: Connected")
             self.db_status_label.setStyleSheet("font-weight: bold; color: green;")
         else:
             self.db_status_label.setText("Database: Disconnected")
             self.db_status_label.setStyleSheet("font-weight: bold; color: red;")
 
-        # Load recent events
-        self.load_recent_events()
+        self.apply_events(result['events'], result['initial_events'])
 
-        # Load employees
-        self.load_employees()
+        if 'employee_changes' in result:
+            self.apply_employee_changes(result['employee_changes'], result['employees'])
+        elif 'employees' in result:
+            self.load_employees(result['employees'])
 
-        # Load teams and positions
-        self.load_teams_and_positions()
+        if 'teams' in result:
+            self.load_teams_and_positions(result['teams'], result['positions'])
 
         self.add_debug_log("Data refresh complete")
 
-    def load_recent_events(self):
-        events = self.db_manager.get_recent_events(50)
-
-        # Clear existing table
-        self.access_log_table.setRowCount(0)
-
-        # Add events to table
-        for event in events:
-            row_position = self.access_log_table.rowCount()
-            self.access_log_table.insertRow(row_position)
+    def set_event_row(self, row_position, event):
+        timestamp = event['date'].strftime("%Y-%m-%d %H:%M:%S")
+        time_item = QTableWidgetItem(timestamp)
+        # Rows from the database carry their id, live rows from the event bus do not
+        time_item.setData(Qt.ItemDataRole.UserRole, event['id'])
+        self.access_log_table.setItem(row_position, 0, time_item)
+        self.access_log_table.setItem(row_position, 1, QTableWidgetItem(event['rfid']))
+        self.access_log_table.setItem(row_position, 2, QTableWidgetItem(event['employee']))
+
+        status_item = QTableWidgetItem("ACCESS GRANTED" if event['type'] == "AUTHORIZED" else "ACCESS DENIED")
+        if event['type'] == "AUTHORIZED":
+            status_item.setBackground(QColor(200, 255, 200))  # Light green
+        else:
+            status_item.setBackground(QColor(255, 200, 200))  # Light red
 
-            timestamp = event['date'].strftime("%Y-%m-%d %H:%M:%S")
-            self.access_log_table.setItem(row_position, 0, QTableWidgetItem(timestamp))
-            self.access_log_table.setItem(row_position, 1, QTableWidgetItem(event['rfid']))
-            self.access_log_table.setItem(row_position, 2, QTableWidgetItem(event['employee']))
+        self.access_log_table.setItem(row_position, 3, status_item)
+        self.access_log_table.setItem(row_position, 4, QTableWidgetItem(event['description']))
 
-            status_item = QTableWidgetItem("ACCESS GRANTED" if event['type'] == "AUTHORIZED" else "ACCESS DENIED")
-            if event['type'] == "AUTHORIZED":
-                status_item.setBackground(QColor(200, 255, 200))  # Light green
+    def apply_events(self, events, initial):
+        self.access_log_table.setUpdatesEnabled(False)
+        try:
+            if initial:
+                self.access_log_table.setRowCount(0)
             else:
-                status_item.setBackground(QColor(255, 200, 200))  # Light red
-
-            self.access_log_table.setItem(row_position, 3, status_item)
-            self.access_log_table.setItem(row_position, 4, QTableWidgetItem(event['description']))
+                # Live rows are superseded by the stored events, as a full reload did
+                for row_position in range(self.access_log_table.rowCount() - 1, -1, -1):
+                    item = self.access_log_table.item(row_position, 0)
+                    if item is None or item.data(Qt.ItemDataRole.UserRole) is None:
+                        self.access_log_table.removeRow(row_position)
+
+            for event in events:
+                row_position = self.access_log_table.rowCount()
+                self.access_log_table.insertRow(row_position)
+                self.set_event_row(row_position, event)
+
+            overflow = self.access_log_table.rowCount() - ACCESS_LOG_MAX_ROWS
+            for _ in range(max(overflow, 0)):
+                self.access_log_table.removeRow(0)
+        finally:
+            self.access_log_table.setUpdatesEnabled(True)
+        if events:
+            self.access_log_table.scrollToBottom()
+
+    def load_employees(self, employees):
+        self.employees_table.setUpdatesEnabled(False)
+        try:
+            self.employees_table.setRowCount(len(employees))
+            for row_position, employee in enumerate(employees):
+                self.set_employee_row(row_position, employee)
+        finally:
+            self.employees_table.setUpdatesEnabled(True)
+
+    def set_employee_row(self, row_position, employee):
+        self.employees_table.setItem(row_position, 0, QTableWidgetItem(employee['rfid']))
+        self.employees_table.setItem(row_position, 1, QTableWidgetItem(employee['name']))
+        self.employees_table.setItem(row_position, 2, QTableWidgetItem(employee['email']))
+        self.employees_table.setItem(row_position, 3, QTableWidgetItem(employee['phone']))
+        self.employees_table.setItem(row_position, 4, QTableWidgetItem(employee['team']))
+        self.employees_table.setItem(row_position, 5, QTableWidgetItem(employee['position']))
+
+    def employee_rows(self):
+        rows = {}
+        for row_position in range(self.employees_table.rowCount()):
+            item = self.employees_table.item(row_position, 0)
+            if item:
+                rows[item.text()] = row_position
+        return rows
+
+    def apply_employee_changes(self, changes, employees):
+        if not changes:
+            return
 
-    def load_employees(self):
-        employees = self.db_manager.get_all_employees()
+        rows = self.employee_rows()
+        employees = {employee['rfid']: employee for employee in employees}
 
-        # Clear existing table
-        self.employees_table.setRowCount(0)
+        # Removals from the bottom up so the remembered positions stay valid
+        for row_position in sorted((rows[change['key']] for change in changes
+                                    if change['key'] in rows and change['key'] not in employees), reverse=True):
+            self.employees_table.removeRow(row_position)
+        rows = self.employee_rows()
 
-        # Add employees to table
-        for employee in employees:
-            row_position = self.employees_table.rowCount()
-            self.employees_table.insertRow(row_position)
+        for rfid, employee in employees.items():
+            row_position = rows.get(rfid)
+            if row_position is None:
+                row_position = self.employees_table.rowCount()
+                self.employees_table.insertRow(row_position)
+            self.set_employee_row(row_position, employee)
 
-            self.employees_table.setItem(row_position, 0, QTableWidgetItem(employee['rfid']))
-            self.employees_table.setItem(row_position, 1, QTableWidgetItem(employee['name']))
-            self.employees_table.setItem(row_position, 2, QTableWidgetItem(employee['email']))
-            self.employees_table.setItem(row_position, 3, QTableWidgetItem(employee['phone']))
-            self.employees_table.setItem(row_position, 4, QTableWidgetItem(employee['team']))
-            self.employees_table.setItem(row_position, 5, QTableWidgetItem(employee['position']))
+        self.add_debug_log(f"Applied {len(changes)} employee changes")
 
-    def load_teams_and_positions(self):
+    def load_teams_and_positions(self, teams, positions):
         # Save current selections
         current_team = self.team_combo.currentData()
         current_position = self.position_combo.currentData()
@@ -729,7 +545,6 @@ class MainWindow(QMainWindow):
         self.team_combo.clear()
         self.team_combo.addItem("Select Team", None)
 
-        teams = self.db_manager.get_teams()
         for team in teams:
             self.team_combo.addItem(team['name'], team['id'])
 
@@ -737,7 +552,6 @@ class MainWindow(QMainWindow):
         self.position_combo.clear()
         self.position_combo.addItem("Select Position", None)
 
-        positions = self.db_manager.get_positions()
         for position in positions:
             self.position_combo.addItem(position['title'], position['id'])
 
@@ -778,7 +592,7 @@ class MainWindow(QMainWindow):
         if success:
             QMessageBox.information(self, "Success", f"Employee {first_name} {last_name} added successfully")
             self.clear_employee_form()
-            self.load_employees()
+            self.refresh_data()
         else:
             QMessageBox.critical(self, "Error", "Failed to add employee. Check logs for details.")
 
@@ -813,36 +627,52 @@ class MainWindow(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
+            self.drain_timer.stop()
+            self.refresh_timer.stop()
+            self.refresh_thread.wait()
+            self.refresh_thread.close()
+            for signal, callback in self.bus_callbacks:
+                signal.disconnect(callback)
             self.db_manager.close()
+            if not self.server_url:
+                shutdown_background_workers()
             event.accept()
         else:
             event.ignore()
 
 
 def start_flask_server():
+    # Development server for running everything in one process; use
+    # rfid_server.py for production and start the GUI with --attach
     app.run(host='0.0.0.0', port=3000, debug=False, threaded=True)
 
 
 if __name__ == '__main__':
-    logger.info("Starting RFID Access Control Server")
+    parser = argparse.ArgumentParser(description="RFID access-control GUI")
+    parser.add_argument('--attach', metavar='URL',
+                        help="attach to a running rfid_server (e.g. http://127.0.0.1:3000) "
+                             "instead of starting an embedded server")
+    options, qt_args = parser.parse_known_args()
+
+    if options.attach:
+        logger.info(f"Attaching GUI to RFID server at {options.attach}")
+        # Employee changes made here must reach the attached server's cache
+        rfid_cache.RFID_SERVER_URL = options.attach.rstrip('/')
+    else:
+        logger.info("Starting RFID Access Control Server")
 
-    # Test database connection on startup
-    try:
-        conn = pyodbc.connect(CONNECTION_STRING)
-        cursor = conn.cursor()
-        cursor.execute("SELECT @@VERSION")
-        row = cursor.fetchone()
-        logger.info(f"Connected to database: {row[0]}")
-        conn.close()
-    except Exception as e:
-        logger.error(f"Failed to connect to database on startup: {str(e)}")
+        # Test database connection on startup
+        check_database()
+
+        start_background_workers()
+        atexit.register(shutdown_background_workers)
 
-    # Start Flask server in a separate thread
-    flask_thread = Thread(target=start_flask_server)
-    flask_thread.daemon = True
-    flask_thread.start()
+        # Start Flask server in a separate thread
+        flask_thread = Thread(target=start_flask_server)
+        flask_thread.daemon = True
+        flask_thread.start()
 
     # Start PyQt application
-    app_instance = QApplication(sys.argv)
-    main_window = MainWindow()
-    sys.exit(app_instance.exec())
\ No newline at end of file
+    app_instance = QApplication(sys.argv[:1] + qt_args)
+    main_window = MainWindow(options.attach and options.attach.rstrip('/'))
+    sys.exit(app_instance.exec())
@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from models.database_manager import DatabaseManager
+from models.date_keys import date_keys
 from models.alert import Alert
 from view.AlertView import AlertView
 
@@ -25,21 +26,12 @@ class AlertController:
                 return
 
             current_date = datetime.now().date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (current_date, current_date.day, current_date.month, current_date.year, current_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, current_date)
 
             self.db.cursor.execute('''
                 INSERT INTO Alerte (type_alerte, description, date_alerte, status, r fid, date_id)
                 VALUES (?, ?, ?, ?, ?, ?)
-            ''', (type_alerte, description, status, rfid, date_id[0]))
+            ''', (type_alerte, description, status, rfid, date_id))
             self.db.conn.commit()
             self.view.success("Alert added successfully!")
         except Exception as e:
@@ -1,6 +1,7 @@
 import datetime
 
 from models.database_manager import DatabaseManager
+from models.date_keys import date_keys
 from models.event import Event
 from view.EventView import EventView
 
@@ -48,21 +49,12 @@ class EventController:
                 alerte_id = int(alerte_input) if alerte_input.strip() else None
 
             date_evenement_date = datetime.strptime(date_evenement, "%Y-%m-%d %H:%M:%S").date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_evenement_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_evenement_date, date_evenement_date.day, date_evenement_date.month, date_evenement_date.year, date_evenement_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_evenement_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, date_evenement_date)
 
             self.db.cursor.execute('''
                 INSERT INTO Evenement (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id[0]))
+            ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id))
             self.db.conn.commit()
             self.view.success("Event added successfully!")
         except Exception as e:
@@ -104,22 +96,13 @@ class EventController:
             new_desc = input(f"Enter new Description [{event.description}]: ") or event.description
 
             new_date_date = datetime.strptime(new_date, "%Y-%m-%d %H:%M:%S").date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (new_date_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (new_date_date, new_date_date.day, new_date_date.month, new_date_date.year, new_date_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (new_date_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, new_date_date)
 
             self.db.cursor.execute('''
                 UPDATE Evenement
                 SET type_evenement=?, date_evenement=?, description=?, date_id=?
                 WHERE evenement_id=?
-            ''', (new_type, new_date, new_desc, date_id[0], evenement_id))
+            ''', (new_type, new_date, new_desc, date_id, evenement_id))
             self.db.conn.commit()
             self.view.success("Event updated successfully!")
         except Exception as e:
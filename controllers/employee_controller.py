@@ -1,6 +1,7 @@
 from datetime import datetime
 
 from models.database_manager import DatabaseManager
+from models.date_keys import date_keys
 from models.employee import Employee
 from view.employee_view import EmployeeView
 
@@ -81,36 +82,16 @@ class EmployeeController:
             poste_id = int(input("Enter Position ID: "))
 
             # Insert birth date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-            date_naissance_id = self.db.cursor.fetchone()
-            if not date_naissance_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_naissance, date_naissance.day, date_naissance.month, date_naissance.year,
-                      date_naissance.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-                date_naissance_id = self.db.cursor.fetchone()
+            date_naissance_id = date_keys.resolve(self.db.cursor, date_naissance)
 
             # Insert hire date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-            date_embauche_id = self.db.cursor.fetchone()
-            if not date_embauche_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_embauche, date_embauche.day, date_embauche.month, date_embauche.year, date_embauche.strftime("%A"),
-                      0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-                date_embauche_id = self.db.cursor.fetchone()
+            date_embauche_id = date_keys.resolve(self.db.cursor, date_embauche)
 
             self.db.cursor.execute('''
                 INSERT INTO Employe (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id, date_id)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id,
-                  date_naissance_id[0]))
+                  date_naissance_id))
             self.db.conn.commit()
             print("\nEmployee added successfully!")
         except Exception as e:
@@ -242,36 +223,16 @@ class EmployeeController:
                 date_embauche = emp.date_embauche
 
             # Insert birth date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-            date_naissance_id = self.db.cursor.fetchone()
-            if not date_naissance_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_naissance, date_naissance.day, date_naissance.month, date_naissance.year,
-                      date_naissance.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-                date_naissance_id = self.db.cursor.fetchone()
+            date_naissance_id = date_keys.resolve(self.db.cursor, date_naissance)
 
             # Insert hire date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-            date_embauche_id = self.db.cursor.fetchone()
-            if not date_embauche_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_embauche, date_embauche.day, date_embauche.month, date_embauche.year, date_embauche.strftime("%A"),
-                      0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-                date_embauche_id = self.db.cursor.fetchone()
+            date_embauche_id = date_keys.resolve(self.db.cursor, date_embauche)
 
             self.db.cursor.execute('''
                 UPDATE Employe
                 SET nom = ?, prenom = ?, date_naissance = ?, date_embauche = ?, email = ?, telephone = ?, adresse = ?, equipe_id = ?, poste_id = ?, date_id = ?
                 WHERE rfid = ?
-            ''', (nom, prenom, date_naissance, date_embauche, email, telephone, adresse, emp.equipe_id, emp.poste_id, date_embauche_id[0], rfid))
+            ''', (nom, prenom, date_naissance, date_embauche, email, telephone, adresse, emp.equipe_id, emp.poste_id, date_embauche_id, rfid))
             self.db.conn.commit()
             print("\nEmployee updated successfully!")
         except Exception as e:
@@ -0,0 +1,95 @@
+import time
+import argparse
+import numpy as np
+
+from models.face_store import FaceEncodingStore, ENCODING_SIZE
+from models.face_index import INDEX_KINDS, hnswlib
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def synthetic_gallery(employees, photos, seed=0):
+    # Several photos per employee, spread around a per-person centre like real encodings
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(scale=0.1, size=(employees, ENCODING_SIZE))
+    gallery = np.repeat(centres, photos, axis=0) + rng.normal(scale=0.03, size=(employees * photos, ENCODING_SIZE))
+    return [f"e{i // photos}/{i % photos}" for i in range(len(gallery))], gallery.astype(np.float32)
+
+
+def make_queries(gallery, count, seed=1):
+    # New photos of enrolled people: a gallery encoding plus fresh noise
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(gallery), count)
+    return (gallery[rows] + rng.normal(scale=0.03, size=(count, ENCODING_SIZE))).astype(np.float32)
+
+
+def run_index(kind, keys, gallery, queries, k, batch):
+    index = INDEX_KINDS[kind]()
+    started = time.perf_counter()
+    index.add(keys, gallery)
+    build = time.perf_counter() - started
+
+    latencies = []
+    results = []
+    for start in range(0, len(queries), batch):
+        started = time.perf_counter()
+        results.extend(index.search(queries[start:start + batch], k))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return index, build, latencies, results
+
+
+def recall(results, truth, k):
+    # Share of the exact top-k found in the index's top-k
+    found = sum(len({key for key, _ in got[:k]} & {key for key, _ in expected[:k]}) for got, expected in zip(results, truth))
+    return found / max(1, sum(min(k, len(expected)) for expected in truth))
+
+
+def print_result(name, index, build, latencies, batch, recall_1, recall_k):
+    per_face = [latency / batch * 1000 for latency in latencies]
+    print(f"{name}: build={build:.2f}s recall@1={recall_1:.3f} recall@k={recall_k:.3f} {index.stats()}")
+    print(f"    per face p50={percentile(per_face, 0.50):.3f}ms p95={percentile(per_face, 0.95):.3f}ms "
+          f"p99={percentile(per_face, 0.99):.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and latency of the face indexes against exact search")
+    parser.add_argument('--store', help="benchmark the encodings of a face store directory instead of synthetic ones")
+    parser.add_argument('--employees', type=int, default=10000)
+    parser.add_argument('--photos', type=int, default=3, help="photos per synthetic employee")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--batch', type=int, default=4, help="faces per search, like the faces in one frame")
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--kinds', default='ivf,hnsw', help="comma separated indexes to compare with exact")
+    options = parser.parse_args()
+
+    if options.store:
+        names, gallery = FaceEncodingStore(options.store).load()
+        keys = [f"{name}/{i}" for i, name in enumerate(names)]
+        gallery = np.asarray(gallery, dtype=np.float32)
+    else:
+        keys, gallery = synthetic_gallery(options.employees, options.photos)
+    if not len(gallery):
+        print("No encodings to benchmark")
+        return
+    queries = make_queries(gallery, options.queries)
+    print(f"{len(gallery)} encodings, {len(queries)} queries in batches of {options.batch}, k={options.k}")
+
+    exact, build, latencies, truth = run_index('exact', keys, gallery, queries, options.k, options.batch)
+    print_result('exact', exact, build, latencies, options.batch, 1.0, 1.0)
+
+    for kind in options.kinds.split(','):
+        if kind == 'hnsw' and hnswlib is None:
+            print("hnsw: skipped, hnswlib is not installed")
+            continue
+        index, build, latencies, results = run_index(kind, keys, gallery, queries, options.k, options.batch)
+        print_result(kind, index, build, latencies, options.batch, recall(results, truth, 1), recall(results, truth, options.k))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,42 +2,70 @@ import face_recognition
 import cv2
 import numpy as np
 import os
+import time
+import queue
+import argparse
+import threading
 from datetime import datetime
 import pandas as pd
 import pyttsx3
 
+from models.face_store import FaceEncodingStore, ENCODING_SIZE
+from models.face_matcher import FaceMatcher
+from models.face_tracker import FaceTracker
+from models.frame_pipeline import FramePipeline, FRAME_QUEUE_SIZE
+
 
 KNOWN_FACES_DIR = r"D:\cours\pfa\hardware\code\rfid\faces"
 ATTENDANCE_FILE = "attendance.csv"
+# Encodings of the photos in KNOWN_FACES_DIR, kept between runs
+FACE_STORE_DIR = "face_encodings"
+# 'auto', 'exact', 'ivf' or 'hnsw'; auto switches to an ANN index for large galleries
+FACE_INDEX = "auto"
+# How often the photos are checked for enrolment changes while running
+FACE_RESYNC_SECONDS = 60
+# Detection runs on frames shrunk by this factor, every DETECT_EVERY frames;
+# face boxes are tracked in between and only new or drifted faces are re-encoded
+DETECTION_SCALE = 0.25
+DETECT_EVERY = 5
+# Overlap with the box a face was encoded at below which it is encoded again
+DRIFT_IOU = 0.6
+# Seconds before the same greeting is spoken again
+SPEECH_REPEAT_SECONDS = 5
+
+
+# Created on first use, pipeline worker processes never speak
+engine = None
 
 
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
+# Built by load_known_faces, then updated in place
+known_faces = FaceMatcher([], np.empty((0, ENCODING_SIZE)))
+face_store = FaceEncodingStore(FACE_STORE_DIR)
 
 
-known_face_encodings = []
-known_face_names = []
+def encode_face(image_path):
+    image = face_recognition.load_image_file(image_path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0] if encodings else None
 
 
 def load_known_faces():
+    global known_faces
     if not os.path.exists(KNOWN_FACES_DIR):
         print(f"Error: Directory '{KNOWN_FACES_DIR}' does not exist. Please create it and add employee images.")
         return
 
-    for filename in os.listdir(KNOWN_FACES_DIR):
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            name = os.path.splitext(filename)[0]
-            image_path = os.path.join(KNOWN_FACES_DIR, filename)
-            try:
-                image = face_recognition.load_image_file(image_path)
-                encodings = face_recognition.face_encodings(image)
-                if encodings:
-                    known_face_encodings.append(encodings[0])
-                    known_face_names.append(name)
-                else:
-                    print(f"Warning: No face found in {filename}")
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
+    # Only new or changed photos are encoded, the rest come from the store
+    names, encodings = face_store.sync(KNOWN_FACES_DIR, encode_face)
+    if not len(known_faces):
+        known_faces = FaceMatcher(names, encodings, index=FACE_INDEX)
+        print(f"Loaded {len(names)} known faces ({face_store.encoded} encoded, {face_store.reused} from cache, "
+              f"{known_faces.index.kind} index)")
+        return
+
+    added, removed = known_faces.update(names, encodings)
+    if added or removed:
+        print(f"Known faces updated: {added} added, {removed} removed ({known_faces.index.kind} index)")
 
 
 def mark_attendance(name):
@@ -63,17 +91,75 @@ def mark_attendance(name):
 
 
 def speak_message(message):
+    global engine
     try:
+        if engine is None:
+            engine = pyttsx3.init()
+            engine.setProperty('rate', 150)
         engine.say(message)
         engine.runAndWait()
     except RuntimeError as e:
         print(f"Audio error: {e}")
 
 
-def run_face_recognition():
+class Greeter:
+    """Speaks the greetings on its own thread so the video loop never waits for TTS.
+
+    At most one message waits behind the one being spoken; newer ones are
+    dropped rather than read out late.
+    """
+
+    def __init__(self):
+        self.messages = queue.Queue(maxsize=1)
+        self.last_name = None
+        self.last_time = datetime.now()
+        self.thread = threading.Thread(target=self._run, name='greeter', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            message = self.messages.get()
+            if message is None:
+                break
+            speak_message(message)
+
+    def greet(self, name):
+        current_time = datetime.now()
+        if (self.last_name != name or
+                (current_time - self.last_time).total_seconds() > SPEECH_REPEAT_SECONDS):
+            try:
+                self.messages.put_nowait(f"Welcome {name}" if name != "Unknown" else "Access Denied")
+            except queue.Full:
+                return
+            self.last_name = name
+            self.last_time = current_time
+
+    def close(self):
+        try:
+            self.messages.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+def draw_face(frame, box, name):
+    top, right, bottom, left = box
+    color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
+    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+    cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+    font = cv2.FONT_HERSHEY_DUPLEX
+    cv2.putText(frame, name, (left + 6, bottom - 6), font, 1.0, (255, 255, 255), 1)
+
+
+def scale_box(box, factor, height, width):
+    top, right, bottom, left = box
+    return (max(0, int(top * factor)), min(width, int(right * factor)),
+            min(height, int(bottom * factor)), max(0, int(left * factor)))
+
+
+def run_face_recognition(detection_scale=DETECTION_SCALE, detect_every=DETECT_EVERY, drift_iou=DRIFT_IOU):
 
     load_known_faces()
-    if not known_face_encodings:
+    if not len(known_faces):
         print("No known faces loaded. Exiting.")
         return
 
@@ -83,10 +169,16 @@ def run_face_recognition():
         print("Error: Could not open webcam.")
         return
 
-    last_recognized_name = None
-    last_speech_time = datetime.now()
+    greeter = Greeter()
+    last_sync = time.monotonic()
+    tracker = FaceTracker(drift_iou=drift_iou)
+    frame_count = 0
 
     while True:
+        if time.monotonic() - last_sync > FACE_RESYNC_SECONDS:
+            load_known_faces()
+            last_sync = time.monotonic()
+
         ret, frame = video_capture.read()
         if not ret:
             print("Error: Failed to capture frame from webcam.")
@@ -94,55 +186,126 @@ def run_face_recognition():
 
 
         if frame is not None:
-
-            frame = cv2.convertScaleAbs(frame)
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # Proper BGR to RGB conversion
+            height, width = frame.shape[:2]
+            small_frame = cv2.resize(frame, (0, 0), fx=detection_scale, fy=detection_scale)
+            gray_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+            detecting = frame_count % detect_every == 0
+            frame_count += 1
 
             try:
-                face_locations = face_recognition.face_locations(rgb_frame)
-                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations, num_jitters=1)
+                if detecting:
+                    rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+                    tracker.detect(gray_small, face_recognition.face_locations(rgb_small))
+                else:
+                    tracker.follow(gray_small)
+
+                # Full resolution encodings, only for faces that are new or have moved
+                pending = tracker.needs_encoding(retry_unknown=detecting)
+                if pending:
+                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    locations = [scale_box(track.box, 1 / detection_scale, height, width) for track in pending]
+                    face_encodings = face_recognition.face_encodings(rgb_frame, locations, num_jitters=1)
             except Exception as e:
                 print(f"Error in face recognition: {e}")
                 continue
 
-            for (top, right, bottom, left), face_encoding in zip(face_locations, face_encodings):
-                matches = face_recognition.compare_faces(known_face_encodings, face_encoding)
-                name = "Unknown"
-
-                face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-                best_match_index = np.argmin(face_distances)
-                if matches[best_match_index]:
-                    name = known_face_names[best_match_index]
-                    mark_attendance(name)
-
-
-                color = (0, 255, 0) if name != "Unknown" else (0, 0, 255)
-                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
-                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(frame, name, (left + 6, bottom - 6), font, 1.0, (255, 255, 255), 1)
-
+            if pending:
+                # Every pending face against every known face in one pass
+                for track, (match, distance) in zip(pending, known_faces.identify(face_encodings)):
+                    if match is not None and match != track.name:
+                        mark_attendance(match)
+                    track.name, track.distance = match, distance
+                    track.encoded_box = track.box
 
-                current_time = datetime.now()
-                if (last_recognized_name != name or
-                        (current_time - last_speech_time).total_seconds() > 5):
-                    if name != "Unknown":
-                        speak_message(f"Welcome {name}")
-                    else:
-                        speak_message("Access Denied")
-                    last_recognized_name = name
-                    last_speech_time = current_time
+            for track in tracker.tracks:
+                name = track.name or "Unknown"
+                draw_face(frame, scale_box(track.box, 1 / detection_scale, height, width), name)
+                greeter.greet(name)
 
             cv2.imshow('Employee Attendance System', frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    greeter.close()
     video_capture.release()
     cv2.destroyAllWindows()
 
 
+def run_face_recognition_pipeline(workers=None, detection_scale=DETECTION_SCALE, queue_size=FRAME_QUEUE_SIZE):
+    """Capture, detect/encode and match as separate stages.
+
+    A capture thread fills a small queue of frames in shared memory, a pool
+    of ``workers`` processes detects and encodes them in parallel, and this
+    thread matches, draws and marks attendance. Frames the workers cannot
+    keep up with are dropped, oldest first.
+    """
+    load_known_faces()
+    if not len(known_faces):
+        print("No known faces loaded. Exiting.")
+        return
+
+    pipeline = FramePipeline(0, workers, queue_size, detection_scale)
+    try:
+        pipeline.start()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        pipeline.close()
+        return
+
+    greeter = Greeter()
+    last_sync = time.monotonic()
+    # Only associates faces across frames here, the workers detect every frame
+    tracker = FaceTracker()
+    results = pipeline.results()
+    try:
+        for frame, locations, face_encodings in results:
+            if time.monotonic() - last_sync > FACE_RESYNC_SECONDS:
+                load_known_faces()
+                last_sync = time.monotonic()
+
+            tracker.detect(None, locations)
+            # Every face of the frame against every known face in one pass
+            for track, (match, distance) in zip(tracker.tracks, known_faces.identify(face_encodings)):
+                if match is not None and match != track.name:
+                    mark_attendance(match)
+                track.name, track.distance = match, distance
+
+                name = track.name or "Unknown"
+                draw_face(frame, track.box, name)
+                greeter.greet(name)
+
+            cv2.imshow('Employee Attendance System', frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+        if pipeline.error:
+            print(f"Error: {pipeline.error}")
+    finally:
+        results.close()
+        print(f"Pipeline: {pipeline.stats()}")
+        greeter.close()
+        pipeline.close()
+        cv2.destroyAllWindows()
+
+
 if __name__ == "__main__":
     print("Starting Attendance System with Audio Feedback...")
+    parser = argparse.ArgumentParser(description="Face recognition attendance")
+    parser.add_argument('--detection-scale', type=float, default=DETECTION_SCALE,
+                        help="frame scale for face detection (encodings use the full frame)")
+    parser.add_argument('--detect-every', type=int, default=DETECT_EVERY,
+                        help="run detection every N frames, tracking faces in between")
+    parser.add_argument('--drift-iou', type=float, default=DRIFT_IOU,
+                        help="re-encode a tracked face once its box overlaps the encoded one less than this")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="detect and encode every frame in a pool of worker processes")
+    parser.add_argument('--workers', type=int, default=0, help="pipeline worker processes (default: cores - 1)")
+    parser.add_argument('--frame-queue', type=int, default=FRAME_QUEUE_SIZE,
+                        help="frames waiting for a worker before the oldest is dropped")
+    options = parser.parse_args()
+
     print("Press 'q' to quit")
-    run_face_recognition()
\ No newline at end of file
+    if options.pipeline:
+        run_face_recognition_pipeline(options.workers or None, options.detection_scale, max(1, options.frame_queue))
+    else:
+        run_face_recognition(options.detection_scale, max(1, options.detect_every), options.drift_iou)
\ No newline at end of file
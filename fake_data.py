@@ -1,21 +1,15 @@
-import pyodbc
 import random
 from datetime import datetime, timedelta
 from faker import Faker
 
-fake = Faker(['fr_FR'])
+from models.bulk_insert import bulk_insert
+from models.storage import backend
 
-CONNECTION_STRING = (
-    'DRIVER={ODBC Driver 18 for SQL Server};'
-    'SERVER=IHEB;'
-    'DATABASE=rfid;'
-    'Trusted_Connection=Yes;'
-    'Encrypt=no;'
-)
+fake = Faker(['fr_FR'])
 
 
 def generate_fake_data():
-    conn = pyodbc.connect(CONNECTION_STRING)
+    conn = backend.connect()
     cursor = conn.cursor()
 
 
@@ -57,33 +51,10 @@ def generate_fake_data():
 def check_and_update_schema(cursor, conn):
     print("Checking database schema...")
 
-    cursor.execute("""
-    SELECT COLUMN_NAME 
-    FROM INFORMATION_SCHEMA.COLUMNS 
-    WHERE TABLE_NAME = 'Alerte' AND COLUMN_NAME = 'date_id'
-    """)
-
-    if cursor.fetchone() is None:
-        print("Adding date_id column to Alerte table...")
-        cursor.execute("""
-        ALTER TABLE Alerte 
-        ADD date_id INT FOREIGN KEY REFERENCES Date(date_id)
-        """)
-        conn.commit()
-
-    cursor.execute("""
-    SELECT COLUMN_NAME 
-    FROM INFORMATION_SCHEMA.COLUMNS 
-    WHERE TABLE_NAME = 'Evenement' AND COLUMN_NAME = 'date_id'
-    """)
-
-    if cursor.fetchone() is None:
-        print("Adding date_id column to Evenement table...")
-        cursor.execute("""
-        ALTER TABLE Evenement 
-        ADD date_id INT FOREIGN KEY REFERENCES Date(date_id)
-        """)
-        conn.commit()
+    # Adds the date_id columns where an older schema lacks them
+    backend.add_column(cursor, 'Alerte', 'date_id', 'INT FOREIGN KEY REFERENCES Date(date_id)')
+    backend.add_column(cursor, 'Evenement', 'date_id', 'INT FOREIGN KEY REFERENCES Date(date_id)')
+    conn.commit()
 
 
 def clear_all_tables(cursor, conn):
@@ -94,7 +65,11 @@ def clear_all_tables(cursor, conn):
         count = cursor.fetchone()[0]
         print(f"Found {count} records in {table} table")
 
-    cursor.execute("EXEC sp_MSforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT ALL'")
+    sqlite = backend.dialect == 'sqlite'
+    if sqlite:
+        cursor.execute("PRAGMA foreign_keys=OFF")
+    else:
+        cursor.execute("EXEC sp_MSforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT ALL'")
 
     print("Deleting data from all tables...")
     cursor.execute("DELETE FROM Evenement")
@@ -104,13 +79,17 @@ def clear_all_tables(cursor, conn):
     cursor.execute("DELETE FROM Equipe")
     cursor.execute("DELETE FROM Date")
 
-    cursor.execute("DBCC CHECKIDENT ('Date', RESEED, 0)")
-    cursor.execute("DBCC CHECKIDENT ('Equipe', RESEED, 0)")
-    cursor.execute("DBCC CHECKIDENT ('Poste_Competence', RESEED, 0)")
-    cursor.execute("DBCC CHECKIDENT ('Alerte', RESEED, 0)")
-    cursor.execute("DBCC CHECKIDENT ('Evenement', RESEED, 0)")
+    if sqlite:
+        cursor.execute("DELETE FROM sqlite_sequence")
+        cursor.execute("PRAGMA foreign_keys=ON")
+    else:
+        cursor.execute("DBCC CHECKIDENT ('Date', RESEED, 0)")
+        cursor.execute("DBCC CHECKIDENT ('Equipe', RESEED, 0)")
+        cursor.execute("DBCC CHECKIDENT ('Poste_Competence', RESEED, 0)")
+        cursor.execute("DBCC CHECKIDENT ('Alerte', RESEED, 0)")
+        cursor.execute("DBCC CHECKIDENT ('Evenement', RESEED, 0)")
 
-    cursor.execute("EXEC sp_MSforeachtable 'ALTER TABLE ? CHECK CONSTRAINT ALL'")
+        cursor.execute("EXEC sp_MSforeachtable 'ALTER TABLE ? CHECK CONSTRAINT ALL'")
 
     conn.commit()
     print("All tables cleared successfully")
@@ -133,6 +112,7 @@ def generate_dates(cursor):
         "12-25": "Noël"
     }
 
+    rows = []
     current_date = start_date
     while current_date <= end_date:
         date_str = current_date.strftime("%Y-%m-%d")
@@ -145,17 +125,18 @@ def generate_dates(cursor):
         est_jour_ferie = 1 if date_key in holidays else 0
         description_jour = holidays.get(date_key, "")
 
-        cursor.execute('''
-            INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (date_str, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour))
-
-        cursor.execute("SELECT @@IDENTITY AS date_id")
-        date_id = cursor.fetchone()[0]
-        date_ids[date_str] = date_id
+        rows.append((date_str, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour))
 
         current_date += timedelta(days=1)
 
+    keys = bulk_insert(
+        cursor, "Date",
+        ["date_complete", "jour", "mois", "annee", "jour_semaine", "est_jour_ferie", "description_jour"],
+        rows, key_column="date_id"
+    )
+    for row, date_id in zip(rows, keys):
+        date_ids[row[0]] = date_id
+
     return date_ids
 
 
@@ -170,18 +151,8 @@ def generate_teams(cursor):
         ("Équipe Informatique", "Support IT et développement", "Lucas Moreau")
     ]
 
-    team_ids = []
-    for team_name, description, chef in teams:
-        cursor.execute('''
-            INSERT INTO Equipe (nom_equipe, description, chef_equipe)
-            VALUES (?, ?, ?)
-        ''', (team_name, description, chef))
-
-        cursor.execute("SELECT @@IDENTITY AS team_id")
-        team_id = cursor.fetchone()[0]
-        team_ids.append(team_id)
-
-    return team_ids
+    return bulk_insert(cursor, "Equipe", ["nom_equipe", "description", "chef_equipe"], teams,
+                       key_column="equipe_id")
 
 
 def generate_positions(cursor):
@@ -200,28 +171,23 @@ def generate_positions(cursor):
         ("Administratif", "Senior", "Coordination administrative", "3 ans d'expérience minimum")
     ]
 
-    position_ids = []
-    for titre, niveau, description, requirements in positions:
-        cursor.execute('''
-            INSERT INTO Poste_Competence (titre_poste, niveau_competence, description, requirements)
-            VALUES (?, ?, ?, ?)
-        ''', (titre, niveau, description, requirements))
+    return bulk_insert(cursor, "Poste_Competence",
+                       ["titre_poste", "niveau_competence", "description", "requirements"], positions,
+                       key_column="poste_id")
 
-        cursor.execute("SELECT @@IDENTITY AS position_id")
-        position_id = cursor.fetchone()[0]
-        position_ids.append(position_id)
 
-    return position_ids
+def generate_rfid():
+    return ''.join(random.choice('0123456789ABCDEF') for _ in range(8))
 
 
 def generate_employees(cursor, team_ids, position_ids, date_ids):
 
     num_employees = 100
 
-    employee_rfids = []
+    rows = []
 
     for _ in range(num_employees):
-        rfid = ''.join(random.choice('0123456789ABCDEF') for _ in range(8))
+        rfid = generate_rfid()
 
         nom = fake.last_name()
         prenom = fake.first_name()
@@ -242,16 +208,16 @@ def generate_employees(cursor, team_ids, position_ids, date_ids):
 
         date_id = date_ids.get(date_embauche)
 
+        rows.append((rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse,
+                     equipe_id, poste_id, date_id))
 
-        cursor.execute('''
-            INSERT INTO Employe (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id, date_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-        rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id, date_id))
-
-        employee_rfids.append(rfid)
-
-    return employee_rfids
+    bulk_insert(
+        cursor, "Employe",
+        ["rfid", "nom", "prenom", "date_naissance", "date_embauche", "email", "telephone", "adresse",
+         "equipe_id", "poste_id", "date_id"],
+        rows
+    )
+    return [row[0] for row in rows]
 
 
 def generate_alerts(cursor, employee_rfids, date_ids):
@@ -268,7 +234,7 @@ def generate_alerts(cursor, employee_rfids, date_ids):
 
     statuses = ["Nouveau", "En cours", "Résolu", "Fermé", "En attente"]
 
-    alert_ids = []
+    rows = []
 
     for _ in range(200):
         type_alerte = random.choice(alert_types)
@@ -283,16 +249,13 @@ def generate_alerts(cursor, employee_rfids, date_ids):
 
         date_id = date_ids.get(date_alerte_str)
 
-        cursor.execute('''
-            INSERT INTO Alerte (type_alerte, description, date_alerte, status, rfid, date_id)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (type_alerte, description, date_alerte, status, rfid, date_id))
+        rows.append((type_alerte, description, date_alerte, status, rfid, date_id))
 
-        cursor.execute("SELECT @@IDENTITY AS alert_id")
-        alert_id = cursor.fetchone()[0]
-        alert_ids.append(alert_id)
-
-    return alert_ids
+    return bulk_insert(
+        cursor, "Alerte",
+        ["type_alerte", "description", "date_alerte", "status", "rfid", "date_id"],
+        rows, key_column="alerte_id"
+    )
 
 
 def generate_events(cursor, employee_rfids, team_ids, position_ids, alert_ids, date_ids):
@@ -308,6 +271,8 @@ def generate_events(cursor, employee_rfids, team_ids, position_ids, alert_ids, d
         "Visite client"
     ]
 
+    rows = []
+
     for _ in range(1000):
         type_evenement = random.choice(event_types)
 
@@ -327,10 +292,13 @@ def generate_events(cursor, employee_rfids, team_ids, position_ids, alert_ids, d
         date_id = date_ids.get(date_evenement_str)
 
 
-        cursor.execute('''
-            INSERT INTO Evenement (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id))
+        rows.append((type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id))
+
+    bulk_insert(
+        cursor, "Evenement",
+        ["type_evenement", "date_evenement", "description", "rfid", "equipe_id", "poste_id", "alerte_id", "date_id"],
+        rows
+    )
 
 
 def print_summary(cursor):
@@ -0,0 +1,243 @@
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+from fake_data import fake, generate_rfid
+import rfid_server
+from models.rfid_cache import employee_cache
+
+# Bodies the ESP32 firmware's verifyCardWithServer understands
+VALID_BODIES = ("authorized", "unauthorized")
+
+
+class FakeDatabaseManager:
+    """In-memory stand-in for rfid_server.DatabaseManager.
+
+    Covers what the verify path uses. ``latency`` seconds are slept per call
+    to stand in for the SQL Server round trip.
+    """
+
+    employees = {}
+    events = []
+    latency = 0.0
+    _lock = threading.Lock()
+
+    def __init__(self, conn=None):
+        self.conn = conn
+        self.cursor = None
+
+    def fetch_employee(self, rfid):
+        time.sleep(self.latency)
+        return self.employees.get(rfid)
+
+    def fetch_employees(self, rfids):
+        time.sleep(self.latency)
+        return {rfid: self.employees[rfid] for rfid in rfids if rfid in self.employees}
+
+    def fetch_all_employees(self):
+        time.sleep(self.latency)
+        return list(self.employees.values())
+
+    def record_access_events(self, events):
+        time.sleep(self.latency)
+        with self._lock:
+            FakeDatabaseManager.events.extend(events)
+        return True
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self):
+        self.checkouts = 0
+
+    @contextmanager
+    def connection(self):
+        self.checkouts += 1
+        yield object()
+
+    def stats(self):
+        return {'checkouts': self.checkouts}
+
+    def close(self):
+        pass
+
+
+def seed_employees(count):
+    employees = {}
+    while len(employees) < count:
+        rfid = generate_rfid()
+        nom, prenom = fake.last_name(), fake.first_name()
+        employees[rfid] = {'rfid': rfid, 'nom': nom, 'prenom': prenom, 'name': f"{prenom} {nom}"}
+    return employees
+
+
+def start_local_server(employees, db_latency):
+    from werkzeug.serving import make_server
+
+    FakeDatabaseManager.employees = employees
+    FakeDatabaseManager.latency = db_latency
+    rfid_server.DatabaseManager = FakeDatabaseManager
+    rfid_server.db_pool = FakePool()
+    # Every simulated reader connects from 127.0.0.1, the flood limits would
+    # throttle the harness instead of measuring the verify path
+    rfid_server.reader_limiter.rate = 0
+    rfid_server.uid_limiter.rate = 0
+
+    # Only the workers the verify path needs, with a throwaway journal
+    rfid_server.swipe_journal.directory = tempfile.mkdtemp(prefix='rfid_loadtest_')
+    rfid_server.swipe_journal.open()
+    rfid_server.warm_employee_cache()
+    rfid_server.event_writer.start()
+
+    server = make_server('127.0.0.1', 0, rfid_server.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def stop_local_server(server):
+    server.shutdown()
+    rfid_server.event_writer.stop()
+    rfid_server.swipe_journal.close()
+
+
+class Results:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.sent += 1
+            if ok:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_reader(url, reader, known, unknown_ratio, mean_interval, deadline, results):
+    # Swipes arrive as a Poisson process per door
+    while True:
+        time.sleep(random.expovariate(1.0 / mean_interval))
+        if time.monotonic() >= deadline:
+            return
+        if known and random.random() >= unknown_ratio:
+            rfid = random.choice(known)
+        else:
+            rfid = generate_rfid()
+
+        # Own reader id, so debouncing treats each simulated door separately
+        query = urllib.parse.urlencode({'rfid': rfid, 'reader': reader})
+        started = time.perf_counter()
+        try:
+            # A new connection per swipe, like the ESP32's HTTPClient
+            with urllib.request.urlopen(f"{url}/verify?{query}", timeout=10) as response:
+                ok = response.status == 200 and response.read().decode().strip() in VALID_BODIES
+        except Exception:
+            ok = False
+        results.record(time.perf_counter() - started, ok)
+
+
+def run_load(url, known, readers, mean_interval, unknown_ratio, duration):
+    results = Results()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=run_reader,
+                         args=(url, f"loadtest-{i}", known, unknown_ratio, mean_interval, deadline, results),
+                         daemon=True)
+        for i in range(readers)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(results.latencies)
+    return {
+        'readers': readers,
+        'offered_rate': readers / mean_interval,
+        'sent': results.sent,
+        'errors': results.errors,
+        'error_rate': results.errors / results.sent if results.sent else 0.0,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def print_report(result):
+    print(f"{result['readers']} readers, offered {result['offered_rate']:.1f} swipes/s")
+    print(f"  sent={result['sent']} errors={result['errors']} error rate={result['error_rate']:.2%}")
+    print(f"  throughput={result['throughput']:.1f} swipes/s")
+    print(f"  p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+          f"p99={result['p99_ms']:.1f}ms max={result['max_ms']:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test for /verify. Without --url an in-process server backed by an "
+                    "in-memory fake database is started, so no SQL Server is needed, with the "
+                    "rate limits off. All simulated readers share one address, so a server given "
+                    "with --url must be started with --reader-rate 0 --uid-rate 0."
+    )
+    parser.add_argument('--url', help="test a running server instead (its badges are unknown to us); "
+                                      "start it with --reader-rate 0 --uid-rate 0")
+    parser.add_argument('--readers', type=int, default=50, help="simulated door readers")
+    parser.add_argument('--mean-interval', type=float, default=1.0,
+                        help="mean seconds between two swipes on one reader")
+    parser.add_argument('--unknown-ratio', type=float, default=0.1, help="share of swipes with unknown badges")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--employees', type=int, default=100, help="badges seeded into the fake database")
+    parser.add_argument('--db-latency', type=float, default=0.002,
+                        help="seconds each fake database call takes")
+    options = parser.parse_args()
+
+    # Per-swipe logging would dominate the measurement
+    logging.getLogger('rfid_server').setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    server = None
+    known = []
+    url = options.url
+    if not url:
+        employees = seed_employees(options.employees)
+        known = list(employees)
+        server, url = start_local_server(employees, options.db_latency)
+
+    try:
+        result = run_load(url.rstrip('/'), known, options.readers, options.mean_interval,
+                          options.unknown_ratio, options.duration)
+    finally:
+        if server:
+            stop_local_server(server)
+
+    print_report(result)
+    if server:
+        print(f"  cache: {employee_cache.stats()}")
+        print(f"  writer: {rfid_server.event_writer.stats()}")
+        print(f"  events stored: {len(FakeDatabaseManager.events)}")
+
+
+if __name__ == '__main__':
+    main()
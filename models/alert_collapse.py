@@ -0,0 +1,106 @@
+import logging
+from datetime import timedelta
+
+from models.storage import backend
+from models.bulk_insert import bulk_insert
+
+logger = logging.getLogger('rfid_server.alerts')
+
+# Descriptions per IN (...) lookup of open alerts
+ALERT_LOOKUP_CHUNK = 200
+
+
+def ensure_alert_columns(cursor):
+    # Repeat count and last sighting of a collapsed alert
+    backend.add_column(cursor, 'Alerte', 'occurrences', 'INT NOT NULL DEFAULT 1')
+    backend.add_column(cursor, 'Alerte', 'derniere_occurrence', 'DATETIME')
+    cursor.connection.commit()
+
+
+def alert_description(rfid):
+    return f"Unknown RFID: {rfid}"
+
+
+class AlertCollapser:
+    """Writes unknown-badge alerts, one row per badge per ``window`` seconds.
+
+    Further denials of a badge that already has an open (status NEW) alert
+    younger than the window only bump its ``occurrences`` counter, so a
+    flood of bad swipes costs one Alerte row and one SECURITY_ALERT event
+    per badge and window. Runs on the event writer thread, inside its
+    transaction.
+    """
+
+    def __init__(self, window=60.0):
+        self.window = window
+
+        self.created = 0
+        self.collapsed = 0
+
+    def _open_alerts(self, cursor, descriptions, cutoff):
+        open_alerts = {}
+        for i in range(0, len(descriptions), ALERT_LOOKUP_CHUNK):
+            chunk = descriptions[i:i + ALERT_LOOKUP_CHUNK]
+            placeholders = ", ".join(["?"] * len(chunk))
+            cursor.execute(f'''
+                SELECT description, MAX(alerte_id) AS alerte_id
+                FROM Alerte
+                WHERE description IN ({placeholders}) AND status = 'NEW' AND date_alerte >= ?
+                GROUP BY description
+            ''', chunk + [cutoff])
+            for row in cursor.fetchall():
+                open_alerts[row.description] = row.alerte_id
+        return open_alerts
+
+    def write(self, cursor, denied, date_ids):
+        """Record the denied ``AccessEvent``s; ``date_ids`` maps dates to Date keys."""
+        # Per badge: first denial, last denial, count
+        badges = {}
+        for event in denied:
+            first, last, count = badges.get(event.rfid, (event, event, 0))
+            badges[event.rfid] = (first, event if event.timestamp >= last.timestamp else last, count + 1)
+        if not badges:
+            return
+
+        cutoff = min(first.timestamp for first, _, _ in badges.values()) - timedelta(seconds=self.window)
+        open_alerts = self._open_alerts(cursor, [alert_description(rfid) for rfid in badges], cutoff)
+
+        updates = []
+        new_alerts = []
+        for rfid, (first, last, count) in badges.items():
+            alerte_id = open_alerts.get(alert_description(rfid))
+            if alerte_id is not None:
+                updates.append((count, last.timestamp, alerte_id))
+                self.collapsed += count
+            else:
+                new_alerts.append((first, last, count))
+                self.collapsed += count - 1
+
+        if updates:
+            cursor.executemany(
+                "UPDATE Alerte SET occurrences = occurrences + ?, derniere_occurrence = ? WHERE alerte_id = ?",
+                updates
+            )
+
+        alert_ids = bulk_insert(
+            cursor, "Alerte",
+            ["type_alerte", "description", "date_alerte", "status", "date_id", "occurrences", "derniere_occurrence"],
+            [("SECURITY", alert_description(first.rfid), first.timestamp, "NEW",
+              date_ids[first.timestamp.date()], count, last.timestamp) for first, last, count in new_alerts],
+            key_column="alerte_id"
+        )
+        bulk_insert(
+            cursor, "Evenement",
+            ["type_evenement", "date_evenement", "description", "alerte_id", "date_id"],
+            [("SECURITY_ALERT", first.timestamp, f"Unauthorized access with RFID: {first.rfid}",
+              alert_id, date_ids[first.timestamp.date()])
+             for (first, _, _), alert_id in zip(new_alerts, alert_ids)]
+        )
+        self.created += len(new_alerts)
+
+    def stats(self):
+        return {
+            'window': self.window,
+            'created': self.created,
+            'collapsed': self.collapsed,
+        }
@@ -0,0 +1,114 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger('rfid_server.snapshot')
+
+
+def _uid_hash(uid):
+    return int.from_bytes(hashlib.sha1(uid.encode()).digest()[:8], 'big')
+
+
+class AuthorizationSnapshot:
+    """Set of authorized badge UIDs that readers can copy and decide offline.
+
+    The ETag is the XOR of a hash per UID, so it changes incrementally with
+    each add/remove and two workers holding the same badges agree on it.
+    Recent changes are kept so a reader can ask for the delta since the
+    ETag it holds instead of downloading everything again.
+    """
+
+    def __init__(self, history=5000):
+        self._uids = set()
+        self._hash = 0
+        self._sorted = []
+        self._lock = threading.Lock()
+        # (etag after the change, uid, present)
+        self._changes = deque(maxlen=history)
+        self._base_etag = self._etag()
+        self.built_at = 0.0
+        self.rebuilds = 0
+
+    def _etag(self):
+        return f"{len(self._uids):x}-{self._hash:016x}"
+
+    def _apply(self, uid, present):
+        # Caller holds the lock
+        if (uid in self._uids) == present:
+            return False
+        if present:
+            self._uids.add(uid)
+        else:
+            self._uids.discard(uid)
+        self._hash ^= _uid_hash(uid)
+        self._sorted = None
+        if len(self._changes) == self._changes.maxlen:
+            self._base_etag = self._changes[0][0]
+        self._changes.append((self._etag(), uid, present))
+        return True
+
+    def rebuild(self, uids):
+        uids = set(uids)
+        with self._lock:
+            added = uids - self._uids
+            removed = self._uids - uids
+            for uid in removed:
+                self._apply(uid, False)
+            for uid in added:
+                self._apply(uid, True)
+            self.built_at = time.monotonic()
+            self.rebuilds += 1
+        if added or removed:
+            logger.info(f"Authorization snapshot rebuilt: {len(added)} added, {len(removed)} removed")
+
+    def set_present(self, uid, present):
+        with self._lock:
+            return self._apply(uid, present)
+
+    def age(self):
+        return time.monotonic() - self.built_at
+
+    @property
+    def etag(self):
+        with self._lock:
+            return self._etag()
+
+    def snapshot(self):
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._uids)
+            return self._etag(), self._sorted
+
+    def delta(self, since):
+        """Return ``(etag, added, removed)`` since ETag ``since``, or None if too old."""
+        with self._lock:
+            etag = self._etag()
+            if since == etag:
+                return etag, [], []
+
+            changes = {}
+            found = since == self._base_etag
+            for change_etag, uid, present in reversed(self._changes):
+                if change_etag == since:
+                    found = True
+                    break
+                # Newest change per badge wins
+                changes.setdefault(uid, present)
+            if not found:
+                return None
+
+        added = sorted(uid for uid, present in changes.items() if present)
+        removed = sorted(uid for uid, present in changes.items() if not present)
+        return etag, added, removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'etag': self._etag(),
+                'count': len(self._uids),
+                'history': len(self._changes),
+                'rebuilds': self.rebuilds,
+                'age': round(time.monotonic() - self.built_at, 1) if self.built_at else None,
+            }
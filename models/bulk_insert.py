@@ -0,0 +1,85 @@
+import re
+
+from models.storage import is_sqlite
+
+# SQL Server caps a statement at 2100 parameters and a VALUES list at 1000 rows
+MAX_PARAMETERS = 2000
+MAX_ROWS = 1000
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _check_identifiers(*names):
+    for name in names:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+
+def _chunks(rows, columns):
+    size = max(1, min(MAX_ROWS, MAX_PARAMETERS // max(1, len(columns))))
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def bulk_insert(cursor, table, columns, rows, key_column=None):
+    """Insert many rows with one statement per chunk.
+
+    With ``key_column`` the generated identity values are returned in the
+    same order as ``rows``. Keys come from MERGE ... OUTPUT into a table
+    variable keyed by each row's position, which (unlike @@IDENTITY) is
+    exact under concurrency and when the table has triggers.
+    """
+    rows = [tuple(row) for row in rows]
+    if not rows:
+        return []
+
+    _check_identifiers(table, *columns)
+    column_list = ", ".join(columns)
+    keys = []
+
+    if is_sqlite(cursor):
+        return _bulk_insert_sqlite(cursor, table, column_list, columns, rows, key_column)
+
+    for chunk in _chunks(rows, columns):
+        params = [value for row in chunk for value in row]
+        row_placeholder = "(" + ", ".join(["?"] * len(columns))
+
+        if key_column is None:
+            values = ", ".join([row_placeholder + ")"] * len(chunk))
+            cursor.execute(f"INSERT INTO {table} ({column_list}) VALUES {values}", params)
+            continue
+
+        _check_identifiers(key_column)
+        # The row ordinal is a literal so it does not count against the parameter cap
+        values = ", ".join(f"{row_placeholder}, {i})" for i in range(len(chunk)))
+        source_columns = ", ".join(f"s.{column}" for column in columns)
+        cursor.execute(f'''
+            SET NOCOUNT ON;
+            DECLARE @keys TABLE (row_ordinal INT PRIMARY KEY, key_value INT);
+            MERGE INTO {table} AS t
+            USING (VALUES {values}) AS s ({column_list}, row_ordinal)
+            ON 1 = 0
+            WHEN NOT MATCHED THEN
+                INSERT ({column_list}) VALUES ({source_columns})
+            OUTPUT s.row_ordinal, INSERTED.{key_column} INTO @keys;
+            SELECT key_value FROM @keys ORDER BY row_ordinal;
+        ''', params)
+        keys.extend(row[0] for row in cursor.fetchall())
+
+    return keys
+
+
+def _bulk_insert_sqlite(cursor, table, column_list, columns, rows, key_column):
+    # Embedded, so a statement per row costs microseconds; lastrowid is the
+    # INTEGER PRIMARY KEY of the row just inserted by this connection
+    sql = f"INSERT INTO {table} ({column_list}) VALUES ({', '.join(['?'] * len(columns))})"
+    if key_column is None:
+        cursor.executemany(sql, rows)
+        return []
+
+    _check_identifiers(key_column)
+    keys = []
+    for row in rows:
+        cursor.execute(sql, row)
+        keys.append(cursor.lastrowid)
+    return keys
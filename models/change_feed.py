@@ -0,0 +1,187 @@
+import logging
+from datetime import datetime, timedelta
+
+from models.storage import backend, is_sqlite
+
+logger = logging.getLogger('rfid_server.changes')
+
+# Tracked table -> key column, and the columns a consumer gets for a changed row
+CHANGE_TABLES = {
+    'Employe': ('rfid', ['rfid', 'nom', 'prenom', 'email', 'telephone', 'equipe_id', 'poste_id']),
+    'Equipe': ('equipe_id', ['equipe_id', 'nom_equipe', 'description', 'chef_equipe']),
+    'Poste_Competence': ('poste_id', ['poste_id', 'titre_poste', 'niveau_competence', 'description']),
+}
+
+# Keys per IN (...) lookup when loading changed rows
+CHANGE_LOOKUP_CHUNK = 200
+# Versions below ``since`` read again on SQL Server, see fetch_changes
+CHANGE_SAFETY_WINDOW = 100
+
+
+def _mssql_trigger(table, key):
+    # inserted/deleted hold every row of the statement; a key update shows as D + I
+    return f'''
+        CREATE OR ALTER TRIGGER trg_{table}_changes ON {table}
+        AFTER INSERT, UPDATE, DELETE AS
+        BEGIN
+            SET NOCOUNT ON;
+            INSERT INTO Change_Log (table_name, row_key, operation, changed_at)
+            SELECT '{table}', CAST(COALESCE(i.{key}, d.{key}) AS VARCHAR(50)),
+                   CASE WHEN i.{key} IS NULL THEN 'D' WHEN d.{key} IS NULL THEN 'I' ELSE 'U' END,
+                   GETDATE()
+            FROM inserted i
+            FULL OUTER JOIN deleted d ON i.{key} = d.{key};
+        END
+    '''
+
+
+def _sqlite_triggers(table, key):
+    insert = "INSERT INTO Change_Log (table_name, row_key, operation, changed_at)"
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {table} BEGIN
+            {insert} VALUES ('{table}', NEW.{key}, 'I', CURRENT_TIMESTAMP);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_update AFTER UPDATE ON {table} BEGIN
+            {insert} SELECT '{table}', OLD.{key}, 'D', CURRENT_TIMESTAMP WHERE OLD.{key} <> NEW.{key};
+            {insert} VALUES ('{table}', NEW.{key}, 'U', CURRENT_TIMESTAMP);
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {table} BEGIN
+            {insert} VALUES ('{table}', OLD.{key}, 'D', CURRENT_TIMESTAMP);
+        END''',
+    ]
+
+
+def ensure_change_log(cursor):
+    """Create Change_Log and the triggers that fill it.
+
+    Triggers catch every writer, including the HR GUIs that update the
+    tables directly. The identity column is the feed version.
+    """
+    backend.create_table(cursor, 'Change_Log', '''
+            change_id INT PRIMARY KEY IDENTITY(1,1),
+            table_name VARCHAR(50),
+            row_key VARCHAR(50),
+            operation CHAR(1),
+            changed_at DATETIME
+    ''')
+    # Versions at or below this were pruned, consumers behind it must rescan
+    backend.create_table(cursor, 'Change_Log_State', '''
+            state_id INT PRIMARY KEY,
+            pruned_through INT
+    ''')
+
+    cursor.execute("SELECT COUNT(*) FROM Change_Log_State")
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("INSERT INTO Change_Log_State (state_id, pruned_through) VALUES (1, 0)")
+
+    for table, (key, _) in CHANGE_TABLES.items():
+        if is_sqlite(cursor):
+            for statement in _sqlite_triggers(table, key):
+                cursor.execute(statement)
+        else:
+            cursor.execute(_mssql_trigger(table, key))
+    cursor.connection.commit()
+
+
+def _pruned_through(cursor):
+    cursor.execute("SELECT pruned_through FROM Change_Log_State WHERE state_id = 1")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def current_version(cursor):
+    cursor.execute("SELECT MAX(change_id) FROM Change_Log")
+    # Never behind the pruned history, even when the log is empty
+    return max(cursor.fetchone()[0] or 0, _pruned_through(cursor))
+
+
+def prune_change_log(cursor, retention_days):
+    cutoff = datetime.now() - timedelta(days=retention_days)
+    cursor.execute("SELECT MAX(change_id) FROM Change_Log WHERE changed_at < ?", (cutoff,))
+    pruned_through = cursor.fetchone()[0]
+    if pruned_through:
+        cursor.execute("DELETE FROM Change_Log WHERE change_id <= ?", (pruned_through,))
+        cursor.execute(
+            "UPDATE Change_Log_State SET pruned_through = ? WHERE state_id = 1 AND pruned_through < ?",
+            (pruned_through, pruned_through)
+        )
+        logger.info(f"Pruned change log through version {pruned_through}")
+    cursor.connection.commit()
+
+
+def _load_rows(cursor, table, keys):
+    key, columns = CHANGE_TABLES[table]
+    rows = {}
+    for i in range(0, len(keys), CHANGE_LOOKUP_CHUNK):
+        chunk = keys[i:i + CHANGE_LOOKUP_CHUNK]
+        placeholders = ", ".join(["?"] * len(chunk))
+        cursor.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE {key} IN ({placeholders})", chunk
+        )
+        for row in cursor.fetchall():
+            rows[str(row[0])] = {column: row[i] for i, column in enumerate(columns)}
+    return rows
+
+
+def fetch_changes(cursor, since, limit=1000):
+    """Changes after version ``since``, at most ``limit`` log entries.
+
+    Several changes to one row collapse into its latest state. ``reset``
+    means the consumer is behind the pruned history and must reload fully.
+
+    On SQL Server identity values are handed out at insert, not at commit,
+    so a transaction can commit an entry below a version the consumer has
+    already passed. The last ``CHANGE_SAFETY_WINDOW`` versions up to
+    ``since`` are read again and returned too; a consumer drops the ones
+    it has already applied by ``version``. SQLite serializes writers, its
+    versions always commit in order.
+    """
+    if since < _pruned_through(cursor):
+        return {'version': current_version(cursor), 'reset': True, 'more': False, 'changes': []}
+
+    cursor.execute(f'''
+        SELECT {backend.top_clause} change_id, table_name, row_key, operation
+        FROM Change_Log
+        WHERE change_id > ?
+        ORDER BY change_id
+        {backend.limit_clause}
+    ''', (limit, since) if backend.top_clause else (since, limit))
+    entries = cursor.fetchall()
+
+    # Read apart from the page, so a small limit still moves forward
+    rechecked = []
+    if not is_sqlite(cursor) and since > 0:
+        cursor.execute(
+            "SELECT change_id, table_name, row_key, operation FROM Change_Log "
+            "WHERE change_id > ? AND change_id <= ? ORDER BY change_id",
+            (since - CHANGE_SAFETY_WINDOW, since)
+        )
+        rechecked = cursor.fetchall()
+
+    latest = {}
+    for entry in rechecked + entries:
+        latest[(entry.table_name, entry.row_key)] = entry
+
+    changed = {}
+    for table_name, row_key in latest:
+        changed.setdefault(table_name, []).append(row_key)
+    rows = {table: _load_rows(cursor, table, keys) for table, keys in changed.items() if table in CHANGE_TABLES}
+
+    changes = []
+    for (table_name, row_key), entry in sorted(latest.items(), key=lambda item: item[1].change_id):
+        current = rows.get(table_name, {}).get(row_key)
+        changes.append({
+            'version': entry.change_id,
+            'table': table_name,
+            'key': row_key,
+            # A row deleted after this entry was logged reads as deleted now
+            'op': entry.operation if current is not None else 'D',
+            'row': current,
+        })
+
+    return {
+        'version': entries[-1].change_id if entries else since,
+        'reset': False,
+        'more': len(entries) == limit,
+        'changes': changes,
+    }
@@ -0,0 +1,175 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('rfid_server.pool')
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of database connections.
+
+    Connections are created lazily through ``connect`` up to ``max_size``,
+    validated on checkout and replaced when they turn out to be dead. After a
+    failed connect, checkouts fail fast for ``connect_backoff`` seconds
+    instead of every request thread waiting on the driver's login timeout.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=5.0, validate_query="SELECT 1", connect_backoff=5.0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.validate_query = validate_query
+        self.connect_backoff = connect_backoff
+        self._down_until = 0.0
+
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        # Metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._replaced = 0
+        self._timeouts = 0
+        self._connect_failures = 0
+
+    def _is_alive(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.validate_query)
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        create = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    if time.monotonic() < self._down_until:
+                        raise PoolTimeout("Database unavailable, retrying later")
+                    # Reserve the slot now, connect outside the lock
+                    self._size += 1
+                    conn = None
+                    create = True
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._cond.wait(remaining)
+
+            wait_time = time.perf_counter() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_time_total += wait_time
+                self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        if not create and not self._is_alive(conn):
+            logger.warning("Discarding dead pooled connection")
+            self._discard(conn)
+            with self._cond:
+                self._replaced += 1
+            create = True
+
+        if create:
+            try:
+                conn = self.connect()
+            except Exception:
+                # Give the slot back so other threads can try again
+                with self._cond:
+                    self._size -= 1
+                    self._connect_failures += 1
+                    self._down_until = time.monotonic() + self.connect_backoff
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._down_until = 0.0
+
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            # Never hand an open transaction to the next borrower
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, discard=not self._is_alive(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+                'wait_time_avg': round(self._wait_time_total / self._waits, 6) if self._waits else 0.0,
+                'timeouts': self._timeouts,
+                'replaced': self._replaced,
+                'connect_failures': self._connect_failures,
+                'available': time.monotonic() >= self._down_until,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+        logger.info("Connection pool closed")
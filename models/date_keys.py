@@ -0,0 +1,129 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+from models.storage import is_sqlite
+
+logger = logging.getLogger('rfid_server.dates')
+
+# Days created in one go when a date is missing
+PROVISION_DAYS = 60
+
+# Rows per multi-row INSERT, SQL Server allows at most 2100 parameters
+# and older SQLite builds 999
+DATE_INSERT_CHUNK = 190
+
+
+def to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+class DateKeyResolver:
+    """Shared ``date -> date_id`` map for the Date dimension.
+
+    Known dates are answered from memory. A missing date provisions a whole
+    run of days in one statement; the insert takes UPDLOCK/HOLDLOCK on Date so
+    concurrent writers (threads or other processes) never create duplicates.
+    Provisioning commits on the given cursor's connection, so call
+    ``resolve`` before the caller's own writes, as the old lookups did.
+    """
+
+    def __init__(self, provision_days=PROVISION_DAYS):
+        self.provision_days = provision_days
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def load(self, cursor):
+        cursor.execute("SELECT date_id, date_complete FROM Date")
+        rows = cursor.fetchall()
+        with self._lock:
+            for row in rows:
+                if row.date_complete:
+                    self._ids.setdefault(to_date(row.date_complete), row.date_id)
+        logger.info(f"Loaded {len(rows)} date keys")
+
+    def get(self, value):
+        return self._ids.get(to_date(value))
+
+    def resolve(self, cursor, value):
+        day = to_date(value)
+        date_id = self._ids.get(day)
+        if date_id is not None:
+            return date_id
+
+        # Near today, create the days ahead too; a birth date only needs itself
+        today = datetime.now().date()
+        if today - timedelta(days=1) <= day <= today + timedelta(days=self.provision_days):
+            days = [day + timedelta(days=i) for i in range(self.provision_days)]
+        else:
+            days = [day]
+
+        # One provisioning round trip at a time per process
+        with self._lock:
+            date_id = self._ids.get(day)
+            if date_id is None:
+                self._ensure(cursor, [d for d in days if d not in self._ids])
+                date_id = self._ids.get(day)
+        return date_id
+
+    def ensure(self, cursor, values):
+        days = sorted({to_date(value) for value in values if value})
+        with self._lock:
+            self._ensure(cursor, [day for day in days if day not in self._ids])
+
+    def provision(self, cursor, start=None, days=None):
+        start = to_date(start or datetime.now())
+        days = days or self.provision_days
+        self.ensure(cursor, [start + timedelta(days=i) for i in range(days)])
+
+    def _ensure(self, cursor, days):
+        if not days:
+            return
+
+        # SQLite has one writer at a time, so it needs no lock hints
+        sqlite = is_sqlite(cursor)
+        hint = "" if sqlite else "WITH (UPDLOCK, HOLDLOCK)"
+
+        for i in range(0, len(days), DATE_INSERT_CHUNK):
+            chunk = days[i:i + DATE_INSERT_CHUNK]
+            values = ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk))
+            params = []
+            for day in chunk:
+                params.extend((day, day.day, day.month, day.year, day.strftime("%A")))
+            if sqlite:
+                # SQLite names VALUES columns column1..columnN
+                source = (f"(SELECT column1 AS date_complete, column2 AS jour, column3 AS mois, "
+                          f"column4 AS annee, column5 AS jour_semaine FROM (VALUES {values})) AS v")
+            else:
+                source = f"(VALUES {values}) AS v(date_complete, jour, mois, annee, jour_semaine)"
+            cursor.execute(f'''
+                INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
+                SELECT v.date_complete, v.jour, v.mois, v.annee, v.jour_semaine, 0, ''
+                FROM {source}
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Date d {hint}
+                    WHERE d.date_complete = v.date_complete
+                )
+            ''', params)
+
+        cursor.execute(
+            "SELECT date_id, date_complete FROM Date WHERE date_complete BETWEEN ? AND ?",
+            (days[0], days[-1])
+        )
+        wanted = set(days)
+        rows = cursor.fetchall()
+        cursor.connection.commit()
+
+        for row in rows:
+            day = to_date(row.date_complete)
+            if day in wanted:
+                self._ids.setdefault(day, row.date_id)
+        logger.debug(f"Provisioned date keys {days[0]} to {days[-1]}")
+
+
+# Resolver shared by every writer in the process
+date_keys = DateKeyResolver()
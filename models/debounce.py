@@ -0,0 +1,71 @@
+import time
+import threading
+from collections import OrderedDict
+
+# Same as the firmware's cardReadCooldown
+DEFAULT_DEBOUNCE_WINDOW = 2.0
+DEFAULT_DEBOUNCE_ENTRIES = 4096
+
+
+class SwipeDebouncer:
+    """Remembers recent decisions per (reader, badge) for ``window`` seconds.
+
+    A repeat tap inside the window gets the remembered decision and must
+    not be recorded again. Memory is capped at ``max_entries``: the oldest
+    entries go first, and they are also the first to expire.
+    """
+
+    def __init__(self, window=DEFAULT_DEBOUNCE_WINDOW, max_entries=DEFAULT_DEBOUNCE_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        # (reader, rfid) -> (decision, expires_at), oldest first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.suppressed = 0
+        self.evicted = 0
+
+    def _expire(self, now):
+        # Caller holds the lock; entries are in insertion order, so stop at the first live one
+        while self._entries:
+            key, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+
+    def check(self, reader, rfid):
+        """Return the remembered decision for a repeat tap, or None."""
+        if self.window <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get((reader, rfid))
+            if entry is None:
+                return None
+            self.suppressed += 1
+            return entry[0]
+
+    def remember(self, reader, rfid, decision):
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            key = (reader, rfid)
+            # Re-inserted at the end so the order stays by expiry
+            self._entries.pop(key, None)
+            self._entries[key] = (decision, now + self.window)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'window': self.window,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'suppressed': self.suppressed,
+                'evicted': self.evicted,
+            }
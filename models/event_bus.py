@@ -0,0 +1,55 @@
+import threading
+from collections import deque
+
+
+class EventBus:
+    """Bounded ring buffer between server threads and a slower consumer (the GUI).
+
+    ``publish`` never blocks: when the buffer is full the oldest event is
+    overwritten and counted as dropped. The consumer polls ``drain`` and
+    gets its events in batches, plus how many it missed since the last one.
+    """
+
+    def __init__(self, capacity=1000):
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._dropped = 0
+
+        self.published = 0
+        self.dropped_total = 0
+
+    def publish(self, kind, *args):
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self._dropped += 1
+                self.dropped_total += 1
+            self._events.append((kind, args))
+            self.published += 1
+
+    def subscribe(self, kind):
+        # Callback for a server Signal that puts its arguments on the bus
+        return lambda *args: self.publish(kind, *args)
+
+    def drain(self, max_events=None):
+        """Return ``(events, dropped)``; ``events`` is oldest first, at most ``max_events``."""
+        with self._lock:
+            if max_events is None or max_events >= len(self._events):
+                events = list(self._events)
+                self._events.clear()
+            else:
+                events = [self._events.popleft() for _ in range(max_events)]
+            dropped, self._dropped = self._dropped, 0
+        return events, dropped
+
+    def pending(self):
+        with self._lock:
+            return len(self._events)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._events),
+                'capacity': self._events.maxlen,
+                'published': self.published,
+                'dropped': self.dropped_total,
+            }
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger('rfid_server.writer')
+
+# One badge swipe waiting to be written to Evenement / Alerte
+AccessEvent = namedtuple(
+    'AccessEvent',
+    ['rfid', 'event_type', 'description', 'timestamp', 'authorized', 'swipe_id'],
+    defaults=(None,)
+)
+
+_STOP = object()
+
+# DB-API errors about the rows themselves (constraint violations, values too
+# long); retrying the same rows cannot succeed, unlike a lost connection
+REJECTED_ERRORS = ('IntegrityError', 'DataError')
+
+
+class RejectedEvents(Exception):
+    """The database refused the events themselves; raised by a ``write_batch``."""
+
+
+def is_rejected(error):
+    if isinstance(error, RejectedEvents):
+        return True
+    return any(cls.__name__ in REJECTED_ERRORS for cls in type(error).__mro__)
+
+
+def is_duplicate_key(error):
+    # From a statement whose only constraint is its primary key, e.g. Swipe_Journal
+    return any(cls.__name__ == 'IntegrityError' for cls in type(error).__mro__)
+
+
+def write_isolating(write_batch, events, dead_letter):
+    """Write ``events``, isolating the ones the database rejects.
+
+    A batch refused for its data is retried one event at a time and the
+    events that are still refused go to ``dead_letter(events, error)``.
+    Returns ``(written, remaining)``; ``remaining`` are the events that
+    could not be written because the database is unavailable.
+    """
+    try:
+        if write_batch(events):
+            return len(events), []
+        return 0, events
+    except Exception as e:
+        if not is_rejected(e):
+            logger.error(f"Error writing access event batch: {str(e)}")
+            return 0, events
+        if len(events) == 1:
+            dead_letter(events, e)
+            return 0, []
+        logger.warning(f"Access event batch rejected, writing its {len(events)} events one by one: {str(e)}")
+
+    written = 0
+    for i, event in enumerate(events):
+        try:
+            if not write_batch([event]):
+                return written, events[i:]
+            written += 1
+        except Exception as e:
+            if not is_rejected(e):
+                logger.error(f"Error writing access event: {str(e)}")
+                return written, events[i:]
+            dead_letter([event], e)
+    return written, []
+
+
+class DeadLetterLog:
+    """JSON lines file of events the database refused, kept for an operator.
+
+    Lines are short single writes in append mode, so every worker process
+    can share the file.
+    """
+
+    def __init__(self, path, to_record):
+        self.path = path
+        self.to_record = to_record
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, events, error):
+        lines = "".join(
+            json.dumps({
+                'failed_at': time.time(),
+                'error': str(error),
+                'event': self.to_record(event),
+            }, default=str) + "\n"
+            for event in events
+        )
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.count += len(events)
+        for event in events:
+            logger.error(f"Access event for RFID {event.rfid} rejected by the database, moved to {self.path}: {str(error)}")
+
+
+class AccessEventWriter:
+    """Write-behind queue for access events.
+
+    Request threads ``submit`` events and return immediately. A single
+    background thread drains the queue and hands batches to ``write_batch``
+    once ``batch_size`` events are waiting or ``flush_interval`` seconds have
+    passed. A batch that fails because the database is unavailable is kept
+    and retried; events the database rejects are handed to ``dead_letter``
+    so they cannot hold up the rest. A full queue blocks producers for up
+    to ``put_timeout`` seconds (backpressure).
+    """
+
+    def __init__(self, write_batch, dead_letter, max_queue=10000, batch_size=100, flush_interval=0.5,
+                 put_timeout=2.0, retry_delay=1.0):
+        self.write_batch = write_batch
+        self.dead_letter = dead_letter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_seen = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.written = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_seen = False
+            self._thread = threading.Thread(target=self._run, name='access-event-writer', daemon=True)
+            self._thread.start()
+        logger.info("Access event writer started")
+
+    def submit(self, event, block=True):
+        # block=False for callers that must not stall, such as an event loop
+        try:
+            self._queue.put(event, block=block, timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += 1
+            logger.error(f"Event queue full, could not record event for RFID: {event.rfid}")
+            return False
+        self.submitted += 1
+        return True
+
+    def submit_many(self, events):
+        # The events stay together and are written in the same batch
+        events = list(events)
+        if not events:
+            return True
+        try:
+            self._queue.put(events, timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += len(events)
+            logger.error(f"Event queue full, could not record {len(events)} batched events")
+            return False
+        self.submitted += len(events)
+        return True
+
+    def _next_batch(self, first):
+        batch = list(first) if isinstance(first, list) else [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Flush what we have, then let _run see the stop request
+                self._stop_seen = True
+                break
+            if isinstance(item, list):
+                batch.extend(item)
+            else:
+                batch.append(item)
+        return batch
+
+    def _dead_letter(self, events, error):
+        self.dead_lettered += len(events)
+        self.dead_letter(events, error)
+
+    def _write(self, batch, attempts=None):
+        while True:
+            written, batch = write_isolating(self.write_batch, batch, self._dead_letter)
+            self.written += written
+            if not batch:
+                return
+            self.failed_batches += 1
+            if attempts is not None:
+                attempts -= 1
+                if attempts <= 0:
+                    logger.error(f"Dropping {len(batch)} access events at shutdown")
+                    return
+            time.sleep(self.retry_delay)
+
+    def _run(self):
+        while not self._stop_seen:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            self._write(self._next_batch(item))
+
+        # Flush-on-shutdown: drain whatever producers managed to enqueue
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, list):
+                remaining.extend(item)
+            elif item is not _STOP:
+                remaining.append(item)
+        for i in range(0, len(remaining), self.batch_size):
+            self._write(remaining[i:i + self.batch_size], attempts=3)
+
+    def stop(self, timeout=10.0):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if not thread:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        logger.info(f"Access event writer stopped ({self.written} events written)")
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'queue_max': self._queue.maxsize,
+            'submitted': self.submitted,
+            'written': self.written,
+            'rejected': self.rejected,
+            'failed_batches': self.failed_batches,
+            'dead_lettered': self.dead_lettered,
+        }
@@ -0,0 +1,355 @@
+import logging
+
+import numpy as np
+
+from models.face_store import ENCODING_SIZE
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = logging.getLogger('rfid_server.faces')
+
+# 'auto' stays exact below this many known faces, brute force is faster there
+ANN_MIN_SIZE = 10000
+# Queries or rows per block, bounds the temporary distance matrices
+BLOCK_SIZE = 4096
+
+
+def as_matrix(encodings):
+    return np.ascontiguousarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+
+
+def unique_keys(keys, encodings):
+    # A key given twice in one batch keeps its last encoding, like two adds would
+    rows = {key: row for row, key in enumerate(keys)}
+    if len(rows) == len(keys):
+        return keys, encodings
+    return list(rows), encodings[list(rows.values())]
+
+
+def squared_norms(matrix):
+    return np.einsum('ij,ij->i', matrix, matrix)
+
+
+def squared_distances(queries, matrix, norms):
+    # |q|^2 + |k|^2 - 2 q.k, one matrix product for all pairs
+    squared = squared_norms(queries)[:, None] + norms[None, :]
+    squared -= 2.0 * (queries @ matrix.T)
+    # Rounding can leave tiny negatives for identical encodings
+    np.maximum(squared, 0.0, out=squared)
+    return squared
+
+
+def nearest(squared, k):
+    """Column indices and distances of the ``k`` smallest entries per row, nearest first."""
+    k = min(k, squared.shape[1])
+    if k == 0:
+        return np.empty((squared.shape[0], 0), dtype=np.intp), np.empty((squared.shape[0], 0))
+    if k < squared.shape[1]:
+        indices = np.argpartition(squared, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(squared.shape[1]), squared.shape)
+    values = np.take_along_axis(squared, indices, axis=1)
+    order = np.argsort(values, axis=1)
+    return np.take_along_axis(indices, order, axis=1), np.sqrt(np.take_along_axis(values, order, axis=1))
+
+
+class ExactIndex:
+    """Brute-force search over a contiguous float32 matrix with precomputed norms.
+
+    Also the verification reference for the approximate indexes, and the
+    building block of each IVF list.
+    """
+
+    kind = 'exact'
+
+    def __init__(self):
+        self.keys = []
+        self.matrix = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def add(self, keys, encodings):
+        keys = list(keys)
+        if not keys:
+            return
+        keys, encodings = unique_keys(keys, as_matrix(encodings))
+        self.remove(key for key in keys if key in self._rows)
+        self._rows.update((key, len(self.keys) + i) for i, key in enumerate(keys))
+        self.keys.extend(keys)
+        self.matrix = np.concatenate([self.matrix, encodings])
+        self.norms = np.concatenate([self.norms, squared_norms(encodings)])
+
+    def remove(self, keys):
+        rows = [self._rows[key] for key in keys if key in self._rows]
+        if not rows:
+            return
+        keep = np.ones(len(self.keys), dtype=bool)
+        keep[rows] = False
+        self.keys = [key for key, kept in zip(self.keys, keep) if kept]
+        self.matrix = np.ascontiguousarray(self.matrix[keep])
+        self.norms = self.norms[keep]
+        self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    def encoding(self, key):
+        return self.matrix[self._rows[key]]
+
+    def distances(self, queries):
+        return np.sqrt(squared_distances(as_matrix(queries), self.matrix, self.norms))
+
+    def search(self, queries, k=1):
+        """Up to ``k`` ``(key, distance)`` pairs per query, nearest first."""
+        queries = as_matrix(queries)
+        results = []
+        for start in range(0, len(queries), BLOCK_SIZE):
+            block = squared_distances(queries[start:start + BLOCK_SIZE], self.matrix, self.norms)
+            indices, distances = nearest(block, k)
+            for row_indices, row_distances in zip(indices, distances):
+                results.append([(self.keys[i], float(d)) for i, d in zip(row_indices, row_distances)])
+        return results
+
+    def stats(self):
+        return {'kind': self.kind, 'size': len(self)}
+
+
+def kmeans(matrix, clusters, iterations=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = matrix[rng.choice(len(matrix), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = assign(matrix, centroids)
+        for cluster in range(clusters):
+            members = matrix[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+    return centroids
+
+
+def assign(matrix, centroids, probes=1):
+    # Nearest ``probes`` centroids per row, computed in blocks
+    norms = squared_norms(centroids)
+    result = []
+    for start in range(0, len(matrix), BLOCK_SIZE):
+        indices, _ = nearest(squared_distances(matrix[start:start + BLOCK_SIZE], centroids, norms), probes)
+        result.append(indices)
+    if not result:
+        return np.empty((0,) if probes == 1 else (0, probes), dtype=np.intp)
+    result = np.concatenate(result)
+    return result[:, 0] if probes == 1 else result
+
+
+class IVFIndex:
+    """Inverted-file index in plain NumPy.
+
+    Encodings are split over ``nlist`` k-means cells and a query only
+    scans the ``nprobe`` cells nearest to it. Until there are enough
+    encodings to train on it is a single exact list; it retrains itself
+    once the gallery has doubled since the last training, so incremental
+    adds keep the cells balanced.
+    """
+
+    kind = 'ivf'
+
+    def __init__(self, nlist=None, nprobe=8, min_train_size=1024):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+
+        self.centroids = None
+        self.lists = [ExactIndex()]
+        self._cell = {}
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._cell)
+
+    def __contains__(self, key):
+        return key in self._cell
+
+    def add(self, keys, encodings):
+        keys = list(keys)
+        if not keys:
+            return
+        keys, encodings = unique_keys(keys, as_matrix(encodings))
+        self.remove(key for key in keys if key in self._cell)
+
+        if len(self) + len(keys) >= max(self.min_train_size, 2 * self._trained_size):
+            all_keys, all_encodings = self._contents()
+            self._train(all_keys + keys, np.concatenate([all_encodings, encodings]))
+            return
+
+        cells = assign(encodings, self.centroids) if self.centroids is not None else np.zeros(len(keys), dtype=np.intp)
+        for cell in np.unique(cells):
+            members = np.flatnonzero(cells == cell)
+            self.lists[cell].add([keys[i] for i in members], encodings[members])
+            self._cell.update((keys[i], cell) for i in members)
+
+    def remove(self, keys):
+        by_cell = {}
+        for key in keys:
+            cell = self._cell.pop(key, None)
+            if cell is not None:
+                by_cell.setdefault(cell, []).append(key)
+        for cell, cell_keys in by_cell.items():
+            self.lists[cell].remove(cell_keys)
+
+    def _contents(self):
+        keys = [key for cell in self.lists for key in cell.keys]
+        matrix = np.concatenate([cell.matrix for cell in self.lists])
+        return keys, matrix
+
+    def _train(self, keys, matrix):
+        # About sqrt(N) cells, the usual balance between coarse and fine cost
+        clusters = self.nlist or max(1, int(np.sqrt(len(keys))))
+        clusters = min(clusters, len(keys))
+        sample = matrix
+        if len(matrix) > 64 * clusters:
+            sample = matrix[np.random.default_rng(0).choice(len(matrix), 64 * clusters, replace=False)]
+        self.centroids = kmeans(sample, clusters)
+
+        cells = assign(matrix, self.centroids)
+        self.lists = [ExactIndex() for _ in range(clusters)]
+        self._cell = {}
+        for cell in range(clusters):
+            members = np.flatnonzero(cells == cell)
+            self.lists[cell].add([keys[i] for i in members], matrix[members])
+            self._cell.update((keys[i], cell) for i in members)
+        self._trained_size = len(keys)
+
+    def search(self, queries, k=1):
+        queries = as_matrix(queries)
+        if self.centroids is None:
+            return self.lists[0].search(queries, k)
+        probes = assign(queries, self.centroids, min(self.nprobe, len(self.lists)))
+        if probes.ndim == 1:
+            probes = probes[:, None]
+
+        # One matrix product per probed cell, for all the queries probing it
+        candidates = [[] for _ in range(len(queries))]
+        for cell in np.unique(probes):
+            cell_index = self.lists[cell]
+            if not len(cell_index):
+                continue
+            rows = np.flatnonzero((probes == cell).any(axis=1))
+            squared = squared_distances(queries[rows], cell_index.matrix, cell_index.norms)
+            indices, distances = nearest(squared, k)
+            for row, row_indices, row_distances in zip(rows, indices, distances):
+                candidates[row].extend((cell_index.keys[i], float(d)) for i, d in zip(row_indices, row_distances))
+
+        results = []
+        for matches in candidates:
+            matches.sort(key=lambda item: item[1])
+            results.append(matches[:k])
+        return results
+
+    def stats(self):
+        sizes = [len(cell) for cell in self.lists]
+        return {
+            'kind': self.kind,
+            'size': len(self),
+            'lists': len(self.lists),
+            'nprobe': self.nprobe,
+            'largest_list': max(sizes) if sizes else 0,
+            'trained_size': self._trained_size,
+        }
+
+
+class HNSWIndex:
+    """Graph index backed by hnswlib (optional dependency).
+
+    Removed keys are only marked deleted; their slots are reused by later
+    adds. The element capacity grows by doubling.
+    """
+
+    kind = 'hnsw'
+
+    def __init__(self, m=16, ef_construction=200, ef=64, capacity=1024):
+        if hnswlib is None:
+            raise RuntimeError("hnswlib is not installed")
+        self.ef = ef
+        self.index = hnswlib.Index(space='l2', dim=ENCODING_SIZE)
+        self.index.init_index(max_elements=capacity, M=m, ef_construction=ef_construction, allow_replace_deleted=True)
+        self.index.set_ef(ef)
+
+        self._labels = {}
+        self._keys = {}
+        self._next_label = 0
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, key):
+        return key in self._labels
+
+    def add(self, keys, encodings):
+        keys = list(keys)
+        if not keys:
+            return
+        keys, encodings = unique_keys(keys, as_matrix(encodings))
+        self.remove(key for key in keys if key in self._labels)
+
+        needed = self.index.get_current_count() + len(keys)
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, 2 * self.index.get_max_elements()))
+
+        labels = np.arange(self._next_label, self._next_label + len(keys))
+        self._next_label += len(keys)
+        self.index.add_items(encodings, labels, replace_deleted=True)
+        for key, label in zip(keys, labels.tolist()):
+            self._labels[key] = label
+            self._keys[label] = key
+
+    def remove(self, keys):
+        for key in list(keys):
+            label = self._labels.pop(key, None)
+            if label is not None:
+                del self._keys[label]
+                self.index.mark_deleted(label)
+
+    def search(self, queries, k=1):
+        queries = as_matrix(queries)
+        k = min(k, len(self))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        # ef must be at least k for hnswlib to return k results
+        self.index.set_ef(max(self.ef, k))
+        labels, squared = self.index.knn_query(queries, k=k)
+        return [
+            [(self._keys[label], float(np.sqrt(max(value, 0.0)))) for label, value in zip(row_labels, row_squared)]
+            for row_labels, row_squared in zip(labels.tolist(), squared)
+        ]
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'size': len(self),
+            'capacity': self.index.get_max_elements(),
+            'ef': self.ef,
+        }
+
+
+INDEX_KINDS = {
+    'exact': ExactIndex,
+    'ivf': IVFIndex,
+    'hnsw': HNSWIndex,
+}
+
+
+def make_index(kind='auto', size=0):
+    """Index for ``size`` known faces; 'auto' picks exact, then hnsw if installed, else ivf."""
+    if kind == 'auto':
+        if size < ANN_MIN_SIZE:
+            kind = 'exact'
+        else:
+            kind = 'hnsw' if hnswlib is not None else 'ivf'
+    elif kind == 'hnsw' and hnswlib is None:
+        logger.warning("hnswlib is not installed, using the IVF index")
+        kind = 'ivf'
+    return INDEX_KINDS[kind]()
@@ -0,0 +1,115 @@
+import hashlib
+
+from models.face_index import ExactIndex, make_index, as_matrix
+
+# Same default as face_recognition.compare_faces
+DEFAULT_TOLERANCE = 0.6
+
+
+def face_key(name, encoding):
+    # Stable per photo: a changed photo gets a new key, its old one is removed
+    return f"{name}/{hashlib.sha1(encoding.tobytes()).hexdigest()[:16]}"
+
+
+class FaceMatcher:
+    """Matches face encodings against the known set in one batched computation.
+
+    The known encodings are kept in an exact index (one contiguous float32
+    matrix with precomputed norms, so all faces of a frame are matched in a
+    single matrix product) and, for large galleries, an approximate one
+    (see ``models.face_index``) that answers the queries. With ``verify``,
+    a face the approximate index finds no match for is searched again
+    exactly, so an index miss never turns away a known employee.
+
+    With ``index='auto'`` the choice is made again after each ``update``,
+    so a gallery that grows past ``ANN_MIN_SIZE`` moves to the approximate
+    index on the next resync.
+    """
+
+    def __init__(self, names, encodings, tolerance=DEFAULT_TOLERANCE, index='auto', verify=True):
+        self.tolerance = tolerance
+        self.verify = verify
+        self.exact = ExactIndex()
+        self.names = {}
+        self._add(names, encodings)
+
+        self.index_kind = index
+        self.index = self.exact
+        self._choose_index()
+
+        self.verified = 0
+        self.recovered = 0
+
+    def __len__(self):
+        return len(self.exact)
+
+    def _choose_index(self):
+        # Only ever moves off the exact index; an approximate one keeps its updates
+        if self.index_kind == 'exact' or self.index is not self.exact:
+            return
+        ann = make_index(self.index_kind, len(self.exact))
+        if ann.kind != 'exact':
+            ann.add(self.exact.keys, self.exact.matrix)
+            self.index = ann
+
+    def _add(self, names, encodings):
+        encodings = as_matrix(encodings)
+        keys = [face_key(name, encoding) for name, encoding in zip(names, encodings)]
+        self.names.update(zip(keys, names))
+        self.exact.add(keys, encodings)
+        return keys, encodings
+
+    def update(self, names, encodings):
+        """Apply enrolment changes: add new encodings, drop the ones no longer present."""
+        encodings = as_matrix(encodings)
+        wanted = {face_key(name, encoding): (name, row) for row, (name, encoding) in enumerate(zip(names, encodings))}
+        removed = [key for key in self.names if key not in wanted]
+        added = [key for key in wanted if key not in self.names]
+        if removed:
+            self.exact.remove(removed)
+            if self.index is not self.exact:
+                self.index.remove(removed)
+            for key in removed:
+                del self.names[key]
+        if added:
+            rows = [wanted[key][1] for key in added]
+            keys, added_encodings = self._add([wanted[key][0] for key in added], encodings[rows])
+            if self.index is not self.exact:
+                self.index.add(keys, added_encodings)
+            self._choose_index()
+        return len(added), len(removed)
+
+    def distances(self, queries):
+        """Exact Euclidean distances, one row per query and one column per known face."""
+        return self.exact.distances(queries)
+
+    def top_k(self, queries, k=1):
+        """Up to ``k`` ``(name, distance)`` pairs per query, nearest first."""
+        return [[(self.names[key], distance) for key, distance in matches] for matches in self.index.search(queries, k)]
+
+    def identify(self, queries, tolerance=None):
+        """Best match per query as ``(name, distance)``; name is None above the tolerance."""
+        tolerance = self.tolerance if tolerance is None else tolerance
+        if not len(queries):
+            return []
+        if not len(self):
+            return [(None, None)] * len(queries)
+
+        queries = as_matrix(queries)
+        results = [matches[0] if matches else (None, None) for matches in self.top_k(queries, 1)]
+        misses = [i for i, (_, distance) in enumerate(results) if distance is None or distance > tolerance]
+        if self.verify and misses and self.index is not self.exact:
+            self.verified += len(misses)
+            for i, matches in zip(misses, self.exact.search(queries[misses], 1)):
+                key, distance = matches[0]
+                if distance <= tolerance:
+                    self.recovered += 1
+                results[i] = (self.names[key], distance)
+
+        return [(name if distance is not None and distance <= tolerance else None, distance)
+                for name, distance in results]
+
+    def stats(self):
+        stats = self.index.stats()
+        stats.update({'verified': self.verified, 'recovered': self.recovered})
+        return stats
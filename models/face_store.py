@@ -0,0 +1,131 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+logger = logging.getLogger('rfid_server.faces')
+
+ENCODING_SIZE = 128
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FaceEncodingStore:
+    """On-disk cache of face encodings, one per photo in the faces directory.
+
+    The encodings are a raw float32 matrix file (one 128-d row per face)
+    that is memory-mapped on load; ``index.json`` names the current matrix
+    file and maps each photo to its row, with the size, mtime and SHA-1 it
+    was encoded from. ``sync`` only encodes photos that are new or whose
+    content changed, so startup cost does not grow with the number of
+    enrolled employees.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+
+        self.encoded = 0
+        self.reused = 0
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self):
+        """Return ``(names, encodings)`` as stored, without looking at the photos."""
+        index = self._load_index()
+        names = index.get('names', [])
+        matrix_path = os.path.join(self.directory, index.get('matrix', ''))
+        if not names or not os.path.isfile(matrix_path):
+            return [], np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        encodings = np.memmap(matrix_path, dtype=np.float32, mode='r', shape=(len(names), ENCODING_SIZE))
+        return names, encodings
+
+    def sync(self, faces_dir, encode):
+        """Bring the store in line with ``faces_dir`` and return ``(names, encodings)``.
+
+        ``encode(path)`` returns the face encoding of a photo, or None when
+        no face is found; such photos are remembered and not retried until
+        they change.
+        """
+        index = self._load_index()
+        old_files = index.get('files', {})
+        _, old_encodings = self.load()
+
+        files = {}
+        rows = []
+        names = []
+        changed = False
+        for filename in sorted(os.listdir(faces_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(faces_dir, filename)
+            stat = os.stat(path)
+            entry = old_files.get(filename)
+
+            # Same size and mtime: trusted without reading the file
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                sha1 = entry['sha1']
+            else:
+                sha1 = file_sha1(path)
+                changed = True
+
+            if entry and entry['sha1'] == sha1 and (entry['row'] is None or entry['row'] < len(old_encodings)):
+                encoding = None if entry['row'] is None else old_encodings[entry['row']]
+                self.reused += 1
+            else:
+                try:
+                    encoding = encode(path)
+                except Exception as e:
+                    logger.error(f"Error loading {filename}: {str(e)}")
+                    continue
+                if encoding is None:
+                    logger.warning(f"No face found in {filename}")
+                self.encoded += 1
+                changed = True
+
+            row = None
+            if encoding is not None:
+                row = len(rows)
+                # A copy, the old matrix is unmapped before the new one is written
+                rows.append(np.array(encoding, dtype=np.float32))
+                names.append(os.path.splitext(filename)[0])
+            files[filename] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': sha1, 'row': row}
+
+        old_encodings = None
+        if changed or set(files) != set(old_files):
+            self._write(index.get('matrix'), files, names, rows)
+        return self.load()
+
+    def _write(self, old_matrix, files, names, rows):
+        os.makedirs(self.directory, exist_ok=True)
+        matrix = np.vstack(rows) if rows else np.empty((0, ENCODING_SIZE), dtype=np.float32)
+
+        # A new matrix file, then the index that points to it: replacing the
+        # index is the commit, a crash in between leaves the old pair intact
+        matrix_name = f"encodings-{hashlib.sha1(matrix.tobytes()).hexdigest()[:16]}.f32"
+        matrix.tofile(os.path.join(self.directory, matrix_name))
+
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'matrix': matrix_name, 'names': names, 'files': files}, f)
+        os.replace(temp_path, self.index_path)
+
+        if old_matrix and old_matrix != matrix_name:
+            try:
+                os.remove(os.path.join(self.directory, old_matrix))
+            except OSError:
+                # Still mapped somewhere (Windows); removed on a later sync
+                pass
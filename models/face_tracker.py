@@ -0,0 +1,124 @@
+import cv2
+
+# Template match score below which a track is considered lost for the frame
+MIN_MATCH_SCORE = 0.5
+# Search window around the previous box, as a fraction of the box size
+SEARCH_MARGIN = 0.5
+
+
+def iou(a, b):
+    # Boxes are (top, right, bottom, left) like face_recognition's locations
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+class Track:
+    __slots__ = ('id', 'box', 'template', 'encoded_box', 'name', 'distance', 'misses')
+
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.box = box
+        self.template = None
+        # Box the current identity was computed from; None until encoded
+        self.encoded_box = None
+        self.name = None
+        self.distance = None
+        self.misses = 0
+
+
+class FaceTracker:
+    """Keeps face boxes alive between detections on the downscaled frame.
+
+    ``detect`` matches fresh detections to the existing tracks by overlap;
+    on the frames in between ``follow`` moves each box by template
+    matching in a small window around it, which costs a fraction of a
+    detection. A track only needs encoding when it is new or its box has
+    drifted away from the one it was last encoded at.
+    """
+
+    def __init__(self, match_iou=0.3, drift_iou=0.6, max_misses=2):
+        self.match_iou = match_iou
+        self.drift_iou = drift_iou
+        self.max_misses = max_misses
+
+        self.tracks = []
+        self._next_id = 0
+
+        self.created = 0
+        self.lost = 0
+
+    def detect(self, gray, boxes):
+        unmatched = list(range(len(self.tracks)))
+        tracks = []
+        for box in boxes:
+            best, best_iou = None, self.match_iou
+            for i in unmatched:
+                overlap = iou(self.tracks[i].box, box)
+                if overlap >= best_iou:
+                    best, best_iou = i, overlap
+            if best is None:
+                track = Track(self._next_id, box)
+                self._next_id += 1
+                self.created += 1
+            else:
+                unmatched.remove(best)
+                track = self.tracks[best]
+                track.box = box
+                track.misses = 0
+            # No frame when the caller only associates detections, without follow
+            track.template = self._crop(gray, box) if gray is not None else None
+            tracks.append(track)
+
+        # Tracks the detector did not see this time are dropped
+        self.lost += len(unmatched)
+        self.tracks = tracks
+
+    def follow(self, gray):
+        height, width = gray.shape[:2]
+        for track in self.tracks:
+            template = track.template
+            if template is None or not template.size:
+                track.misses += 1
+                continue
+            top, right, bottom, left = track.box
+            margin_y = int((bottom - top) * SEARCH_MARGIN)
+            margin_x = int((right - left) * SEARCH_MARGIN)
+            y0, y1 = max(0, top - margin_y), min(height, bottom + margin_y)
+            x0, x1 = max(0, left - margin_x), min(width, right + margin_x)
+            window = gray[y0:y1, x0:x1]
+            if window.shape[0] < template.shape[0] or window.shape[1] < template.shape[1]:
+                track.misses += 1
+                continue
+
+            _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED))
+            if score < MIN_MATCH_SCORE:
+                track.misses += 1
+                continue
+            track.box = (y0 + y, x0 + x + template.shape[1], y0 + y + template.shape[0], x0 + x)
+            track.misses = 0
+
+        kept = [track for track in self.tracks if track.misses <= self.max_misses]
+        self.lost += len(self.tracks) - len(kept)
+        self.tracks = kept
+
+    def needs_encoding(self, retry_unknown=False):
+        # retry_unknown: also unmatched faces, whose first encoding may have been a poor view
+        return [
+            track for track in self.tracks
+            if track.encoded_box is None or iou(track.encoded_box, track.box) < self.drift_iou
+            or (retry_unknown and track.name is None)
+        ]
+
+    @staticmethod
+    def _crop(gray, box):
+        top, right, bottom, left = box
+        return gray[max(0, top):bottom, max(0, left):right].copy()
+
+    def stats(self):
+        return {'tracks': len(self.tracks), 'created': self.created, 'lost': self.lost}
@@ -0,0 +1,245 @@
+import os
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger('rfid_server.faces')
+
+# Frames waiting for a worker; beyond this the oldest one is dropped
+FRAME_QUEUE_SIZE = 4
+
+# Worker process state, set by _attach
+_shm = None
+_frames = None
+_scale = None
+
+
+class SharedFrameRing:
+    """Fixed set of frame slots in one shared memory block.
+
+    The capture thread reads straight into a slot and worker processes map
+    the same block, so a frame crosses process boundaries as a slot number
+    instead of a pickled array.
+    """
+
+    def __init__(self, slots, shape):
+        self.shape = tuple(shape)
+        size = int(np.prod(self.shape)) * slots
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.free = deque(range(slots))
+
+    def close(self):
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A frame view is still referenced; the mapping goes away with it
+            pass
+        self.shm.unlink()
+
+
+def _attach(name, slots, shape, scale):
+    global _shm, _frames, _scale
+    try:
+        # The block belongs to the parent, a worker must not unlink it on exit
+        _shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        _shm = shared_memory.SharedMemory(name=name)
+    _frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=_shm.buf)
+    _scale = scale
+
+
+def detect_and_encode(slot, seq):
+    """Worker stage: detect on the downscaled frame, encode at full resolution.
+
+    Returns ``(slot, seq, locations, encodings)`` with locations in
+    full-frame coordinates.
+    """
+    import face_recognition
+
+    frame = _frames[slot]
+    height, width = frame.shape[:2]
+    try:
+        small = cv2.resize(frame, (0, 0), fx=_scale, fy=_scale)
+        boxes = face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        if not boxes:
+            return slot, seq, [], []
+        locations = [
+            (max(0, int(top / _scale)), min(width, int(right / _scale)),
+             min(height, int(bottom / _scale)), max(0, int(left / _scale)))
+            for top, right, bottom, left in boxes
+        ]
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        encodings = face_recognition.face_encodings(rgb_frame, locations, num_jitters=1)
+        return slot, seq, locations, encodings
+    except Exception as e:
+        logger.error(f"Error in face recognition: {str(e)}")
+        return slot, seq, [], []
+
+
+class FramePipeline:
+    """Capture thread -> bounded frame queue -> process pool -> consumer.
+
+    The capture thread never waits for the workers: when the queue is full
+    the oldest frame is dropped and its slot reused, so the consumer always
+    gets recent frames. Up to ``workers`` frames are detected and encoded
+    in parallel; ``results`` yields them in capture order, skipping any
+    that finish after a newer frame was already shown.
+    """
+
+    def __init__(self, source=0, workers=None, queue_size=FRAME_QUEUE_SIZE, detection_scale=0.25):
+        self.source = source
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size
+        self.detection_scale = detection_scale
+
+        self.capture = None
+        self.ring = None
+        self.pool = None
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._thread = None
+        self.error = None
+
+        self.captured = 0
+        self.dropped = 0
+        self.processed = 0
+        self.stale = 0
+
+    def start(self):
+        self.capture = cv2.VideoCapture(self.source)
+        if not self.capture.isOpened():
+            raise RuntimeError("Could not open webcam.")
+        ret, frame = self.capture.read()
+        if not ret:
+            raise RuntimeError("Failed to capture frame from webcam.")
+
+        # Queued + in the workers + shown by the consumer + being captured
+        slots = self.queue_size + self.workers + 2
+        self.ring = SharedFrameRing(slots, frame.shape)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_attach,
+            initargs=(self.ring.shm.name, slots, frame.shape, self.detection_scale),
+        )
+        self._thread = threading.Thread(target=self._capture_loop, name='frame-capture', daemon=True)
+        self._thread.start()
+
+    def _take_slot(self):
+        with self._lock:
+            while not self._stopped.is_set():
+                if self.ring.free:
+                    return self.ring.free.popleft()
+                if self._pending:
+                    # Under load: give up the oldest queued frame
+                    slot, _ = self._pending.popleft()
+                    self.dropped += 1
+                    return slot
+                # Every slot is with a worker or the consumer
+                self._ready.wait(0.05)
+        return None
+
+    def _capture_loop(self):
+        seq = 0
+        while not self._stopped.is_set():
+            slot = self._take_slot()
+            if slot is None:
+                break
+            # Decodes into the shared slot, no intermediate frame
+            target = self.ring.frames[slot]
+            ret, image = self.capture.read(target)
+            if ret and image.ctypes.data != target.ctypes.data:
+                target[:] = image
+            with self._lock:
+                if not ret:
+                    self.ring.free.append(slot)
+                    self.error = "Failed to capture frame from webcam."
+                    self._stopped.set()
+                    self._ready.notify_all()
+                    break
+                self._pending.append((slot, seq))
+                while len(self._pending) > self.queue_size:
+                    old_slot, _ = self._pending.popleft()
+                    self.ring.free.append(old_slot)
+                    self.dropped += 1
+                self.captured += 1
+                self._ready.notify_all()
+            seq += 1
+
+    def _release(self, slot):
+        with self._lock:
+            self.ring.free.append(slot)
+            self._ready.notify_all()
+
+    def results(self):
+        """Yield ``(frame, locations, encodings)``; the frame is valid until the next one is requested."""
+        in_flight = set()
+        last_seq = -1
+        shown = None
+        try:
+            while True:
+                with self._lock:
+                    while len(in_flight) < self.workers and self._pending:
+                        slot, seq = self._pending.popleft()
+                        in_flight.add(self.pool.submit(detect_and_encode, slot, seq))
+                    if not in_flight:
+                        # Stopped and every captured frame handed out
+                        if self._stopped.is_set():
+                            break
+                        self._ready.wait(0.05)
+                        continue
+
+                done, in_flight = wait(in_flight, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda f: f.result()[1]):
+                    slot, seq, locations, encodings = future.result()
+                    self.processed += 1
+                    if seq < last_seq:
+                        self.stale += 1
+                        self._release(slot)
+                        continue
+                    if shown is not None:
+                        self._release(shown)
+                    shown, last_seq = slot, seq
+                    yield self.ring.frames[slot], locations, encodings
+        finally:
+            for future in in_flight:
+                try:
+                    self._release(future.result()[0])
+                except Exception:
+                    pass
+            if shown is not None:
+                self._release(shown)
+
+    def stop(self):
+        self._stopped.set()
+        with self._lock:
+            self._ready.notify_all()
+
+    def close(self):
+        self.stop()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.pool:
+            self.pool.shutdown(wait=True)
+        if self.capture:
+            self.capture.release()
+        if self.ring:
+            self.ring.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queued': len(self._pending),
+                'captured': self.captured,
+                'dropped': self.dropped,
+                'processed': self.processed,
+                'stale': self.stale,
+            }
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Id of the request being handled, set by the server's request hooks
+request_id = contextvars.ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    # Runs on the logging thread of the caller, before the record is queued
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, pid, message, request_id and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SizedTimedRotatingFileHandler(RotatingFileHandler):
+    """Rotates when the file reaches ``max_bytes`` or every ``interval`` seconds, whichever comes first."""
+
+    def __init__(self, filename, max_bytes, backup_count, interval=86400):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval = interval
+        self.rollover_at = time.time() + interval
+
+    def shouldRollover(self, record):
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class DroppingQueueHandler(QueueHandler):
+    # A full queue drops the record instead of stalling the request thread
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    # "rfid_server=INFO,rfid_server.writer=DEBUG" -> {'rfid_server': 'INFO', ...}
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.strip().rpartition('=')
+        if level:
+            levels[name or 'rfid_server'] = level.upper()
+    return levels
+
+
+class LogPipeline:
+    """Logging that keeps file and console I/O off the request threads.
+
+    Loggers under ``root_logger`` only put records on a bounded queue; a
+    listener thread formats them and writes JSON lines to a rotating file
+    and plain text to the console. ``start`` must be called again after a
+    fork, since the listener thread does not survive it.
+
+    With ``per_process`` every process writes and rotates its own file,
+    ``path`` with the pid before the extension (rfid_server-1234.log):
+    gunicorn workers, their master and the GUI would otherwise rotate one
+    file under each other and lose records.
+    """
+
+    def __init__(self, path, root_logger='rfid_server', max_bytes=10 * 1024 * 1024, backup_count=5,
+                 rotate_interval=86400, max_queue=10000, console_level='INFO', per_process=True):
+        self.base_path = path
+        self.per_process = per_process
+        self.path = path
+        self.root_logger = root_logger
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_interval = rotate_interval
+        self.max_queue = max_queue
+        self.console_level = console_level
+
+        self._handler = None
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _process_path(self):
+        if not self.per_process:
+            return self.base_path
+        base, extension = os.path.splitext(self.base_path)
+        return f"{base}-{os.getpid()}{extension}"
+
+    def _output_handlers(self):
+        self.path = self._process_path()
+        file_handler = SizedTimedRotatingFileHandler(
+            self.path, self.max_bytes, self.backup_count, self.rotate_interval
+        )
+        file_handler.setFormatter(JsonFormatter())
+
+        console = logging.StreamHandler()
+        console.setLevel(self.console_level)
+        console.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        return file_handler, console
+
+    def start(self, levels=None):
+        with self._lock:
+            if self._listener and self._pid == os.getpid():
+                return
+            # A fresh queue as well: one inherited through fork may hold a stale lock
+            log_queue = queue.Queue(maxsize=self.max_queue)
+            logger = logging.getLogger(self.root_logger)
+            if self._handler is None:
+                self._handler = DroppingQueueHandler(log_queue)
+                self._handler.addFilter(RequestIdFilter())
+                logger.addHandler(self._handler)
+                logger.setLevel(logging.DEBUG)
+                atexit.register(self.stop)
+            else:
+                self._handler.queue = log_queue
+
+            self._listener = QueueListener(log_queue, *self._output_handlers(), respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+        self.set_levels(levels or {})
+
+    def set_levels(self, levels):
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+    def stop(self):
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener and self._pid == os.getpid():
+            # Drains what is queued before closing the file
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'queued': self._handler.queue.qsize() if self._handler else 0,
+            'dropped': self._handler.dropped if self._handler else 0,
+            'levels': {
+                name: logging.getLevelName(logger.level)
+                for name, logger in logging.Logger.manager.loggerDict.items()
+                if isinstance(logger, logging.Logger) and name.startswith(self.root_logger) and logger.level
+            },
+        }
@@ -0,0 +1,159 @@
+import time
+import bisect
+import threading
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow commits
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets, one series per label set."""
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        names = self.labelnames + ('le',)
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter per label set.
+
+    At most ``max_series`` label sets are tracked (readers are counted by
+    address, which a client controls); later ones are counted under "other".
+    """
+
+    def __init__(self, name, help, labelnames=(), max_series=1000):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            if labels not in self._values and len(self._values) >= self.max_series:
+                labels = ('other',) * len(labels)
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class StatsGauges:
+    """Exposes the numeric fields of a ``stats()`` dict as gauges named ``prefix_field``."""
+
+    def __init__(self, prefix, help, stats):
+        self.prefix = prefix
+        self.help = help
+        self.stats = stats
+
+    def render(self):
+        lines = []
+        for field, value in self.stats().items():
+            value = _number(value)
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{field}"
+            lines.append(f"# HELP {name} {self.help}: {field}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collects metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, labelnames=(), max_series=1000):
+        return self.register(Counter(name, help, labelnames, max_series))
+
+    def stats_gauges(self, prefix, help, stats):
+        return self.register(StatsGauges(prefix, help, stats))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the access-control server process
+metrics = MetricsRegistry()
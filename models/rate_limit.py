@@ -0,0 +1,57 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """Token bucket per key (reader address, badge UID, ...).
+
+    Each key may spend ``burst`` requests at once and then ``rate`` per
+    second. At most ``max_keys`` buckets are kept; the least recently used
+    one is dropped first, which at worst gives that key a fresh bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, last refill), least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def allow(self, key, cost=1):
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            return allowed
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'keys': len(self._buckets),
+                'max_keys': self.max_keys,
+                'allowed': self.allowed,
+                'limited': self.limited,
+                'evicted': self.evicted,
+            }
@@ -0,0 +1,257 @@
+import os
+import time
+import logging
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+logger = logging.getLogger('rfid_server.cache')
+
+# Where out-of-process writers (the HR GUI) send invalidations
+RFID_SERVER_URL = os.environ.get('RFID_SERVER_URL', 'http://127.0.0.1:3000')
+
+
+class AuthorizationCache:
+    """In-process RFID -> employee cache with TTL and LRU eviction.
+
+    Unknown badges are cached too (negative entries, shorter TTL). An expired
+    entry is still served while a background refresh is in flight, so a slow
+    database never stalls a badge decision for a card we have seen before.
+    """
+
+    def __init__(self, max_size=10000, ttl=300.0, negative_ttl=30.0, loader=None):
+        # loader(rfid) returns the employee dict or None; it must manage its
+        # own connection because background refreshes run on their own thread
+        self.loader = loader
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        # rfid -> (employee or None, expires_at)
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # Bumped on invalidation so a load that raced with it is not stored
+        self._generation = 0
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _store(self, rfid, employee):
+        ttl = self.ttl if employee is not None else self.negative_ttl
+        self._entries[rfid] = (employee, time.monotonic() + ttl)
+        self._entries.move_to_end(rfid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, rfid, employee, generation=None):
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._store(rfid, employee)
+
+    def warm(self, employees):
+        count = 0
+        with self._lock:
+            for employee in employees:
+                self._store(employee['rfid'], employee)
+                count += 1
+        logger.info(f"Authorization cache warmed with {count} employees")
+        return count
+
+    def _cached(self, rfid):
+        # Caller holds the lock; returns (found, employee)
+        entry = self._entries.get(rfid)
+        if entry is not None:
+            employee, expires_at = entry
+            self._entries.move_to_end(rfid)
+            if expires_at > time.monotonic():
+                if employee is None:
+                    self.negative_hits += 1
+                else:
+                    self.hits += 1
+                return True, employee
+
+            if employee is not None and self.loader is not None:
+                # Serve the stale grant, refresh behind the reader's back
+                self.stale_hits += 1
+                if rfid not in self._refreshing:
+                    self._refreshing.add(rfid)
+                    threading.Thread(
+                        target=self._refresh, args=(rfid, self._generation), daemon=True
+                    ).start()
+                return True, employee
+
+        self.misses += 1
+        return False, None
+
+    def lookup(self, rfid, loader=None):
+        loader = loader or self.loader
+        with self._lock:
+            found, employee = self._cached(rfid)
+            if found:
+                return employee
+            generation = self._generation
+
+        employee = loader(rfid)
+        self.put(rfid, employee, generation)
+        return employee
+
+    def lookup_many(self, rfids, loader_many):
+        # loader_many(rfids) returns {rfid: employee} for the badges it found
+        results = {}
+        missing = []
+        with self._lock:
+            for rfid in dict.fromkeys(rfids):
+                found, employee = self._cached(rfid)
+                if found:
+                    results[rfid] = employee
+                else:
+                    missing.append(rfid)
+            generation = self._generation
+
+        if missing:
+            loaded = loader_many(missing)
+            with self._lock:
+                for rfid in missing:
+                    employee = loaded.get(rfid)
+                    results[rfid] = employee
+                    if generation == self._generation:
+                        self._store(rfid, employee)
+        return results
+
+    def peek(self, rfid):
+        """Answer from memory only: ``(True, employee)`` or ``(False, generation)``.
+
+        On a miss the caller loads the badge itself (e.g. on an executor) and
+        stores it with ``put(rfid, employee, generation)``.
+        """
+        with self._lock:
+            found, employee = self._cached(rfid)
+            return (True, employee) if found else (False, self._generation)
+
+    def _refresh(self, rfid, generation):
+        try:
+            self.put(rfid, self.loader(rfid), generation)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for RFID {rfid}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(rfid)
+
+    def invalidate(self, rfid):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(rfid, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Cache used by the access-control server process
+employee_cache = AuthorizationCache()
+
+
+def _post_invalidation(rfid):
+    data = urllib.parse.urlencode({'rfid': rfid}).encode()
+    try:
+        urllib.request.urlopen(f"{RFID_SERVER_URL}/cache/invalidate", data=data, timeout=2).close()
+    except Exception as e:
+        # The TTL bounds how long the server can keep the old decision
+        logger.warning(f"Could not notify RFID server about {rfid}: {str(e)}")
+
+
+def notify_employee_changed(rfid):
+    employee_cache.invalidate(rfid)
+    threading.Thread(target=_post_invalidation, args=(rfid,), daemon=True).start()
+
+
+class InvalidationFeed:
+    """Append-only file that carries cache invalidations between processes.
+
+    Every server worker process keeps its own ``AuthorizationCache``. The
+    worker that receives ``/cache/invalidate`` appends the badge here and
+    every worker (itself included) follows the file and drops the entry.
+    An empty badge clears the whole cache. ``listeners`` are called with
+    the badge (None for everything) after the cache has dropped it.
+    """
+
+    def __init__(self, path, cache, poll_interval=0.5, listeners=None):
+        self.path = path
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.listeners = list(listeners or [])
+        self._stop = threading.Event()
+        self._thread = None
+        self.applied = 0
+
+    def publish(self, rfid=None):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One short O_APPEND write per line keeps concurrent writers from interleaving
+        with open(self.path, 'ab') as f:
+            f.write(((rfid or '') + '\n').encode())
+
+    def _run(self, offset):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if os.path.getsize(self.path) < offset:
+                    # Truncated by an operator, start over
+                    offset = 0
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    data = f.read()
+            except OSError:
+                continue
+
+            # Only whole lines, a partial one is picked up on the next poll
+            end = data.rfind(b'\n') + 1
+            offset += end
+            for line in data[:end].splitlines():
+                rfid = line.decode(errors='replace').strip()
+                if rfid:
+                    self.cache.invalidate(rfid)
+                else:
+                    self.cache.clear()
+                self.applied += 1
+                for listener in self.listeners:
+                    try:
+                        listener(rfid or None)
+                    except Exception as e:
+                        logger.error(f"Invalidation listener failed: {str(e)}")
+
+    def start(self):
+        # Invalidations published before we started are covered by the warm-up
+        try:
+            offset = os.path.getsize(self.path)
+        except OSError:
+            offset = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(offset,), name='cache-invalidation', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
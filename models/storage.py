@@ -0,0 +1,170 @@
+import os
+import re
+import sqlite3
+import logging
+from collections import namedtuple
+from datetime import date, datetime
+
+logger = logging.getLogger('rfid_server.storage')
+
+# Pick the engine with RFID_DB_BACKEND=sqlserver (default) or sqlite
+SQL_SERVER_CONNECTION_STRING = os.environ.get('RFID_DB_CONNECTION_STRING', (
+    'DRIVER={ODBC Driver 18 for SQL Server};'
+    'SERVER=IHEB;'
+    'DATABASE=rfid;'
+    'Trusted_Connection=Yes;'
+    'Encrypt=no;'
+))
+SQLITE_PATH = os.environ.get('RFID_DB_PATH', 'rfid.db')
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _check_identifiers(*names):
+    for name in names:
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid SQL identifier: {name!r}")
+
+
+class SqlServerBackend:
+    """SQL Server through pyodbc, the production database."""
+
+    dialect = 'mssql'
+
+    # Row limits: SELECT {top_clause} ... {limit_clause}, each takes one parameter
+    top_clause = "TOP (?)"
+    limit_clause = ""
+
+    def __init__(self, connection_string=SQL_SERVER_CONNECTION_STRING):
+        self.connection_string = connection_string
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.connection_string)
+
+    def create_table(self, cursor, table, columns):
+        # columns is the body of the CREATE TABLE, written in T-SQL
+        _check_identifiers(table)
+        cursor.execute(f'''
+            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='{table}')
+            CREATE TABLE {table} ({columns})
+        ''')
+
+    def add_column(self, cursor, table, column, definition):
+        _check_identifiers(table, column)
+        cursor.execute(f'''
+            IF COL_LENGTH('{table}', '{column}') IS NULL
+            ALTER TABLE {table} ADD {column} {definition}
+        ''')
+
+    def concat(self, *expressions):
+        return " + ".join(expressions)
+
+    def version(self, cursor):
+        cursor.execute("SELECT @@VERSION")
+        return cursor.fetchone()[0]
+
+
+# Row classes by column names, so rows can be read as row.nom or row[0] like pyodbc rows
+_row_types = {}
+
+
+def _row_factory(cursor, values):
+    columns = tuple(description[0] for description in cursor.description)
+    row_type = _row_types.get(columns)
+    if row_type is None:
+        row_type = _row_types[columns] = namedtuple('Row', columns, rename=True)
+    return row_type(*values)
+
+
+def _convert_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+def _convert_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('DATETIME', _convert_datetime)
+
+
+class SqliteBackend:
+    """Embedded SQLite database in WAL mode, for small sites, edge gateways and tests.
+
+    The schema is the same as on SQL Server; the T-SQL column definitions
+    given to ``create_table`` are translated to their SQLite equivalents.
+    """
+
+    dialect = 'sqlite'
+
+    top_clause = ""
+    limit_clause = "LIMIT ?"
+
+    # T-SQL DDL fragment -> SQLite equivalent
+    _DDL = [
+        (re.compile(r'\bINT\s+PRIMARY\s+KEY\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        (re.compile(r'\bINT\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)\s+PRIMARY\s+KEY', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+        (re.compile(r'\bFOREIGN\s+KEY\s+REFERENCES\b', re.I), 'REFERENCES'),
+        (re.compile(r'\bGETDATE\s*\(\s*\)', re.I), 'CURRENT_TIMESTAMP'),
+    ]
+
+    def __init__(self, path=SQLITE_PATH, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            # Pooled connections move between request threads, one at a time
+            check_same_thread=False
+        )
+        conn.row_factory = _row_factory
+        # Readers never block the writer and vice versa
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def translate(self, ddl):
+        for pattern, replacement in self._DDL:
+            ddl = pattern.sub(replacement, ddl)
+        return ddl
+
+    def create_table(self, cursor, table, columns):
+        _check_identifiers(table)
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({self.translate(columns)})")
+
+    def add_column(self, cursor, table, column, definition):
+        _check_identifiers(table, column)
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {self.translate(definition)}")
+
+    def concat(self, *expressions):
+        return " || ".join(expressions)
+
+    def version(self, cursor):
+        cursor.execute("SELECT sqlite_version()")
+        return f"SQLite {cursor.fetchone()[0]}"
+
+
+def is_sqlite(cursor):
+    return isinstance(cursor, sqlite3.Cursor)
+
+
+def backend_from_env():
+    name = os.environ.get('RFID_DB_BACKEND', 'sqlserver').lower()
+    if name == 'sqlite':
+        return SqliteBackend()
+    if name not in ('sqlserver', 'mssql'):
+        logger.warning(f"Unknown RFID_DB_BACKEND {name!r}, using SQL Server")
+    return SqlServerBackend()
+
+
+# Backend used by every module that talks to the database
+backend = backend_from_env()
@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+from models.event_writer import write_isolating
+
+logger = logging.getLogger('rfid_server.journal')
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+# Touched by the owning process; a journal whose lease goes stale is adopted
+LEASE_FILE = 'lease'
+
+
+def new_swipe_id():
+    return uuid.uuid4().hex
+
+
+def touch_lease(directory):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LEASE_FILE), 'a'):
+        pass
+    os.utime(os.path.join(directory, LEASE_FILE))
+
+
+def lease_age(directory):
+    try:
+        return time.time() - os.path.getmtime(os.path.join(directory, LEASE_FILE))
+    except OSError:
+        return None
+
+
+class SwipeJournal:
+    """Append-only local journal of badge decisions.
+
+    Records are JSON lines written to numbered segment files. ``append`` only
+    returns once its record has been fsynced; concurrent appenders share one
+    fsync (group commit). ``ack`` marks swipes as stored in the database, and
+    a segment file is deleted once every swipe in it has been acknowledged.
+    """
+
+    def __init__(self, directory, max_segment_bytes=4 * 1024 * 1024, fsync_interval=0.002):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_interval = fsync_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._buffer = []
+        self._appended = 0
+        self._synced = 0
+        # (first_seq, last_seq) of flushes that did not reach the disk
+        self._failed = []
+        # (seq, callback) of append_async calls waiting for their fsync
+        self._callbacks = []
+        self._closed = True
+        self._thread = None
+        self._file = None
+        self._segment = 0
+
+        # swipe_id -> record, and which segment holds each unacknowledged swipe
+        self._pending = {}
+        self._segment_of = {}
+        self._segment_ids = {}
+
+        self.fsyncs = 0
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def _existing_segments(self):
+        numbers = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX):
+                try:
+                    numbers.append(int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    pass
+        return sorted(numbers)
+
+    def _load_segment(self, number):
+        acked = set()
+        with open(self._segment_path(number), 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash, everything before it is intact
+                    logger.warning(f"Skipping damaged record in journal segment {number}")
+                    continue
+                if 'ack' in record:
+                    acked.update(record['ack'])
+                else:
+                    self._pending[record['id']] = record
+                    self._segment_of[record['id']] = number
+                    self._segment_ids.setdefault(number, set()).add(record['id'])
+
+        # Acks may land in a later segment than the swipe they acknowledge
+        return acked
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        acked = set()
+        segments = self._existing_segments()
+        for number in segments:
+            acked |= self._load_segment(number)
+        for swipe_id in acked:
+            self._forget(swipe_id)
+
+        self._segment = (segments[-1] if segments else 0) + 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._segment_ids.setdefault(self._segment, set())
+
+        # Segments with nothing left to replay can go
+        for number in segments:
+            if not self._segment_ids.get(number):
+                self._drop_segment(number)
+
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='swipe-journal', daemon=True)
+        self._thread.start()
+        logger.info(f"Swipe journal opened with {len(self._pending)} unacknowledged swipes")
+
+    def _drop_segment(self, number):
+        self._segment_ids.pop(number, None)
+        try:
+            os.remove(self._segment_path(number))
+        except OSError:
+            pass
+
+    def _forget(self, swipe_id):
+        self._pending.pop(swipe_id, None)
+        number = self._segment_of.pop(swipe_id, None)
+        if number is None:
+            return
+        ids = self._segment_ids.get(number)
+        if ids is not None:
+            ids.discard(swipe_id)
+            if not ids and number != self._segment:
+                self._drop_segment(number)
+
+    def _write(self, lines, wait):
+        with self._cond:
+            if self._closed:
+                raise IOError("Swipe journal is not open")
+            self._buffer.extend(lines)
+            self._appended += 1
+            seq = self._appended
+            self._cond.notify_all()
+            while wait and self._synced < seq and not self._closed:
+                self._cond.wait()
+            if wait and any(first <= seq <= last for first, last in self._failed):
+                raise IOError("Swipe journal write failed")
+            return seq
+
+    def append(self, record):
+        # record must carry a unique 'id' (see new_swipe_id)
+        self.append_many([record])
+
+    def append_many(self, records):
+        # All records share one fsync
+        lines = [
+            ((json.dumps(record, separators=(',', ':'), default=str) + '\n').encode(), record['id'])
+            for record in records
+        ]
+        if not lines:
+            return
+        with self._cond:
+            for record in records:
+                self._pending[record['id']] = record
+        self._write(lines, wait=True)
+
+    def append_async(self, record, callback):
+        # Returns at once; callback(error) runs on the journal thread once the
+        # record is on disk (error is None) or could not be written
+        line = (json.dumps(record, separators=(',', ':'), default=str) + '\n').encode()
+        with self._cond:
+            if self._closed:
+                raise IOError("Swipe journal is not open")
+            self._pending[record['id']] = record
+            self._buffer.append((line, record['id']))
+            self._appended += 1
+            self._callbacks.append((self._appended, callback))
+            self._cond.notify_all()
+
+    def _run_callbacks(self, synced, failed):
+        with self._cond:
+            due = [(seq, cb) for seq, cb in self._callbacks if seq <= synced]
+            self._callbacks = [(seq, cb) for seq, cb in self._callbacks if seq > synced]
+        for seq, callback in due:
+            try:
+                callback(IOError("Swipe journal write failed") if failed else None)
+            except Exception as e:
+                logger.error(f"Swipe journal callback failed: {str(e)}")
+
+    def ack(self, swipe_ids):
+        swipe_ids = [swipe_id for swipe_id in swipe_ids if swipe_id]
+        if not swipe_ids:
+            return
+        line = (json.dumps({'ack': swipe_ids}, separators=(',', ':')) + '\n').encode()
+        with self._cond:
+            if self._closed:
+                # A lost ack only means an idempotent replay on next start
+                return
+            for swipe_id in swipe_ids:
+                self._forget(swipe_id)
+        # No need to wait for fsync, for the same reason
+        self._write([(line, None)], wait=False)
+
+    def pending(self, older_than=0.0, limit=None):
+        cutoff = datetime.now().timestamp() - older_than
+        with self._cond:
+            records = [r for r in self._pending.values() if r.get('epoch', 0) <= cutoff]
+        records.sort(key=lambda r: r.get('epoch', 0))
+        return records[:limit] if limit else records
+
+    def _rotate(self):
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        with self._cond:
+            previous = self._segment - 1
+            self._segment_ids.setdefault(self._segment, set())
+            if not self._segment_ids.get(previous):
+                self._drop_segment(previous)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    break
+
+            # Let concurrent appenders join this fsync
+            time.sleep(self.fsync_interval)
+
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+                first_seq = self._synced + 1
+                seq = self._appended
+                for _, swipe_id in lines:
+                    if swipe_id and swipe_id in self._pending:
+                        self._segment_of[swipe_id] = self._segment
+                        self._segment_ids[self._segment].add(swipe_id)
+
+            failed = False
+            try:
+                self._file.write(b''.join(line for line, _ in lines))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.fsyncs += 1
+                if self._file.tell() >= self.max_segment_bytes:
+                    self._rotate()
+            except Exception as e:
+                logger.error(f"Swipe journal write failed: {str(e)}")
+                failed = True
+
+            with self._cond:
+                if failed:
+                    self._failed = self._failed[-99:] + [(first_seq, seq)]
+                self._synced = seq
+                self._cond.notify_all()
+            self._run_callbacks(seq, failed)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(5)
+        self._file.close()
+        # Anything still waiting never made it to disk
+        self._run_callbacks(float('inf'), True)
+        logger.info("Swipe journal closed")
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pending': len(self._pending),
+                'segment': self._segment,
+                'segments': len(self._segment_ids),
+                'fsyncs': self.fsyncs,
+            }
+
+
+class JournalReplayer:
+    """Periodically pushes unacknowledged journal records to the database.
+
+    Records younger than ``replay_after`` seconds are left to the normal
+    write-behind path. ``write_batch`` must be idempotent by swipe id.
+    Records the database rejects go to ``dead_letter`` and are
+    acknowledged, so they are not replayed again and do not hold up the
+    records behind them.
+
+    With ``root`` set, every worker process journals into its own directory
+    under it. Journals whose owner stopped renewing its lease for
+    ``lease_timeout`` seconds (a crashed or retired worker) are adopted,
+    replayed and removed.
+    """
+
+    def __init__(self, journal, write_batch, to_event, dead_letter, interval=10.0, replay_after=30.0,
+                 batch_size=200, root=None, lease_timeout=60.0):
+        self.journal = journal
+        self.write_batch = write_batch
+        self.to_event = to_event
+        self.dead_letter = dead_letter
+        self.interval = interval
+        self.replay_after = replay_after
+        self.batch_size = batch_size
+        self.root = root
+        self.lease_timeout = lease_timeout
+
+        self._stop = threading.Event()
+        self._thread = None
+        self.replayed = 0
+        self.adopted = 0
+        self.dead_lettered = 0
+
+    def _replay(self, journal, older_than):
+        records = journal.pending(older_than=older_than)
+        for i in range(0, len(records), self.batch_size):
+            events = [self.to_event(record) for record in records[i:i + self.batch_size]]
+            dead = []
+
+            def dead_letter(rejected, error):
+                self.dead_letter(rejected, error)
+                dead.extend(rejected)
+
+            written, remaining = write_isolating(self.write_batch, events, dead_letter)
+            # Written and dead-lettered records are done; the rest is a suffix of the batch
+            journal.ack([event.swipe_id for event in events[:len(events) - len(remaining)]])
+            self.replayed += written
+            self.dead_lettered += len(dead)
+            if remaining:
+                left = len(records) - i - written - len(dead)
+                logger.warning(f"Journal replay deferred, database unavailable ({left} records left)")
+                return False
+        return True
+
+    def _adopt(self, directory):
+        # Claim it first so another worker scanning right now skips it
+        touch_lease(directory)
+        journal = SwipeJournal(directory)
+        try:
+            journal.open()
+            done = self._replay(journal, 0.0)
+        finally:
+            journal.close()
+        if done:
+            shutil.rmtree(directory, ignore_errors=True)
+            self.adopted += 1
+            logger.info(f"Adopted and replayed orphaned swipe journal {directory}")
+
+    def adopt_orphans(self):
+        if not self.root or not os.path.isdir(self.root):
+            return
+        own = os.path.abspath(self.journal.directory)
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if os.path.abspath(directory) == own or not os.path.isdir(directory):
+                continue
+            age = lease_age(directory)
+            if age is None:
+                # Created by a worker that is still starting up
+                age = time.time() - os.path.getmtime(directory)
+            if age < self.lease_timeout:
+                continue
+            try:
+                self._adopt(directory)
+            except Exception as e:
+                logger.error(f"Failed to adopt swipe journal {directory}: {str(e)}")
+
+    def replay_once(self):
+        if self.root:
+            touch_lease(self.journal.directory)
+        self._replay(self.journal, self.replay_after)
+        self.adopt_orphans()
+        return self.replayed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.replay_once()
+
+    def start(self):
+        if self.root:
+            touch_lease(self.journal.directory)
+            self.adopt_orphans()
+        self._thread = threading.Thread(target=self._run, name='journal-replayer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
@@ -0,0 +1,192 @@
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+
+from models.rfid_cache import employee_cache
+from models.log_pipeline import request_id
+from models.metrics import metrics
+from rfid_server import (signals, event_writer, swipe_journal, swipe_debouncer, reader_limiter, uid_limiter,
+                         reader_verifications, verify_stages, load_employee, decide_access, journal_record, check_database, parse_bind,
+                         start_background_workers, shutdown_background_workers, DEFAULT_BIND, MAX_RFID_LENGTH,
+                         READER_RATE, UID_RATE)
+
+logger = logging.getLogger('rfid_server.async')
+access_logger = logging.getLogger('rfid_server.access')
+
+# pyodbc has no async API, so blocking calls are bridged onto a small fixed
+# pool; requests answered from the cache never touch it
+DB_EXECUTOR_THREADS = 8
+
+# Created by main() with the configured size
+db_executor = None
+
+
+async def lookup_employee(rfid_value):
+    found, value = employee_cache.peek(rfid_value)
+    if found:
+        return value
+
+    # Miss: load on the executor and cache it, unless it was invalidated meanwhile
+    employee = await asyncio.get_running_loop().run_in_executor(db_executor, load_employee, rfid_value)
+    employee_cache.put(rfid_value, employee, value)
+    return employee
+
+
+async def record_decision_async(event):
+    loop = asyncio.get_running_loop()
+    synced = loop.create_future()
+
+    def on_synced(error):
+        loop.call_soon_threadsafe(_resolve, synced, error)
+
+    # Durable before the reply, as in rfid_server.record_decision, but the
+    # coroutine is parked instead of a thread while the journal fsyncs
+    try:
+        swipe_journal.append_async(journal_record(event), on_synced)
+        await synced
+    except Exception as e:
+        logger.error(f"Failed to journal swipe for RFID {event.rfid}: {str(e)}")
+
+    event_writer.submit(event, block=False)
+
+
+def _resolve(future, error):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+async def verify_rfid_async(rfid_value, reader=None):
+    authorized = swipe_debouncer.check(reader, rfid_value)
+    if authorized is not None:
+        logger.debug(f"Repeat tap of RFID {rfid_value} on reader {reader} within debounce window")
+        return authorized
+    if not uid_limiter.allow(rfid_value):
+        logger.warning(f"RFID {rfid_value} rate limited, swipe refused and not recorded")
+        return False
+
+    try:
+        logger.debug(f"Verifying RFID: {rfid_value}")
+        signals.log_message.emit(f"Verifying RFID: {rfid_value}")
+        employee = await lookup_employee(rfid_value)
+    except Exception as e:
+        logger.error(f"Database error during RFID verification: {str(e)}")
+        signals.log_message.emit(f"Database error: {str(e)}")
+        return False
+
+    event = decide_access(rfid_value, employee)
+    swipe_debouncer.remember(reader, rfid_value, event.authorized)
+    # A reader that hangs up must not cancel the journal write
+    await asyncio.shield(record_decision_async(event))
+    return event.authorized
+
+
+# Same paths and plain-text bodies as the Flask routes, the ESP32 firmware
+# compares the body against "authorized"
+async def verify(request):
+    rfid = request.query.get('rfid')
+
+    if not rfid:
+        logger.warning("Verification request received without RFID parameter")
+        return web.Response(text="error: missing rfid parameter", status=400)
+    if len(rfid) > MAX_RFID_LENGTH:
+        logger.warning(f"Verification request with an RFID longer than {MAX_RFID_LENGTH} characters")
+        return web.Response(text="error: invalid rfid parameter", status=400)
+
+    logger.info(f"Verification request received for RFID: {rfid}")
+
+    reader = request.query.get('reader') or request.remote
+
+    if not reader_limiter.allow(request.remote):
+        logger.warning(f"Reader {request.remote} rate limited")
+        reader_verifications.inc(reader, "rate_limited")
+        return web.Response(text="unauthorized", status=429)
+
+    # Counted like the Flask /verify, so /metrics reads the same on both servers
+    with verify_stages.time('total'):
+        authorized = await verify_rfid_async(rfid, reader)
+    if authorized:
+        reader_verifications.inc(reader, "authorized")
+        return web.Response(text="authorized")
+    else:
+        reader_verifications.inc(reader, "unauthorized")
+        return web.Response(text="unauthorized")
+
+
+@web.middleware
+async def request_logging(request, handler):
+    # Each request runs in its own task, so the id stays with it across awaits
+    started = time.perf_counter()
+    request_id.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+    response = await handler(request)
+    access_logger.info(f"{request.method} {request.path} {response.status}", extra={
+        'method': request.method,
+        'path': request.path,
+        'status': response.status,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'remote': request.remote,
+    })
+    response.headers['X-Request-ID'] = request_id.get()
+    return response
+
+
+async def status(request):
+    return web.Response(text="running")
+
+
+async def prometheus_metrics(request):
+    return web.Response(text=metrics.render(), content_type='text/plain')
+
+
+async def on_startup(application):
+    await asyncio.get_running_loop().run_in_executor(db_executor, start_background_workers)
+
+
+async def on_cleanup(application):
+    await asyncio.get_running_loop().run_in_executor(db_executor, shutdown_background_workers)
+    db_executor.shutdown(wait=False)
+
+
+def make_app():
+    application = web.Application(middlewares=[request_logging])
+    application.router.add_get('/verify', verify)
+    application.router.add_get('/status', status)
+    application.router.add_get('/metrics', prometheus_metrics)
+    application.on_startup.append(on_startup)
+    application.on_cleanup.append(on_cleanup)
+    return application
+
+
+def main(argv=None):
+    global db_executor
+
+    parser = argparse.ArgumentParser(description="asyncio RFID access-control server (/verify and /status)")
+    parser.add_argument('--bind', default=DEFAULT_BIND, help="host:port to listen on")
+    parser.add_argument('--db-threads', type=int, default=DB_EXECUTOR_THREADS,
+                        help="threads for blocking database calls")
+    parser.add_argument('--reader-rate', type=float, default=READER_RATE,
+                        help="verifications per second allowed per reader address (0 disables)")
+    parser.add_argument('--uid-rate', type=float, default=UID_RATE,
+                        help="verifications per second allowed per badge UID (0 disables)")
+    options = parser.parse_args(argv)
+
+    reader_limiter.rate = options.reader_rate
+    uid_limiter.rate = options.uid_rate
+    db_executor = ThreadPoolExecutor(max_workers=options.db_threads, thread_name_prefix='rfid-db')
+
+    logger.info("Starting asyncio RFID Access Control Server")
+    check_database()
+
+    host, port = parse_bind(options.bind)
+    web.run_app(make_app(), host=host, port=port)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,41 +1,22 @@
-import pyodbc
 from datetime import datetime
 import os
 from typing import Optional
 
-CONNECTION_STRING = (
-    'DRIVER={ODBC Driver 18 for SQL Server};'
-    'SERVER=IHEB;'
-    'DATABASE=rfid;'
-    'Trusted_Connection=Yes;'
-    'Encrypt=no;'
-)
+from models.date_keys import date_keys
+from models.storage import backend
 
 class DatabaseManager:
     def __init__(self):
-        self.conn = pyodbc.connect(CONNECTION_STRING)
+        self.conn = backend.connect()
         self.cursor = self.conn.cursor()
         self.create_tables()
         self.populate_date_table()
 
     def insert_date(self, date):
-        self.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date,))
-        if not self.cursor.fetchone():
-            jour = date.day
-            mois = date.month
-            annee = date.year
-            jour_semaine = date.strftime("%A")
-            est_jour_ferie = 0
-            description_jour = ""
-            self.cursor.execute('''
-                INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (date, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour))
-            self.conn.commit()
+        return date_keys.resolve(self.cursor, date)
+
     def create_tables(self):
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Date')
-            CREATE TABLE Date (
+        backend.create_table(self.cursor, 'Date', '''
                 date_id INT PRIMARY KEY IDENTITY(1,1),
                 date_complete DATE,
                 jour INT,
@@ -44,37 +25,28 @@ class DatabaseManager:
                 jour_semaine VARCHAR(20),
                 est_jour_ferie BIT,
                 description_jour VARCHAR(255)
-            )
         ''')
 
 
 
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Equipe')
-            CREATE TABLE Equipe (
+        backend.create_table(self.cursor, 'Equipe', '''
                 equipe_id INT PRIMARY KEY IDENTITY(1,1),
                 nom_equipe VARCHAR(100),
                 description VARCHAR(255),
                 chef_equipe VARCHAR(100)
-            )
         ''')
 
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Poste_Competence')
-            CREATE TABLE Poste_Competence (
+        backend.create_table(self.cursor, 'Poste_Competence', '''
                 poste_id INT PRIMARY KEY IDENTITY(1,1),
                 titre_poste VARCHAR(100),
                 niveau_competence VARCHAR(50),
                 description VARCHAR(255),
                 requirements VARCHAR(255)
-            )
         ''')
 
 
 
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Employe')
-            CREATE TABLE Employe (
+        backend.create_table(self.cursor, 'Employe', '''
                 rfid VARCHAR(50) PRIMARY KEY,
                 nom VARCHAR(100),
                 prenom VARCHAR(100),
@@ -86,31 +58,27 @@ class DatabaseManager:
                 equipe_id INT FOREIGN KEY REFERENCES Equipe(equipe_id),
                 poste_id INT FOREIGN KEY REFERENCES Poste_Competence(poste_id),
                 date_id INT FOREIGN KEY REFERENCES Date(date_id)
-            )
         ''')
 
 
 
 
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Alerte')
-            CREATE TABLE Alerte (
+        backend.create_table(self.cursor, 'Alerte', '''
                 alerte_id INT PRIMARY KEY IDENTITY(1,1),
                 type_alerte VARCHAR(50),
                 description VARCHAR(255),
                 date_alerte DATETIME,
                 status VARCHAR(20),
                 rfid VARCHAR(50) FOREIGN KEY REFERENCES Employe(rfid),
-                date_id INT FOREIGN KEY REFERENCES Date(date_id)
-            )
+                date_id INT FOREIGN KEY REFERENCES Date(date_id),
+                occurrences INT NOT NULL DEFAULT 1,
+                derniere_occurrence DATETIME
         ''')
 
 
 
 
-        self.cursor.execute('''
-            IF NOT EXISTS (SELECT * FROM sys.tables WHERE name='Evenement')
-            CREATE TABLE Evenement (
+        backend.create_table(self.cursor, 'Evenement', '''
                 evenement_id INT PRIMARY KEY IDENTITY(1,1),
                 type_evenement VARCHAR(50),
                 date_evenement DATETIME,
@@ -120,14 +88,10 @@ class DatabaseManager:
                 poste_id INT FOREIGN KEY REFERENCES Poste_Competence(poste_id),
                 alerte_id INT FOREIGN KEY REFERENCES Alerte(alerte_id),
                 date_id INT FOREIGN KEY REFERENCES Date(date_id)
-            )
         ''')
 
         # Ensure the date_id column exists in the Evenement table
-        self.cursor.execute('''
-            IF COL_LENGTH('Evenement', 'date_id') IS NULL
-            ALTER TABLE Evenement ADD date_id INT FOREIGN KEY REFERENCES Date(date_id)
-        ''')
+        backend.add_column(self.cursor, 'Evenement', 'date_id', 'INT FOREIGN KEY REFERENCES Date(date_id)')
 
         self.conn.commit()
 
@@ -147,23 +111,10 @@ class DatabaseManager:
         for row in self.cursor.fetchall():
             dates.add(row.date_evenement.date())
 
-        for date in dates:
-            if date:
-                date_complete = date
-                jour = date.day
-                mois = date.month
-                annee = date.year
-                jour_semaine = date.strftime("%A")
-                est_jour_ferie = 0
-                description_jour = ""
-
-                self.cursor.execute('''
-                    IF NOT EXISTS (SELECT * FROM Date WHERE date_complete = ?)
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_complete, date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour))
-
-        self.conn.commit()
+        # One bulk statement instead of an IF NOT EXISTS round trip per date
+        date_keys.load(self.cursor)
+        date_keys.ensure(self.cursor, dates)
+        date_keys.provision(self.cursor)
 
 
 
@@ -249,36 +200,16 @@ class EmployeeSystem:
             poste_id = int(input("Enter Position ID: "))
 
             # Insert birth date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-            date_naissance_id = self.db.cursor.fetchone()
-            if not date_naissance_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_naissance, date_naissance.day, date_naissance.month, date_naissance.year,
-                      date_naissance.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-                date_naissance_id = self.db.cursor.fetchone()
+            date_naissance_id = date_keys.resolve(self.db.cursor, date_naissance)
 
             # Insert hire date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-            date_embauche_id = self.db.cursor.fetchone()
-            if not date_embauche_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_embauche, date_embauche.day, date_embauche.month, date_embauche.year, date_embauche.strftime("%A"),
-                      0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-                date_embauche_id = self.db.cursor.fetchone()
+            date_embauche_id = date_keys.resolve(self.db.cursor, date_embauche)
 
             self.db.cursor.execute('''
                 INSERT INTO Employe (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id, date_id)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id,
-                  date_naissance_id[0]))
+                  date_naissance_id))
             self.db.conn.commit()
             print("\nEmployee added successfully!")
         except Exception as e:
@@ -410,38 +341,17 @@ class EmployeeSystem:
                 date_embauche = emp.date_embauche
 
             # Insert birth date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-            date_naissance_id = self.db.cursor.fetchone()
-            if not date_naissance_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_naissance, date_naissance.day, date_naissance.month, date_naissance.year,
-                      date_naissance.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-                date_naissance_id = self.db.cursor.fetchone()
+            date_naissance_id = date_keys.resolve(self.db.cursor, date_naissance)
 
             # Insert hire date into Date table if it doesn't exist
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-            date_embauche_id = self.db.cursor.fetchone()
-            if not date_embauche_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                date_embauche, date_embauche.day, date_embauche.month, date_embauche.year, date_embauche.strftime("%A"),
-                0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-                date_embauche_id = self.db.cursor.fetchone()
+            date_embauche_id = date_keys.resolve(self.db.cursor, date_embauche)
 
             self.db.cursor.execute('''
                 UPDATE Employe
                 SET nom = ?, prenom = ?, date_naissance = ?, date_embauche = ?, email = ?, telephone = ?, adresse = ?, equipe_id = ?, poste_id = ?, date_id = ?
                 WHERE rfid = ?
             ''', (nom, prenom, date_naissance, date_embauche, email, telephone, adresse, emp.equipe_id, emp.poste_id,
-                  date_embauche_id[0], rfid))
+                  date_embauche_id, rfid))
             self.db.conn.commit()
             print("\nEmployee updated successfully!")
         except Exception as e:
@@ -706,22 +616,13 @@ class EmployeeSystem:
                 alerte_id = int(alerte_input) if alerte_input.strip() else None
 
             date_event_date = datetime.strptime(date_event, "%Y-%m-%d %H:%M:%S").date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_event_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_event_date, date_event_date.day, date_event_date.month, date_event_date.year, date_event_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_event_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, date_event_date)
 
             self.db.cursor.execute('''
                     INSERT INTO Evenement 
                     (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (type_event, date_event, description, rfid, equipe_id, poste_id, alerte_id, date_id[0]))
+                ''', (type_event, date_event, description, rfid, equipe_id, poste_id, alerte_id, date_id))
             self.db.conn.commit()
             print("\nEvent added successfully!")
         except Exception as e:
@@ -781,22 +682,13 @@ class EmployeeSystem:
             new_desc = input(f"Enter new Description [{event.description}]: ") or event.description
 
             new_date_date = datetime.strptime(new_date, "%Y-%m-%d %H:%M:%S").date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (new_date_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (new_date_date, new_date_date.day, new_date_date.month, new_date_date.year, new_date_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (new_date_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, new_date_date)
 
             self.db.cursor.execute('''
                     UPDATE Evenement
                     SET type_evenement=?, date_evenement=?, description=?, date_id=?
                     WHERE evenement_id=?
-                ''', (new_type, new_date, new_desc, date_id[0], event_id))
+                ''', (new_type, new_date, new_desc, date_id, event_id))
             self.db.conn.commit()
             print("\nEvent updated successfully!")
         except Exception as e:
@@ -861,21 +753,12 @@ class EmployeeSystem:
                 return
 
             current_date = datetime.now().date()
-            self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-            date_id = self.db.cursor.fetchone()
-            if not date_id:
-                self.db.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (current_date, current_date.day, current_date.month, current_date.year, current_date.strftime("%A"), 0, ""))
-                self.db.conn.commit()
-                self.db.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-                date_id = self.db.cursor.fetchone()
+            date_id = date_keys.resolve(self.db.cursor, current_date)
 
             self.db.cursor.execute('''
                     INSERT INTO Alerte (type_alerte, description, date_alerte, status, rfid, date_id)
                     VALUES (?, ?, GETDATE(), ?, ?, ?)
-                ''', (type_alerte, description, status, rfid, date_id[0]))
+                ''', (type_alerte, description, status, rfid, date_id))
             self.db.conn.commit()
             print("\nAlert added successfully!")
         except Exception as e:
@@ -0,0 +1,1262 @@
+import os
+import hmac
+import time
+import uuid
+import atexit
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+from flask import Flask, request, jsonify, g
+
+from models.storage import backend
+from models.log_pipeline import LogPipeline, parse_levels, request_id
+from models.metrics import metrics
+from models.connection_pool import ConnectionPool
+from models.rfid_cache import employee_cache, notify_employee_changed, InvalidationFeed
+from models.auth_snapshot import AuthorizationSnapshot
+from models import change_feed
+from models.debounce import SwipeDebouncer
+from models.rate_limit import TokenBucketLimiter
+from models.alert_collapse import AlertCollapser, ensure_alert_columns
+from models.event_writer import (AccessEvent, AccessEventWriter, DeadLetterLog, RejectedEvents,
+                                 is_duplicate_key, is_rejected)
+from models.swipe_journal import SwipeJournal, JournalReplayer, new_swipe_id
+from models.date_keys import date_keys
+from models.bulk_insert import bulk_insert
+
+# Setup logging: JSON lines in a rotating file per process (rfid_server-<pid>.log),
+# written by a listener thread
+LOG_FILE = 'rfid_server.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+LOG_ROTATE_INTERVAL = 86400
+# Levels per component, e.g. RFID_LOG_LEVELS="rfid_server=INFO,rfid_server.writer=DEBUG"
+DEFAULT_LOG_LEVELS = 'rfid_server=INFO'
+
+log_pipeline = LogPipeline(
+    LOG_FILE,
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    rotate_interval=LOG_ROTATE_INTERVAL
+)
+log_pipeline.start(parse_levels(os.environ.get('RFID_LOG_LEVELS', DEFAULT_LOG_LEVELS)))
+logger = logging.getLogger('rfid_server')
+access_logger = logging.getLogger('rfid_server.access')
+
+# Connection pool shared by the request threads of one worker process
+POOL_MAX_SIZE = 10
+POOL_TIMEOUT = 5.0
+
+db_pool = ConnectionPool(
+    backend.connect,
+    max_size=POOL_MAX_SIZE,
+    timeout=POOL_TIMEOUT
+)
+
+# Local journals that keep swipes until they are safely in the database,
+# one sub-directory per worker process
+JOURNAL_DIR = 'rfid_journal'
+# Applied swipe ids are kept this long so replays stay idempotent
+SWIPE_ID_RETENTION_DAYS = 7
+# Times a batch is written again when another writer stored some of its swipes first
+SWIPE_RACE_RETRIES = 2
+
+# Cache invalidations shared by all worker processes
+CACHE_INVALIDATION_FILE = os.path.join(JOURNAL_DIR, 'cache-invalidations.log')
+
+# Events the database refused (constraint or data errors), one JSON line each
+DEAD_LETTER_FILE = os.path.join(JOURNAL_DIR, 'dead-letter.log')
+
+# Longest badge UID accepted, the width of Employe.rfid
+MAX_RFID_LENGTH = 50
+
+# Swipe ids per IN (...) lookup, SQL Server allows at most 2100 parameters
+EVENT_INSERT_CHUNK = 200
+
+# Largest POST /verify/batch a gateway may send
+MAX_BATCH_SWIPES = 500
+
+# Repeat taps of one badge on one reader within this many seconds get the
+# first decision and are not recorded again
+DEBOUNCE_WINDOW = 2.0
+DEBOUNCE_MAX_ENTRIES = 4096
+
+# Flood protection: verifications per second (and burst) allowed per reader
+# address and per badge UID; past that a swipe is refused without being recorded
+READER_RATE = 5.0
+READER_BURST = 20
+UID_RATE = 1.0
+UID_BURST = 5
+RATE_LIMIT_MAX_KEYS = 10000
+
+# Denials of one unknown badge within this many seconds share one Alerte row
+ALERT_COLLAPSE_WINDOW = 60.0
+
+# Change_Log entries are kept this long, slower consumers get a reset
+CHANGE_LOG_RETENTION_DAYS = 30
+MAX_CHANGES_PER_REQUEST = 1000
+
+# Full snapshot rebuilds catch employees changed without an invalidation
+SNAPSHOT_REBUILD_INTERVAL = 300.0
+# The snapshot lists every valid badge UID, i.e. the credentials themselves;
+# readers and gateways present one of these tokens (comma separated in
+# RFID_SNAPSHOT_TOKENS) as "Authorization: Bearer <token>". None set: no access.
+# The change feed carries the same UIDs and personal data and takes the same tokens.
+SNAPSHOT_TOKENS = [token for token in os.environ.get('RFID_SNAPSHOT_TOKENS', '').split(',') if token.strip()]
+
+# Production serving defaults, see main()
+DEFAULT_BIND = '0.0.0.0:3000'
+DEFAULT_WORKERS = 4
+DEFAULT_THREADS = 8
+DEFAULT_KEEPALIVE = 5
+DEFAULT_TIMEOUT = 30
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
+# Flask server setup
+app = Flask(__name__)
+
+# Always-on stage timers, served on /metrics
+verify_stages = metrics.histogram(
+    'rfid_verify_stage_seconds', "Time spent in each stage of a /verify request", ['stage']
+)
+write_stages = metrics.histogram(
+    'rfid_write_stage_seconds', "Time spent in each stage of writing an access event batch", ['stage']
+)
+reader_verifications = metrics.counter(
+    'rfid_reader_verifications_total', "Verifications per reader and decision", ['reader', 'decision']
+)
+
+
+class Signal:
+    """Minimal stand-in for a Qt signal so the server runs without PyQt.
+
+    Callbacks run on the emitting (request) thread; the GUI bridges them
+    onto its own event loop.
+    """
+
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def disconnect(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def emit(self, *args):
+        for callback in list(self._callbacks):
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Signal handler failed: {str(e)}")
+
+
+# Notifications from the server to an embedded GUI
+class ServerSignals:
+    def __init__(self):
+        self.new_access_event = Signal()
+        self.log_message = Signal()
+
+
+# Global signal instance
+signals = ServerSignals()
+
+
+class DatabaseManager:
+    def __init__(self, conn=None):
+        # A connection borrowed from db_pool is owned by the pool, not by us
+        self.pooled = conn is not None
+        if self.pooled:
+            self.conn = conn
+            self.cursor = conn.cursor()
+            return
+
+        try:
+            self.conn = backend.connect()
+            self.cursor = self.conn.cursor()
+            logger.info("Database connection established")
+            signals.log_message.emit("Database connection established")
+        except Exception as e:
+            logger.error(f"Database connection error: {str(e)}")
+            signals.log_message.emit(f"Database error: {str(e)}")
+            self.conn = None
+            self.cursor = None
+
+    def reconnect(self):
+        if self.pooled:
+            # The pool replaces dead connections on the next checkout
+            return False
+
+        try:
+            if self.conn:
+                self.conn.close()
+            self.conn = backend.connect()
+            self.cursor = self.conn.cursor()
+            logger.info("Database reconnection successful")
+            signals.log_message.emit("Database reconnection successful")
+            return True
+        except Exception as e:
+            logger.error(f"Database reconnection error: {str(e)}")
+            signals.log_message.emit(f"Database reconnection error: {str(e)}")
+            self.conn = None
+            self.cursor = None
+            return False
+
+    def record_access_event(self, rfid, event_type, description):
+        authorized = event_type == "AUTHORIZED"
+        event = AccessEvent(rfid, event_type, description, datetime.now(), authorized)
+        return self.record_access_events([event])
+
+    def ensure_journal_table(self):
+        backend.create_table(self.cursor, 'Swipe_Journal', '''
+                swipe_id VARCHAR(32) PRIMARY KEY,
+                applied_at DATETIME
+        ''')
+        self.conn.commit()
+
+    def prune_journal_table(self):
+        cutoff = datetime.now() - timedelta(days=SWIPE_ID_RETENTION_DAYS)
+        self.cursor.execute("DELETE FROM Swipe_Journal WHERE applied_at < ?", (cutoff,))
+        self.conn.commit()
+
+    def record_access_events(self, events, retries=SWIPE_RACE_RETRIES):
+        storing_swipe_ids = False
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return False
+
+            # Skip swipes a previous attempt or the journal replay already stored
+            with write_stages.time('dedupe'):
+                swipe_ids = [event.swipe_id for event in events if event.swipe_id]
+                applied = set()
+                for i in range(0, len(swipe_ids), EVENT_INSERT_CHUNK):
+                    chunk = swipe_ids[i:i + EVENT_INSERT_CHUNK]
+                    placeholders = ", ".join(["?"] * len(chunk))
+                    self.cursor.execute(
+                        f"SELECT swipe_id FROM Swipe_Journal WHERE swipe_id IN ({placeholders})", chunk
+                    )
+                    applied.update(row.swipe_id for row in self.cursor.fetchall())
+                events = [event for event in events if event.swipe_id not in applied]
+
+            # Pre-provisioned days come straight from memory
+            with write_stages.time('date_keys'):
+                date_ids = {}
+                for event in events:
+                    event_date = event.timestamp.date()
+                    if event_date not in date_ids:
+                        date_ids[event_date] = date_keys.resolve(self.cursor, event_date)
+
+            # Valid employees - normal events, written as multi-row inserts
+            with write_stages.time('insert_events'):
+                granted = [
+                    (event.event_type, event.timestamp, event.description, event.rfid,
+                     date_ids[event.timestamp.date()])
+                    for event in events
+                    if event.rfid and event.authorized and date_ids[event.timestamp.date()]
+                ]
+                bulk_insert(
+                    self.cursor, "Evenement",
+                    ["type_evenement", "date_evenement", "description", "rfid", "date_id"],
+                    granted
+                )
+
+            # Unknown RFIDs - one alert per badge and window, with the event linked to it
+            with write_stages.time('insert_alerts'):
+                denied = [
+                    event for event in events
+                    if event.rfid and not event.authorized and date_ids[event.timestamp.date()]
+                ]
+                alert_collapser.write(self.cursor, denied, date_ids)
+
+            # Remember the swipes in the same transaction as their rows
+            with write_stages.time('insert_swipe_ids'):
+                now = datetime.now()
+                storing_swipe_ids = True
+                bulk_insert(
+                    self.cursor, "Swipe_Journal",
+                    ["swipe_id", "applied_at"],
+                    [(event.swipe_id, now) for event in events if event.swipe_id]
+                )
+                storing_swipe_ids = False
+
+            with write_stages.time('commit'):
+                self.conn.commit()
+            logger.debug(f"Successfully recorded {len(events)} access events")
+
+            return True
+
+        except Exception as e:
+            # Duplicate swipe id: the live writer or the journal replay stored some of
+            # these swipes after the dedupe read. They are applied; write the rest again
+            if storing_swipe_ids and retries and is_duplicate_key(e):
+                try:
+                    self.conn.rollback()
+                except:
+                    pass
+                logger.info(f"Swipes stored by another writer, writing the batch again without them: {str(e)}")
+                return self.record_access_events(events, retries - 1)
+            logger.error(f"Error recording access events: {str(e)}")
+            signals.log_message.emit(f"Error recording event: {str(e)}")
+            if self.conn:
+                try:
+                    self.conn.rollback()
+                except:
+                    pass
+            # The rows themselves are at fault, the writer isolates them
+            if is_rejected(e):
+                raise RejectedEvents(str(e)) from e
+            return False
+
+    def fetch_employee(self, rfid):
+        self.cursor.execute("SELECT rfid, nom, prenom FROM Employe WHERE rfid = ?", (rfid,))
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+        return {
+            'rfid': row.rfid,
+            'nom': row.nom,
+            'prenom': row.prenom,
+            'name': f"{row.prenom} {row.nom}"
+        }
+
+    def fetch_employees(self, rfids):
+        employees = {}
+        for i in range(0, len(rfids), EVENT_INSERT_CHUNK):
+            chunk = rfids[i:i + EVENT_INSERT_CHUNK]
+            placeholders = ", ".join(["?"] * len(chunk))
+            self.cursor.execute(f"SELECT rfid, nom, prenom FROM Employe WHERE rfid IN ({placeholders})", chunk)
+            for row in self.cursor.fetchall():
+                employees[row.rfid] = {
+                    'rfid': row.rfid,
+                    'nom': row.nom,
+                    'prenom': row.prenom,
+                    'name': f"{row.prenom} {row.nom}"
+                }
+        return employees
+
+    def fetch_all_employees(self):
+        self.cursor.execute("SELECT rfid, nom, prenom FROM Employe")
+        return [
+            {
+                'rfid': row.rfid,
+                'nom': row.nom,
+                'prenom': row.prenom,
+                'name': f"{row.prenom} {row.nom}"
+            }
+            for row in self.cursor.fetchall()
+        ]
+
+    def get_recent_events(self, limit=50, after_id=None):
+        # after_id: only events written after that one, newest first by id
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return []
+
+            where = "" if after_id is None else "WHERE e.evenement_id > ?"
+            order = "e.date_evenement" if after_id is None else "e.evenement_id"
+            query = f'''
+                SELECT {backend.top_clause} e.evenement_id, e.type_evenement, e.date_evenement, e.description,
+                       COALESCE({backend.concat("em.prenom", "' '", "em.nom")}, 'Unknown') as employee_name,
+                       COALESCE(em.rfid, '') as rfid
+                FROM Evenement e
+                LEFT JOIN Employe em ON e.rfid = em.rfid
+                {where}
+                ORDER BY {order} DESC
+                {backend.limit_clause}
+            '''
+
+            params = [] if after_id is None else [after_id]
+            # The row limit goes where the dialect puts it, TOP before WHERE or LIMIT after
+            params = [limit] + params if backend.top_clause else params + [limit]
+            self.cursor.execute(query, params)
+            results = self.cursor.fetchall()
+            events = []
+
+            for row in results:
+                events.append({
+                    'id': row.evenement_id,
+                    'type': row.type_evenement,
+                    'date': row.date_evenement,
+                    'description': row.description,
+                    'employee': row.employee_name,
+                    'rfid': row.rfid
+                })
+
+            return events
+
+        except Exception as e:
+            logger.error(f"Error fetching recent events: {str(e)}")
+            signals.log_message.emit(f"Error fetching events: {str(e)}")
+            return []
+
+    def get_all_employees(self, rfids=None):
+        # rfids limits the result to those badges, for change-feed updates
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return []
+
+            where = ""
+            if rfids is not None:
+                if not rfids:
+                    return []
+                where = f"WHERE e.rfid IN ({', '.join(['?'] * len(rfids))})"
+
+            query = f'''
+                SELECT e.rfid, e.nom, e.prenom, e.email, e.telephone,
+                       eq.nom_equipe, pc.titre_poste
+                FROM Employe e
+                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
+                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id
+                {where}
+                ORDER BY e.nom, e.prenom
+            '''
+
+            self.cursor.execute(query, list(rfids or []))
+            results = self.cursor.fetchall()
+            employees = []
+
+            for row in results:
+                employees.append({
+                    'rfid': row.rfid,
+                    'name': f"{row.prenom} {row.nom}",
+                    'email': row.email or '',
+                    'phone': row.telephone or '',
+                    'team': row.nom_equipe or '',
+                    'position': row.titre_poste or ''
+                })
+
+            return employees
+
+        except Exception as e:
+            logger.error(f"Error fetching employees: {str(e)}")
+            signals.log_message.emit(f"Error fetching employees: {str(e)}")
+            return []
+
+    def get_changes(self, since, limit=MAX_CHANGES_PER_REQUEST):
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return None
+            return change_feed.fetch_changes(self.cursor, since, limit)
+        except Exception as e:
+            logger.error(f"Error fetching changes: {str(e)}")
+            return None
+
+    def get_change_version(self):
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return None
+            return change_feed.current_version(self.cursor)
+        except Exception as e:
+            logger.error(f"Error fetching change version: {str(e)}")
+            return None
+
+    def add_new_employee(self, rfid, first_name, last_name, email, phone, team_id=None, position_id=None):
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return False
+
+            # Check if RFID already exists
+            self.cursor.execute("SELECT COUNT(*) FROM Employe WHERE rfid = ?", (rfid,))
+            count = self.cursor.fetchone()[0]
+
+            if count > 0:
+                logger.warning(f"RFID {rfid} already exists in database")
+                signals.log_message.emit(f"RFID {rfid} already exists in database")
+                return False
+
+            # Current date for date_id reference
+            current_date = datetime.now().date()
+            date_id = date_keys.resolve(self.cursor, current_date)
+
+            # Insert new employee
+            query = '''
+                INSERT INTO Employe (rfid, nom, prenom, email, telephone, date_embauche, equipe_id, poste_id, date_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
+
+            self.cursor.execute(query, (
+                rfid, last_name, first_name, email, phone, current_date,
+                team_id, position_id, date_id
+            ))
+
+            self.conn.commit()
+            notify_employee_changed(rfid)
+            logger.info(f"Added new employee with RFID {rfid}: {first_name} {last_name}")
+            signals.log_message.emit(f"Added new employee: {first_name} {last_name}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error adding new employee: {str(e)}")
+            signals.log_message.emit(f"Error adding employee: {str(e)}")
+            if self.conn:
+                try:
+                    self.conn.rollback()
+                except:
+                    pass
+            return False
+
+    def get_teams(self):
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return []
+
+            self.cursor.execute("SELECT equipe_id, nom_equipe FROM Equipe ORDER BY nom_equipe")
+            results = self.cursor.fetchall()
+            teams = []
+
+            for row in results:
+                teams.append({
+                    'id': row.equipe_id,
+                    'name': row.nom_equipe
+                })
+
+            return teams
+
+        except Exception as e:
+            logger.error(f"Error fetching teams: {str(e)}")
+            return []
+
+    def get_positions(self):
+        try:
+            if not self.conn or not self.cursor:
+                if not self.reconnect():
+                    return []
+
+            self.cursor.execute("SELECT poste_id, titre_poste FROM Poste_Competence ORDER BY titre_poste")
+            results = self.cursor.fetchall()
+            positions = []
+
+            for row in results:
+                positions.append({
+                    'id': row.poste_id,
+                    'title': row.titre_poste
+                })
+
+            return positions
+
+        except Exception as e:
+            logger.error(f"Error fetching positions: {str(e)}")
+            return []
+
+    def close(self):
+        if self.pooled:
+            return
+        if self.conn:
+            self.conn.close()
+            logger.info("Database connection closed")
+
+
+def load_employee(rfid):
+    # Loader for cache misses and background refreshes
+    started = time.perf_counter()
+    with db_pool.connection() as conn:
+        verify_stages.observe(time.perf_counter() - started, 'connect')
+        with verify_stages.time('select_employee'):
+            return DatabaseManager(conn).fetch_employee(rfid)
+
+
+def load_employees(rfids):
+    with db_pool.connection() as conn:
+        return DatabaseManager(conn).fetch_employees(rfids)
+
+
+def warm_employee_cache():
+    try:
+        with db_pool.connection() as conn:
+            employees = DatabaseManager(conn).fetch_all_employees()
+        employee_cache.warm(employees)
+        auth_snapshot.rebuild(employee['rfid'] for employee in employees)
+    except Exception as e:
+        logger.error(f"Failed to warm authorization cache: {str(e)}")
+
+
+def refresh_snapshot(rfid=None):
+    # One badge changed, or None to diff against the whole Employe table
+    if rfid is None:
+        with db_pool.connection() as conn:
+            employees = DatabaseManager(conn).fetch_all_employees()
+        auth_snapshot.rebuild(employee['rfid'] for employee in employees)
+    else:
+        auth_snapshot.set_present(rfid, load_employee(rfid) is not None)
+
+
+_snapshot_rebuild = threading.Lock()
+
+
+def rebuild_snapshot_if_stale():
+    if auth_snapshot.age() < SNAPSHOT_REBUILD_INTERVAL or not _snapshot_rebuild.acquire(blocking=False):
+        return
+
+    def rebuild():
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to rebuild authorization snapshot: {str(e)}")
+        finally:
+            _snapshot_rebuild.release()
+
+    # Readers keep getting the current snapshot meanwhile
+    threading.Thread(target=rebuild, name='snapshot-rebuild', daemon=True).start()
+
+
+def write_access_events(events):
+    started = time.perf_counter()
+    with db_pool.connection() as conn:
+        # Pool checkout, including a reconnect if the connection was dead
+        write_stages.observe(time.perf_counter() - started, 'connect')
+        written = DatabaseManager(conn).record_access_events(events)
+    if written:
+        swipe_journal.ack([event.swipe_id for event in events])
+    return written
+
+
+def journal_record(event):
+    return {
+        'id': event.swipe_id,
+        'rfid': event.rfid,
+        'type': event.event_type,
+        'description': event.description,
+        'epoch': event.timestamp.timestamp(),
+        'authorized': event.authorized
+    }
+
+
+def dead_letter_events(events, error):
+    # Out of the queue for good: recorded for an operator and acknowledged in the journal
+    dead_letters.write(events, error)
+    swipe_journal.ack([event.swipe_id for event in events])
+
+
+def journal_record_to_event(record):
+    return AccessEvent(
+        record['rfid'],
+        record['type'],
+        record['description'],
+        datetime.fromtimestamp(record['epoch']),
+        record['authorized'],
+        record['id']
+    )
+
+
+def prepare_date_keys():
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            date_keys.load(cursor)
+            date_keys.provision(cursor)
+    except Exception as e:
+        logger.error(f"Failed to provision date keys: {str(e)}")
+
+
+def prepare_journal_table():
+    try:
+        with db_pool.connection() as conn:
+            db_manager = DatabaseManager(conn)
+            db_manager.ensure_journal_table()
+            db_manager.prune_journal_table()
+    except Exception as e:
+        logger.error(f"Failed to prepare Swipe_Journal table: {str(e)}")
+
+
+def prepare_alert_columns():
+    try:
+        with db_pool.connection() as conn:
+            ensure_alert_columns(conn.cursor())
+    except Exception as e:
+        logger.error(f"Failed to prepare Alerte columns: {str(e)}")
+
+
+def prepare_change_log():
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            change_feed.ensure_change_log(cursor)
+            change_feed.prune_change_log(cursor, CHANGE_LOG_RETENTION_DAYS)
+    except Exception as e:
+        logger.error(f"Failed to prepare Change_Log: {str(e)}")
+
+
+def worker_journal_dir():
+    return os.path.join(JOURNAL_DIR, f"worker-{os.getpid()}")
+
+
+employee_cache.loader = load_employee
+auth_snapshot = AuthorizationSnapshot()
+swipe_debouncer = SwipeDebouncer(DEBOUNCE_WINDOW, DEBOUNCE_MAX_ENTRIES)
+reader_limiter = TokenBucketLimiter(READER_RATE, READER_BURST, RATE_LIMIT_MAX_KEYS)
+uid_limiter = TokenBucketLimiter(UID_RATE, UID_BURST, RATE_LIMIT_MAX_KEYS)
+alert_collapser = AlertCollapser(ALERT_COLLAPSE_WINDOW)
+invalidation_feed = InvalidationFeed(CACHE_INVALIDATION_FILE, employee_cache, listeners=[refresh_snapshot])
+dead_letters = DeadLetterLog(DEAD_LETTER_FILE, journal_record)
+event_writer = AccessEventWriter(write_access_events, dead_letter_events)
+swipe_journal = SwipeJournal(worker_journal_dir())
+journal_replayer = JournalReplayer(
+    swipe_journal, write_access_events, journal_record_to_event, dead_letters.write, root=JOURNAL_DIR
+)
+
+metrics.stats_gauges('rfid_pool', "Connection pool", db_pool.stats)
+metrics.stats_gauges('rfid_cache', "Authorization cache", employee_cache.stats)
+metrics.stats_gauges('rfid_writer', "Access event writer queue", event_writer.stats)
+metrics.stats_gauges('rfid_journal', "Swipe journal", swipe_journal.stats)
+metrics.stats_gauges('rfid_debounce', "Swipe debouncer", swipe_debouncer.stats)
+metrics.stats_gauges('rfid_reader_limit', "Per-reader rate limiter", reader_limiter.stats)
+metrics.stats_gauges('rfid_uid_limit', "Per-badge rate limiter", uid_limiter.stats)
+metrics.stats_gauges('rfid_alerts', "Unknown-badge alerts", alert_collapser.stats)
+metrics.stats_gauges('rfid_logging', "Log pipeline", log_pipeline.stats)
+
+
+def record_decision(event):
+    # Durable before the reply, so the swipe survives a database outage or crash
+    try:
+        with verify_stages.time('journal'):
+            swipe_journal.append(journal_record(event))
+    except Exception as e:
+        logger.error(f"Failed to journal swipe for RFID {event.rfid}: {str(e)}")
+
+    with verify_stages.time('enqueue'):
+        event_writer.submit(event)
+
+
+def decide_access(rfid_value, employee, timestamp=None, reader_id=None):
+    now = timestamp or datetime.now()
+    current_time = now.strftime("%Y-%m-%d %H:%M:%S")
+    # Gateways tell us which of their readers saw the badge
+    reader = f" (reader {reader_id})" if reader_id else ""
+
+    if employee:
+        employee_name = employee['name']
+        logger.info(f"RFID {rfid_value} authorized - Employee: {employee_name}")
+        signals.log_message.emit(f"Access granted for {employee_name}")
+
+        # Emit signal for UI update
+        signals.new_access_event.emit(
+            current_time,
+            rfid_value,
+            employee_name,
+            "ACCESS GRANTED"
+        )
+        return AccessEvent(rfid_value, "AUTHORIZED", f"Door access granted{reader}", now, True, new_swipe_id())
+    else:
+        logger.warning(f"RFID {rfid_value} unauthorized - No matching employee")
+        signals.log_message.emit(f"Access denied for RFID: {rfid_value}")
+
+        # Emit signal for UI update
+        signals.new_access_event.emit(
+            current_time,
+            rfid_value,
+            "Unknown",
+            "ACCESS DENIED"
+        )
+        return AccessEvent(rfid_value, "UNAUTHORIZED", f"Unauthorized access attempt{reader}", now, False,
+                           new_swipe_id())
+
+
+def verify_rfid(rfid_value, reader=None):
+    with verify_stages.time('debounce'):
+        authorized = swipe_debouncer.check(reader, rfid_value)
+    if authorized is not None:
+        logger.debug(f"Repeat tap of RFID {rfid_value} on reader {reader} within debounce window")
+        return authorized
+    if not uid_limiter.allow(rfid_value):
+        logger.warning(f"RFID {rfid_value} rate limited, swipe refused and not recorded")
+        return False
+
+    try:
+        logger.debug(f"Verifying RFID: {rfid_value}")
+        signals.log_message.emit(f"Verifying RFID: {rfid_value}")
+
+        # Answered from the authorization cache, the database is only hit on a miss
+        with verify_stages.time('lookup'):
+            employee = employee_cache.lookup(rfid_value)
+    except Exception as e:
+        logger.error(f"Database error during RFID verification: {str(e)}")
+        signals.log_message.emit(f"Database error: {str(e)}")
+        return False
+
+    # Journal and queue the access event, the writer thread commits it in a batch
+    with verify_stages.time('decide'):
+        event = decide_access(rfid_value, employee)
+    record_decision(event)
+    swipe_debouncer.remember(reader, rfid_value, event.authorized)
+    return event.authorized
+
+
+def parse_swipe_time(value):
+    if value is None or value == "":
+        return datetime.now()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    return datetime.fromisoformat(str(value))
+
+
+def verify_rfids(swipes, source=None):
+    # Returns one decision per swipe, in order; source tells gateways apart for debouncing
+    decisions = [None] * len(swipes)
+    valid = []
+    # Repeat taps inside this batch: (decision, first decision for that reader and badge)
+    first_taps = {}
+    repeats = []
+    for i, swipe in enumerate(swipes):
+        rfid = swipe.get('rfid') if isinstance(swipe, dict) else None
+        decision = {'reader_id': swipe.get('reader_id') if isinstance(swipe, dict) else None, 'rfid': rfid}
+        decisions[i] = decision
+        if not rfid:
+            decision['error'] = "missing rfid"
+            continue
+        if not isinstance(rfid, str) or len(rfid) > MAX_RFID_LENGTH:
+            decision['error'] = "invalid rfid"
+            continue
+        try:
+            timestamp = parse_swipe_time(swipe.get('ts'))
+        except (TypeError, ValueError, OverflowError, OSError):
+            decision['error'] = "invalid ts"
+            continue
+
+        reader = f"{source}/{decision['reader_id']}"
+        authorized = swipe_debouncer.check(reader, rfid)
+        if authorized is not None:
+            decision['decision'] = "authorized" if authorized else "unauthorized"
+            decision['debounced'] = True
+        elif (reader, rfid) in first_taps:
+            repeats.append((decision, first_taps[(reader, rfid)]))
+        elif not uid_limiter.allow(rfid):
+            decision['decision'] = "unauthorized"
+            decision['rate_limited'] = True
+        else:
+            first_taps[(reader, rfid)] = decision
+            valid.append((decision, timestamp))
+
+    try:
+        signals.log_message.emit(f"Verifying {len(valid)} batched RFIDs")
+        # One cache pass, and one IN (...) query for whatever missed
+        employees = employee_cache.lookup_many([decision['rfid'] for decision, _ in valid], load_employees)
+    except Exception as e:
+        logger.error(f"Database error during batch RFID verification: {str(e)}")
+        signals.log_message.emit(f"Database error: {str(e)}")
+        for decision, _ in valid:
+            decision['decision'] = "unauthorized"
+        for decision, _ in repeats:
+            decision['decision'] = "unauthorized"
+        return decisions
+
+    events = []
+    for decision, timestamp in valid:
+        event = decide_access(decision['rfid'], employees.get(decision['rfid']), timestamp, decision['reader_id'])
+        decision['decision'] = "authorized" if event.authorized else "unauthorized"
+        swipe_debouncer.remember(f"{source}/{decision['reader_id']}", decision['rfid'], event.authorized)
+        events.append(event)
+    for decision, first in repeats:
+        decision['decision'] = first['decision']
+        decision['debounced'] = True
+
+    # One fsync and one queued write for the whole request
+    try:
+        swipe_journal.append_many([journal_record(event) for event in events])
+    except Exception as e:
+        logger.error(f"Failed to journal {len(events)} batched swipes: {str(e)}")
+    event_writer.submit_many(events)
+    return decisions
+
+
+# Request ids and timings for the access log
+@app.before_request
+def begin_request():
+    g.started = time.perf_counter()
+    g.request_id_token = request_id.set(request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16])
+
+
+@app.after_request
+def end_request(response):
+    duration_ms = round((time.perf_counter() - g.get('started', time.perf_counter())) * 1000, 2)
+    access_logger.info(f"{request.method} {request.path} {response.status_code}", extra={
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': duration_ms,
+        'remote': request.remote_addr,
+    })
+    response.headers['X-Request-ID'] = request_id.get() or ''
+    return response
+
+
+@app.teardown_request
+def clear_request_id(error=None):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id.reset(token)
+
+
+# Flask routes
+@app.route('/verify', methods=['GET'])
+def verify():
+    rfid = request.args.get('rfid')
+
+    if not rfid:
+        logger.warning("Verification request received without RFID parameter")
+        return "error: missing rfid parameter", 400
+    if len(rfid) > MAX_RFID_LENGTH:
+        logger.warning(f"Verification request with an RFID longer than {MAX_RFID_LENGTH} characters")
+        return "error: invalid rfid parameter", 400
+
+    logger.info(f"Verification request received for RFID: {rfid}")
+
+    # The firmware sends no reader id, each ESP32 is told apart by its address
+    reader = request.args.get('reader') or request.remote_addr
+
+    if not reader_limiter.allow(request.remote_addr):
+        logger.warning(f"Reader {request.remote_addr} rate limited")
+        reader_verifications.inc(reader, "rate_limited")
+        # The firmware only opens on an "authorized" body
+        return "unauthorized", 429
+
+    with verify_stages.time('total'):
+        authorized = verify_rfid(rfid, reader)
+    if authorized:
+        reader_verifications.inc(reader, "authorized")
+        return "authorized"
+    else:
+        reader_verifications.inc(reader, "unauthorized")
+        return "unauthorized"
+
+
+@app.route('/verify/batch', methods=['POST'])
+def verify_batch():
+    # Body: {"swipes": [{"reader_id": ..., "rfid": ..., "ts": ...}, ...]} or the bare list;
+    # ts is epoch seconds or ISO 8601 and defaults to now
+    payload = request.get_json(silent=True)
+    swipes = payload.get('swipes') if isinstance(payload, dict) else payload
+
+    if not isinstance(swipes, list):
+        logger.warning("Batch verification request without a swipes list")
+        return jsonify({'error': "expected a JSON list of swipes"}), 400
+    if len(swipes) > MAX_BATCH_SWIPES:
+        return jsonify({'error': f"at most {MAX_BATCH_SWIPES} swipes per batch"}), 413
+
+    # A gateway's batch is one request; its swipes are limited per badge
+    if not reader_limiter.allow(request.remote_addr):
+        logger.warning(f"Gateway {request.remote_addr} rate limited")
+        return jsonify({'error': "rate limited"}), 429
+
+    logger.info(f"Batch verification request received for {len(swipes)} swipes")
+    decisions = verify_rfids(swipes, request.remote_addr)
+    for decision in decisions:
+        reader_verifications.inc(f"{request.remote_addr}/{decision['reader_id']}",
+                                 decision.get('decision', "error"))
+    return jsonify({'decisions': decisions})
+
+
+@app.route('/status', methods=['GET'])
+def status():
+    return "running", 200
+
+
+@app.route('/status/pool', methods=['GET'])
+def pool_status():
+    return jsonify(db_pool.stats())
+
+
+@app.route('/status/cache', methods=['GET'])
+def cache_status():
+    return jsonify(employee_cache.stats())
+
+
+@app.route('/status/writer', methods=['GET'])
+def writer_status():
+    return jsonify(event_writer.stats())
+
+
+@app.route('/status/journal', methods=['GET'])
+def journal_status():
+    stats = swipe_journal.stats()
+    stats['replayed'] = journal_replayer.replayed
+    stats['adopted'] = journal_replayer.adopted
+    stats['dead_lettered'] = journal_replayer.dead_lettered
+    stats['worker_pid'] = os.getpid()
+    return jsonify(stats)
+
+
+@app.route('/status/debounce', methods=['GET'])
+def debounce_status():
+    return jsonify(swipe_debouncer.stats())
+
+
+@app.route('/status/ratelimit', methods=['GET'])
+def rate_limit_status():
+    return jsonify({
+        'readers': reader_limiter.stats(),
+        'uids': uid_limiter.stats(),
+        'alerts': alert_collapser.stats(),
+    })
+
+
+@app.route('/status/logging', methods=['GET'])
+def logging_status():
+    return jsonify(log_pipeline.stats())
+
+
+# Prometheus text format; each worker process reports its own numbers
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/status/snapshot', methods=['GET'])
+def snapshot_status():
+    return jsonify(auth_snapshot.stats())
+
+
+def snapshot_client_allowed():
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    # Constant time, the comparison must not leak how much of a token matched
+    token = token.strip().encode()
+    return any(hmac.compare_digest(token, allowed.strip().encode()) for allowed in SNAPSHOT_TOKENS)
+
+
+def snapshot_refused():
+    logger.warning(f"{request.path} request from {request.remote_addr} without a valid reader token")
+    response = jsonify({'error': "reader token required"})
+    response.status_code = 401
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+# Authorization snapshot for readers and gateways that decide offline
+@app.route('/snapshot', methods=['GET'])
+def authorization_snapshot():
+    if not snapshot_client_allowed():
+        return snapshot_refused()
+    rebuild_snapshot_if_stale()
+    etag, uids = auth_snapshot.snapshot()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif request.args.get('format') == 'text':
+        # One UID per line, sorted, so a reader can binary search it
+        response = app.response_class("".join(uid + "\n" for uid in uids), mimetype='text/plain')
+    else:
+        response = jsonify({'etag': etag, 'count': len(uids), 'uids': uids})
+    response.set_etag(etag)
+    return response
+
+
+@app.route('/snapshot/delta', methods=['GET'])
+def authorization_snapshot_delta():
+    if not snapshot_client_allowed():
+        return snapshot_refused()
+    rebuild_snapshot_if_stale()
+    since = request.args.get('since', '').strip('"')
+    delta = auth_snapshot.delta(since) if since else None
+
+    if delta is None:
+        # Unknown or too old ETag, send everything
+        etag, uids = auth_snapshot.snapshot()
+        response = jsonify({'etag': etag, 'full': True, 'uids': uids})
+    elif delta[0] == since:
+        etag = since
+        response = app.response_class(status=304)
+    else:
+        etag, added, removed = delta
+        response = jsonify({'etag': etag, 'full': False, 'added': added, 'removed': removed})
+    response.set_etag(etag)
+    return response
+
+
+# Row changes on Employe, Equipe and Poste_Competence since a feed version
+# Entries just below ``since`` can come again, consumers drop versions they applied
+@app.route('/changes', methods=['GET'])
+def changes():
+    if not snapshot_client_allowed():
+        return snapshot_refused()
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', MAX_CHANGES_PER_REQUEST)), MAX_CHANGES_PER_REQUEST)
+    except ValueError:
+        return jsonify({'error': "since and limit must be integers"}), 400
+    if since < 0 or limit < 1:
+        return jsonify({'error': "since must be >= 0 and limit >= 1"}), 400
+
+    try:
+        with db_pool.connection() as conn:
+            feed = change_feed.fetch_changes(conn.cursor(), since, limit)
+    except Exception as e:
+        logger.error(f"Error fetching changes: {str(e)}")
+        return jsonify({'error': "database unavailable"}), 503
+    return jsonify(feed)
+
+
+@app.route('/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    rfid = request.values.get('rfid')
+    if rfid:
+        employee_cache.invalidate(rfid)
+    else:
+        employee_cache.clear()
+    # The other worker processes pick it up from the shared feed
+    try:
+        invalidation_feed.publish(rfid)
+    except Exception as e:
+        logger.error(f"Failed to publish cache invalidation: {str(e)}")
+    logger.info(f"Authorization cache invalidated for {rfid or 'all badges'}")
+    return "ok", 200
+
+
+def start_background_workers():
+    # Decided here, not at import: gunicorn forks its workers after importing us
+    log_pipeline.start()
+    swipe_journal.directory = worker_journal_dir()
+    swipe_journal.open()
+    prepare_journal_table()
+    prepare_alert_columns()
+    prepare_change_log()
+    prepare_date_keys()
+    # Follow invalidations before warming so none falls in between
+    invalidation_feed.start()
+    warm_employee_cache()
+    event_writer.start()
+    journal_replayer.start()
+
+
+def shutdown_background_workers():
+    journal_replayer.stop()
+    event_writer.stop()
+    invalidation_feed.stop()
+    swipe_journal.close()
+    db_pool.close()
+
+
+def check_database():
+    try:
+        conn = backend.connect()
+        logger.info(f"Connected to database: {backend.version(conn.cursor())}")
+        conn.close()
+    except Exception as e:
+        logger.error(f"Failed to connect to database on startup: {str(e)}")
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host or '0.0.0.0', int(port)
+
+
+def serve_gunicorn(options):
+    from gunicorn.app.base import BaseApplication
+
+    class RFIDServerApplication(BaseApplication):
+        def __init__(self, settings):
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    def post_worker_init(worker):
+        start_background_workers()
+
+    def worker_exit(server, worker):
+        # Flushes the writer and journal on graceful stop and on HUP reload
+        shutdown_background_workers()
+
+    RFIDServerApplication({
+        'bind': options.bind,
+        'workers': options.workers,
+        'threads': options.threads,
+        'worker_class': 'gthread',
+        'keepalive': options.keepalive,
+        'timeout': options.timeout,
+        'graceful_timeout': options.graceful_timeout,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }).run()
+
+
+def serve_waitress(options):
+    from waitress import serve
+
+    host, port = parse_bind(options.bind)
+    start_background_workers()
+    atexit.register(shutdown_background_workers)
+    serve(app, host=host, port=port, threads=options.threads, channel_timeout=options.timeout)
+
+
+def serve_development(options):
+    host, port = parse_bind(options.bind)
+    start_background_workers()
+    atexit.register(shutdown_background_workers)
+    app.run(host=host, port=port, debug=False, threaded=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless RFID access-control server",
+        epilog="Under gunicorn, send SIGHUP to the master for a graceful reload."
+    )
+    parser.add_argument('--bind', default=DEFAULT_BIND, help="host:port to listen on")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="worker processes (gunicorn only)")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help="request threads per worker")
+    parser.add_argument('--keepalive', type=int, default=DEFAULT_KEEPALIVE,
+                        help="seconds to keep idle connections open (gunicorn only)")
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT, help="request timeout in seconds")
+    parser.add_argument('--graceful-timeout', type=int, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help="seconds a worker gets to finish on stop or reload (gunicorn only)")
+    parser.add_argument('--debounce-window', type=float, default=DEBOUNCE_WINDOW,
+                        help="seconds a repeat tap on the same reader is answered without recording (0 disables)")
+    parser.add_argument('--reader-rate', type=float, default=READER_RATE,
+                        help="verifications per second allowed per reader address (0 disables)")
+    parser.add_argument('--uid-rate', type=float, default=UID_RATE,
+                        help="verifications per second allowed per badge UID (0 disables)")
+    parser.add_argument('--alert-window', type=float, default=ALERT_COLLAPSE_WINDOW,
+                        help="seconds during which denials of one unknown badge share an alert")
+    parser.add_argument('--log-level', action='append', default=[], metavar='COMPONENT=LEVEL',
+                        help="level for a logger, e.g. rfid_server.writer=DEBUG (repeatable)")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress', 'development'], default='auto',
+                        help="auto uses gunicorn, or waitress where gunicorn is unavailable (Windows)")
+    options = parser.parse_args(argv)
+    swipe_debouncer.window = options.debounce_window
+    reader_limiter.rate = options.reader_rate
+    uid_limiter.rate = options.uid_rate
+    alert_collapser.window = options.alert_window
+    log_pipeline.set_levels(parse_levels(",".join(options.log_level)))
+
+    logger.info("Starting RFID Access Control Server")
+    check_database()
+
+    server = options.server
+    if server == 'auto':
+        try:
+            import gunicorn
+            server = 'gunicorn'
+        except ImportError:
+            try:
+                import waitress
+                server = 'waitress'
+            except ImportError:
+                logger.warning("Neither gunicorn nor waitress is installed, using the development server")
+                server = 'development'
+
+    logger.info(f"Serving on {options.bind} with {server}")
+    if server == 'gunicorn':
+        serve_gunicorn(options)
+    elif server == 'waitress':
+        serve_waitress(options)
+    else:
+        serve_development(options)
+
+
+if __name__ == '__main__':
+    main()
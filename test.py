@@ -1,10 +1,12 @@
-import pyodbc
 import serial
 import threading
 import time
 from datetime import datetime
 import logging
 
+from models.storage import backend
+from models.debounce import SwipeDebouncer
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,21 +16,12 @@ logging.basicConfig(
 
 class DatabaseManager:
     def __init__(self):
-        self.conn_str = (
-            'DRIVER={ODBC Driver 18 for SQL Server};'
-            'SERVER=IHEB;'
-            'DATABASE=rfid;'
-            'Trusted_Connection=Yes;'
-            'Encrypt=no'
-        )
         self.create_tables()
 
     def create_tables(self):
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='employees' AND xtype='U')
-                CREATE TABLE employees (
+            backend.create_table(cursor, 'employees', """
                     id INT IDENTITY(1,1) PRIMARY KEY,
                     qr_code VARCHAR(255) UNIQUE NOT NULL,
                     name VARCHAR(255) NOT NULL,
@@ -36,22 +29,18 @@ class DatabaseManager:
                     card_expiry DATE,
                     authorized_access VARCHAR(255),
                     status VARCHAR(10) DEFAULT 'ACTIVE'
-                )
             """)
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='access_logs' AND xtype='U')
-                CREATE TABLE access_logs (
+            backend.create_table(cursor, 'access_logs', """
                     id INT IDENTITY(1,1) PRIMARY KEY,
                     qr_code VARCHAR(255),
                     access_time DATETIME DEFAULT GETDATE(),
                     access_granted BIT,
                     reason VARCHAR(255)
-                )
             """)
             conn.commit()
 
     def get_connection(self):
-        return pyodbc.connect(self.conn_str)
+        return backend.connect()
 
     def log_access_attempt(self, qr_code, granted, reason=""):
         try:
@@ -105,20 +94,28 @@ class SerialHandler:
         self.db = DatabaseManager()
         self.waiting_for_card = False
         self.card_callback = None
+        # One reader per serial port, so the key is just the code
+        self.debouncer = SwipeDebouncer()
         logging.info(f"Serial connection established on {port}")
 
     def listen(self):
         while True:
             try:
                 if self.ser.in_waiting > 0:
-                    qr_code = self.ser.readline().decode().strip()
+                    qr_code = self.ser.readline().decode(errors='replace').strip()
+                    if not qr_code:
+                        continue
                     logging.info(f"Received UID: {qr_code}")
 
                     if self.waiting_for_card and self.card_callback:
                         self.card_callback(qr_code)
                         self.waiting_for_card = False
                     else:
-                        response = self.db.check_access(qr_code)
+                        # A repeat read gets the same answer without another access_logs row
+                        response = self.debouncer.check(None, qr_code)
+                        if response is None:
+                            response = self.db.check_access(qr_code)
+                            self.debouncer.remember(None, qr_code, response)
                         logging.info(f"Sending response: {response}")
                         self.ser.write(f"{response}\n".encode())
                         self.ser.flush()
@@ -0,0 +1,106 @@
+import time
+import random
+import asyncio
+import argparse
+import aiohttp
+
+# Bodies the ESP32 firmware's verifyCardWithServer understands
+VALID_BODIES = ("authorized", "unauthorized")
+
+# All clients connect from one address, so the servers must run without
+# their flood limits or this measures the limiter:
+#   python rfid_server.py --reader-rate 0 --uid-rate 0
+#   python rfid_async_server.py --reader-rate 0 --uid-rate 0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(url, rfids, total, concurrency, keepalive):
+    latencies = []
+    errors = 0
+    bad_bodies = 0
+    rate_limited = 0
+    counter = iter(range(total))
+
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=not keepalive)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def reader(reader_id):
+            nonlocal errors, bad_bodies, rate_limited
+            # Each task plays one door reader firing swipes back to back
+            for _ in counter:
+                started = time.perf_counter()
+                try:
+                    params = {'rfid': random.choice(rfids), 'reader': reader_id}
+                    async with session.get(f"{url}/verify", params=params) as response:
+                        body = (await response.text()).strip()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if response.status == 429:
+                    rate_limited += 1
+                elif response.status != 200 or body not in VALID_BODIES:
+                    bad_bodies += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(reader(f"bench-{i}") for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': total,
+        'errors': errors,
+        'bad_bodies': bad_bodies,
+        'rate_limited': rate_limited,
+        'elapsed': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def print_result(name, result):
+    print(f"{name}: {result['requests']} requests in {result['elapsed']:.2f}s "
+          f"({result['throughput']:.1f} req/s), errors={result['errors']}, bad bodies={result['bad_bodies']}")
+    if result['rate_limited']:
+        print(f"    {result['rate_limited']} requests were rate limited (429): restart the server with "
+              f"--reader-rate 0 --uid-rate 0")
+    print(f"    p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+          f"p99={result['p99_ms']:.1f}ms max={result['max_ms']:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the /verify endpoint")
+    parser.add_argument('--flask', default='http://127.0.0.1:3000', help="URL of rfid_server (Flask)")
+    parser.add_argument('--async', dest='async_url', default='http://127.0.0.1:3001',
+                        help="URL of rfid_async_server")
+    parser.add_argument('--only', choices=['flask', 'async'], help="benchmark a single server")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100, help="simultaneous readers")
+    parser.add_argument('--rfids', default='', help="comma separated badges to swipe (default: random)")
+    parser.add_argument('--keepalive', action='store_true',
+                        help="reuse connections (the ESP32 opens a new one per swipe)")
+    options = parser.parse_args()
+
+    rfids = [r for r in options.rfids.split(',') if r] or [f"{random.randrange(16 ** 8):08X}" for _ in range(50)]
+
+    targets = [('flask', options.flask), ('async', options.async_url)]
+    for name, url in targets:
+        if options.only and options.only != name:
+            continue
+        result = asyncio.run(run_load(url.rstrip('/'), rfids, options.requests, options.concurrency,
+                                      options.keepalive))
+        print_result(name, result)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,23 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit,
+    QTableView, QFormLayout, QLineEdit,
     QMessageBox, QDialog, QTextEdit, QComboBox, QHeaderView
 )
 from PyQt6.QtCore import Qt
 from datetime import datetime
 
+from models.date_keys import date_keys
+from views.paged_table_model import KeysetTableModel, search_condition, selected_row
+
+
+def format_alert_row(alert):
+    # Description (shortened if too long)
+    description = alert[2]
+    if description and len(description) > 50:
+        description = description[:47] + "..."
+    employee_name = f"{alert[5]} {alert[6]}" if alert[5] and alert[6] else ""
+    return [str(alert[0]), alert[1], description, alert[3] or "", employee_name, str(alert[7] or "")]
+
 
 class AlertDialog(QDialog):
     def __init__(self, db_manager, alert=None, parent=None):
@@ -92,28 +104,13 @@ class AlertDialog(QDialog):
             # Get current date
             current_date = datetime.now().date()
 
-            # Check if date exists in Date table
-            self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-            date_id = self.db_manager.cursor.fetchone()
-
-            if not date_id:
-                # Insert date into Date table
-                self.db_manager.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (current_date, current_date.day, current_date.month, current_date.year,
-                      current_date.strftime("%A"), 0, ""))
-                self.db_manager.conn.commit()
-
-                # Get the new date_id
-                self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (current_date,))
-                date_id = self.db_manager.cursor.fetchone()
+            date_id = date_keys.resolve(self.db_manager.cursor, current_date)
 
             if not self.alert:  # Add new alert
                 self.db_manager.cursor.execute('''
                     INSERT INTO Alerte (type_alerte, description, status, rfid, date_id)
                     VALUES (?, ?, ?, ?, ?)
-                ''', (type_alerte, description, status, rfid, date_id[0]))
+                ''', (type_alerte, description, status, rfid, date_id))
             else:  # Update existing alert
                 self.db_manager.cursor.execute('''
                     UPDATE Alerte
@@ -164,15 +161,25 @@ class AlertViewGUI(QWidget):
 
         layout.addLayout(header_layout)
 
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Type", "Description", "Status", "Employee", "Date"
-        ])
+        # Table, newest alerts first, loaded a page at a time as it scrolls
+        self.model = KeysetTableModel(
+            self.db_manager,
+            columns='''a.alerte_id, a.type_alerte, a.description, a.status, a.rfid,
+                       e.nom, e.prenom, d.date_complete''',
+            source='''Alerte a
+                LEFT JOIN Employe e ON a.rfid = e.rfid
+                LEFT JOIN Date d ON a.date_id = d.date_id''',
+            key='a.alerte_id',
+            headers=["ID", "Type", "Description", "Status", "Employee", "Date"],
+            format_row=format_alert_row,
+            descending=True,
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setAlternatingRowColors(True)
 
@@ -197,69 +204,25 @@ class AlertViewGUI(QWidget):
 
     def load_alerts(self):
         try:
-            self.db_manager.cursor.execute('''
-                SELECT a.alerte_id, a.type_alerte, a.description, a.status, a.rfid, 
-                       e.nom, e.prenom, d.date_complete
-                FROM Alerte a
-                LEFT JOIN Employe e ON a.rfid = e.rfid
-                LEFT JOIN Date d ON a.date_id = d.date_id
-            ''')
-            alerts = self.db_manager.cursor.fetchall()
-
-            self.table.setRowCount(0)  # Clear the table
-
-            for row_num, alert in enumerate(alerts):
-                self.table.insertRow(row_num)
-
-                # ID
-                self.table.setItem(row_num, 0, QTableWidgetItem(str(alert[0])))
-
-                # Type
-                self.table.setItem(row_num, 1, QTableWidgetItem(alert[1]))
-
-                # Description (shortened if too long)
-                description = alert[2]
-                if description and len(description) > 50:
-                    description = description[:47] + "..."
-                self.table.setItem(row_num, 2, QTableWidgetItem(description))
-
-                # Status
-                self.table.setItem(row_num, 3, QTableWidgetItem(alert[3] or ""))
-
-                # Employee
-                employee_name = f"{alert[5]} {alert[6]}" if alert[5] and alert[6] else ""
-                self.table.setItem(row_num, 4, QTableWidgetItem(employee_name))
-
-                # Date
-                self.table.setItem(row_num, 5, QTableWidgetItem(str(alert[7] or "")))
-
+            self.model.reload()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading alerts: {str(e)}")
 
     def filter_alerts(self):
-        search_text = self.search_input.text().lower()
+        # Filtered in the query, so rows not loaded yet are searched too
+        conditions, params = search_condition(
+            ["a.type_alerte", "a.description", "a.status", "e.nom", "e.prenom"],
+            self.search_input.text()
+        )
         status_filter = self.status_filter.currentText()
+        if status_filter != "All":
+            conditions.append("a.status = ?")
+            params.append(status_filter)
 
-        for row in range(self.table.rowCount()):
-            match_found = True
-
-            # Check for search text match
-            if search_text:
-                row_match = False
-                for col in range(self.table.columnCount()):
-                    item = self.table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        row_match = True
-                        break
-                match_found = row_match
-
-            # Check for status match if filter is not "All"
-            if match_found and status_filter != "All":
-                status_item = self.table.item(row, 3)
-                if not status_item or status_item.text() != status_filter:
-                    match_found = False
-
-            self.table.setRowHidden(row, not match_found)
+        try:
+            self.model.set_filter(conditions, params)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading alerts: {str(e)}")
 
     def add_alert(self):
         dialog = AlertDialog(self.db_manager, parent=self)
@@ -268,13 +231,12 @@ class AlertViewGUI(QWidget):
             QMessageBox.information(self, "Success", "Alert added successfully")
 
     def edit_alert(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an alert to edit")
             return
 
-        selected_row = selected_rows[0].row()
-        alert_id = int(self.table.item(selected_row, 0).text())
+        alert_id = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute('''
@@ -295,14 +257,13 @@ class AlertViewGUI(QWidget):
             QMessageBox.critical(self, "Error", f"Error editing alert: {str(e)}")
 
     def delete_alert(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an alert to delete")
             return
 
-        selected_row = selected_rows[0].row()
-        alert_id = int(self.table.item(selected_row, 0).text())
-        alert_type = self.table.item(selected_row, 1).text()
+        alert_id = self.model.row_key(row)
+        alert_type = self.model.row_text(row, 1)
 
         # Check if the alert is linked to any events
         try:
@@ -1,10 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit,
+    QTableView, QFormLayout, QLineEdit,
     QDateEdit, QMessageBox, QDialog, QComboBox, QHeaderView
 )
 from PyQt6.QtCore import Qt, QDate
-from datetime import datetime
+
+from models.date_keys import date_keys
+from models.rfid_cache import notify_employee_changed
+from views.paged_table_model import KeysetTableModel, search_condition, selected_row
+
+
+def format_employee_row(emp):
+    # RFID, Name (Last, First), Email, Phone, Team, Position, Birth Date, Hire Date, Address
+    return [str(emp[0]), f"{emp[1]}, {emp[2]}", str(emp[5]), str(emp[6]), str(emp[10] or ""),
+            str(emp[11] or ""), str(emp[3]), str(emp[4]), str(emp[7])]
 
 
 class EmployeeDialog(QDialog):
@@ -143,32 +152,10 @@ class EmployeeDialog(QDialog):
             poste_id = self.position_combo.currentData()
 
             # Insert birth date into Date table if it doesn't exist
-            self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-            date_naissance_id = self.db_manager.cursor.fetchone()
-            if not date_naissance_id:
-                date_obj = datetime.strptime(date_naissance, "%Y-%m-%d").date()
-                self.db_manager.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_naissance, date_obj.day, date_obj.month, date_obj.year,
-                      date_obj.strftime("%A"), 0, ""))
-                self.db_manager.conn.commit()
-                self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_naissance,))
-                date_naissance_id = self.db_manager.cursor.fetchone()
+            date_naissance_id = date_keys.resolve(self.db_manager.cursor, date_naissance)
 
             # Insert hire date into Date table if it doesn't exist
-            self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-            date_embauche_id = self.db_manager.cursor.fetchone()
-            if not date_embauche_id:
-                date_obj = datetime.strptime(date_embauche, "%Y-%m-%d").date()
-                self.db_manager.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_embauche, date_obj.day, date_obj.month, date_obj.year, date_obj.strftime("%A"),
-                      0, ""))
-                self.db_manager.conn.commit()
-                self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_embauche,))
-                date_embauche_id = self.db_manager.cursor.fetchone()
+            date_embauche_id = date_keys.resolve(self.db_manager.cursor, date_embauche)
 
             if not self.employee:  # Add new employee
                 # Check if RFID already exists
@@ -181,16 +168,17 @@ class EmployeeDialog(QDialog):
                     INSERT INTO Employe (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id, date_id)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (rfid, nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id,
-                      date_naissance_id[0]))
+                      date_naissance_id))
             else:  # Update existing employee
                 self.db_manager.cursor.execute('''
                     UPDATE Employe
                     SET nom = ?, prenom = ?, date_naissance = ?, date_embauche = ?, email = ?, telephone = ?, adresse = ?, equipe_id = ?, poste_id = ?, date_id = ?
                     WHERE rfid = ?
                 ''', (nom, prenom, date_naissance, date_embauche, email, telephone, adresse, equipe_id, poste_id,
-                      date_embauche_id[0], rfid))
+                      date_embauche_id, rfid))
 
             self.db_manager.conn.commit()
+            notify_employee_changed(rfid)
             self.accept()  # Close dialog with success
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error saving employee: {str(e)}")
@@ -223,16 +211,24 @@ class EmployeeViewGUI(QWidget):
 
         layout.addLayout(header_layout)
 
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels([
-            "RFID", "Name", "Email", "Phone",
-            "Team", "Position", "Birth Date", "Hire Date", "Address"
-        ])
+        # Table, by RFID, loaded a page at a time as it scrolls
+        self.model = KeysetTableModel(
+            self.db_manager,
+            columns='''e.rfid, e.nom, e.prenom, e.date_naissance, e.date_embauche, e.email, e.telephone, e.adresse,
+                       e.equipe_id, e.poste_id, eq.nom_equipe, pc.titre_poste''',
+            source='''Employe e
+                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
+                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id''',
+            key='e.rfid',
+            headers=["RFID", "Name", "Email", "Phone", "Team", "Position", "Birth Date", "Hire Date", "Address"],
+            format_row=format_employee_row,
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setAlternatingRowColors(True)
 
@@ -257,62 +253,20 @@ class EmployeeViewGUI(QWidget):
 
     def load_employees(self):
         try:
-            self.db_manager.cursor.execute('''
-                SELECT e.rfid, e.nom, e.prenom, e.date_naissance, e.date_embauche, e.email, e.telephone, e.adresse, 
-                       e.equipe_id, e.poste_id, eq.nom_equipe, pc.titre_poste
-                FROM Employe e
-                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
-                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id
-            ''')
-            employees = self.db_manager.cursor.fetchall()
-
-            self.table.setRowCount(0)  # Clear the table
-
-            for row_num, emp in enumerate(employees):
-                self.table.insertRow(row_num)
-
-                # RFID
-                self.table.setItem(row_num, 0, QTableWidgetItem(str(emp[0])))
-
-                # Name (Last, First)
-                self.table.setItem(row_num, 1, QTableWidgetItem(f"{emp[1]}, {emp[2]}"))
-
-                # Email
-                self.table.setItem(row_num, 2, QTableWidgetItem(str(emp[5])))
-
-                # Phone
-                self.table.setItem(row_num, 3, QTableWidgetItem(str(emp[6])))
-
-                # Team
-                self.table.setItem(row_num, 4, QTableWidgetItem(str(emp[10] or "")))
-
-                # Position
-                self.table.setItem(row_num, 5, QTableWidgetItem(str(emp[11] or "")))
-
-                # Birth Date
-                self.table.setItem(row_num, 6, QTableWidgetItem(str(emp[3])))
-
-                # Hire Date
-                self.table.setItem(row_num, 7, QTableWidgetItem(str(emp[4])))
-
-                # Address
-                self.table.setItem(row_num, 8, QTableWidgetItem(str(emp[7])))
-
+            self.model.reload()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading employees: {str(e)}")
 
     def filter_employees(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            match_found = False
-
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match_found = True
-                    break
-
-            self.table.setRowHidden(row, not match_found)
+        # Filtered in the query, so rows not loaded yet are searched too
+        conditions, params = search_condition(
+            ["e.rfid", "e.nom", "e.prenom", "e.email", "e.telephone", "eq.nom_equipe", "pc.titre_poste"],
+            self.search_input.text()
+        )
+        try:
+            self.model.set_filter(conditions, params)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading employees: {str(e)}")
 
     def add_employee(self):
         dialog = EmployeeDialog(self.db_manager, parent=self)
@@ -321,13 +275,12 @@ class EmployeeViewGUI(QWidget):
             QMessageBox.information(self, "Success", "Employee added successfully")
 
     def edit_employee(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an employee to edit")
             return
 
-        selected_row = selected_rows[0].row()
-        rfid = self.table.item(selected_row, 0).text()
+        rfid = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute('''
@@ -349,14 +302,13 @@ class EmployeeViewGUI(QWidget):
             QMessageBox.critical(self, "Error", f"Error editing employee: {str(e)}")
 
     def delete_employee(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an employee to delete")
             return
 
-        selected_row = selected_rows[0].row()
-        rfid = self.table.item(selected_row, 0).text()
-        name = self.table.item(selected_row, 1).text()
+        rfid = self.model.row_key(row)
+        name = self.model.row_text(row, 1)
 
         reply = QMessageBox.question(
             self, 'Confirm Deletion',
@@ -369,6 +321,7 @@ class EmployeeViewGUI(QWidget):
             try:
                 self.db_manager.cursor.execute("DELETE FROM Employe WHERE rfid = ?", (rfid,))
                 self.db_manager.conn.commit()
+                notify_employee_changed(rfid)
                 self.load_employees()
                 QMessageBox.information(self, "Success", "Employee deleted successfully")
             except Exception as e:
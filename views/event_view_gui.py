@@ -1,11 +1,23 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit,
+    QTableView, QFormLayout, QLineEdit,
     QMessageBox, QDialog, QTextEdit, QComboBox, QHeaderView,
     QDateTimeEdit
 )
 from PyQt6.QtCore import Qt, QDateTime
-from datetime import datetime
+
+from models.date_keys import date_keys
+from views.paged_table_model import KeysetTableModel, search_condition, selected_row
+
+
+def format_event_row(event):
+    # Description (shortened if too long)
+    description = event[3]
+    if description and len(description) > 50:
+        description = description[:47] + "..."
+    employee_name = f"{event[8]} {event[9]}" if event[8] and event[9] else ""
+    return [str(event[0]), event[1], str(event[2]), description, employee_name,
+            str(event[10] or ""), str(event[11] or "")]
 
 
 class EventDialog(QDialog):
@@ -155,36 +167,19 @@ class EventDialog(QDialog):
             # Get date part only for Date table
             date_evenement_date = self.date_input.date().toString("yyyy-MM-dd")
 
-            # Check if date exists in Date table
-            self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?", (date_evenement_date,))
-            date_id = self.db_manager.cursor.fetchone()
-
-            if not date_id:
-                # Insert date into Date table
-                date_obj = datetime.strptime(date_evenement_date, "%Y-%m-%d").date()
-                self.db_manager.cursor.execute('''
-                    INSERT INTO Date (date_complete, jour, mois, annee, jour_semaine, est_jour_ferie, description_jour)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (date_evenement_date, date_obj.day, date_obj.month, date_obj.year,
-                      date_obj.strftime("%A"), 0, ""))
-                self.db_manager.conn.commit()
-
-                # Get the new date_id
-                self.db_manager.cursor.execute("SELECT date_id FROM Date WHERE date_complete = ?",
-                                               (date_evenement_date,))
-                date_id = self.db_manager.cursor.fetchone()
+            date_id = date_keys.resolve(self.db_manager.cursor, date_evenement_date)
 
             if not self.event:  # Add new event
                 self.db_manager.cursor.execute('''
                     INSERT INTO Evenement (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id[0]))
+                ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id))
             else:  # Update existing event
                 self.db_manager.cursor.execute('''
                     UPDATE Evenement
                     SET type_evenement = ?, date_evenement = ?, description = ?, rfid = ?, equipe_id = ?, poste_id = ?, alerte_id = ?, date_id = ?
                     WHERE evenement_id = ?
-                ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id[0],
+                ''', (type_evenement, date_evenement, description, rfid, equipe_id, poste_id, alerte_id, date_id,
                       self.event[0]))
 
             self.db_manager.conn.commit()
@@ -236,15 +231,27 @@ class EventViewGUI(QWidget):
 
         layout.addLayout(header_layout)
 
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Type", "Date", "Description", "Employee", "Team", "Position"
-        ])
+        # Table, newest events first, loaded a page at a time as it scrolls
+        self.model = KeysetTableModel(
+            self.db_manager,
+            columns='''e.evenement_id, e.type_evenement, e.date_evenement, e.description,
+                       e.rfid, e.equipe_id, e.poste_id, e.alerte_id,
+                       emp.nom, emp.prenom, eq.nom_equipe, pc.titre_poste''',
+            source='''Evenement e
+                LEFT JOIN Employe emp ON e.rfid = emp.rfid
+                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
+                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id''',
+            key='e.evenement_id',
+            headers=["ID", "Type", "Date", "Description", "Employee", "Team", "Position"],
+            format_row=format_event_row,
+            descending=True,
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setAlternatingRowColors(True)
 
@@ -274,75 +281,25 @@ class EventViewGUI(QWidget):
 
     def load_events(self):
         try:
-            self.db_manager.cursor.execute('''
-                SELECT e.evenement_id, e.type_evenement, e.date_evenement, e.description, 
-                       e.rfid, e.equipe_id, e.poste_id, e.alerte_id,
-                       emp.nom, emp.prenom, eq.nom_equipe, pc.titre_poste
-                FROM Evenement e
-                LEFT JOIN Employe emp ON e.rfid = emp.rfid
-                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
-                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id
-                ORDER BY e.date_evenement DESC
-            ''')
-            events = self.db_manager.cursor.fetchall()
-
-            self.table.setRowCount(0)  # Clear the table
-
-            for row_num, event in enumerate(events):
-                self.table.insertRow(row_num)
-
-                # ID
-                self.table.setItem(row_num, 0, QTableWidgetItem(str(event[0])))
-
-                # Type
-                self.table.setItem(row_num, 1, QTableWidgetItem(event[1]))
-
-                # Date
-                self.table.setItem(row_num, 2, QTableWidgetItem(str(event[2])))
-
-                # Description (shortened if too long)
-                description = event[3]
-                if description and len(description) > 50:
-                    description = description[:47] + "..."
-                self.table.setItem(row_num, 3, QTableWidgetItem(description))
-
-                # Employee
-                employee_name = f"{event[8]} {event[9]}" if event[8] and event[9] else ""
-                self.table.setItem(row_num, 4, QTableWidgetItem(employee_name))
-
-                # Team
-                self.table.setItem(row_num, 5, QTableWidgetItem(str(event[10] or "")))
-
-                # Position
-                self.table.setItem(row_num, 6, QTableWidgetItem(str(event[11] or "")))
-
+            self.model.reload()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading events: {str(e)}")
 
     def filter_events(self):
-        search_text = self.search_input.text().lower()
+        # Filtered in the query, so rows not loaded yet are searched too
+        conditions, params = search_condition(
+            ["e.type_evenement", "e.description", "emp.nom", "emp.prenom", "eq.nom_equipe", "pc.titre_poste"],
+            self.search_input.text()
+        )
         event_type = self.event_type_filter.currentData()
+        if event_type:
+            conditions.append("e.type_evenement = ?")
+            params.append(event_type)
 
-        for row in range(self.table.rowCount()):
-            match_found = True
-
-            # Check for search text match
-            if search_text:
-                row_match = False
-                for col in range(self.table.columnCount()):
-                    item = self.table.item(row, col)
-                    if item and search_text in item.text().lower():
-                        row_match = True
-                        break
-                match_found = row_match
-
-            # Check for event type match if filter is active
-            if match_found and event_type:
-                type_item = self.table.item(row, 1)
-                if not type_item or type_item.text() != event_type:
-                    match_found = False
-
-            self.table.setRowHidden(row, not match_found)
+        try:
+            self.model.set_filter(conditions, params)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading events: {str(e)}")
 
     def add_event(self):
         dialog = EventDialog(self.db_manager, parent=self)
@@ -351,13 +308,12 @@ class EventViewGUI(QWidget):
             QMessageBox.information(self, "Success", "Event added successfully")
 
     def edit_event(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an event to edit")
             return
 
-        selected_row = selected_rows[0].row()
-        event_id = int(self.table.item(selected_row, 0).text())
+        event_id = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute('''
@@ -379,14 +335,13 @@ class EventViewGUI(QWidget):
             QMessageBox.critical(self, "Error", f"Error editing event: {str(e)}")
 
     def delete_event(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an event to delete")
             return
 
-        selected_row = selected_rows[0].row()
-        event_id = int(self.table.item(selected_row, 0).text())
-        event_type = self.table.item(selected_row, 1).text()
+        event_id = self.model.row_key(row)
+        event_type = self.model.row_text(row, 1)
 
         reply = QMessageBox.question(
             self, 'Confirm Deletion',
@@ -406,13 +361,12 @@ class EventViewGUI(QWidget):
                 QMessageBox.critical(self, "Error", f"Error deleting event: {str(e)}")
 
     def view_event_details(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select an event to view details")
             return
 
-        selected_row = selected_rows[0].row()
-        event_id = int(self.table.item(selected_row, 0).text())
+        event_id = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute('''
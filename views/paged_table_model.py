@@ -0,0 +1,128 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from models.storage import backend
+
+# Rows per query; the view asks for the next page as it scrolls near the end
+PAGE_SIZE = 200
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """Read-only table model that loads its rows a page at a time.
+
+    Pages are keyset queries (``WHERE key > last key ORDER BY key``), so
+    each one costs the same however far the user has scrolled, and the
+    tab opens after a single page. Only the fetched rows are kept, as
+    tuples of display strings; no per-cell Qt objects are created.
+
+    ``columns`` and ``source`` are the SELECT list and FROM clause. The
+    first selected column must be ``key``, a unique, non-null column.
+    ``format_row`` turns a database row into the displayed values.
+    """
+
+    def __init__(self, db_manager, columns, source, key, headers, format_row,
+                 descending=False, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.columns = columns
+        self.source = source
+        self.key = key
+        self.headers = headers
+        self.format_row = format_row
+        self.descending = descending
+        self.page_size = page_size
+
+        # Extra WHERE conditions and their parameters, from set_filter
+        self._conditions = []
+        self._params = []
+        # (key value, display values) per loaded row
+        self._rows = []
+        self._exhausted = False
+
+    def set_filter(self, conditions, params):
+        self._conditions = list(conditions)
+        self._params = list(params)
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def _page_query(self):
+        conditions = list(self._conditions)
+        params = list(self._params)
+        if self._rows:
+            conditions.append(f"{self.key} {'<' if self.descending else '>'} ?")
+            params.append(self._rows[-1][0])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = f'''
+            SELECT {backend.top_clause} {self.columns}
+            FROM {self.source}
+            {where}
+            ORDER BY {self.key} {'DESC' if self.descending else 'ASC'}
+            {backend.limit_clause}
+        '''
+        params = [self.page_size] + params if backend.top_clause else params + [self.page_size]
+        return query, params
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent):
+        if parent.isValid() or self._exhausted:
+            return
+        query, params = self._page_query()
+        # Own cursor, the dialogs share db_manager.cursor
+        cursor = self.db_manager.conn.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        self._exhausted = len(rows) < self.page_size
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend((row[0], tuple(self.format_row(row))) for row in rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        return self._rows[index.row()][1][index.column()]
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return None
+
+    def row_key(self, row):
+        return self._rows[row][0]
+
+    def row_text(self, row, column):
+        return self._rows[row][1][column]
+
+
+def search_condition(expressions, text):
+    # One LIKE per searched column, any of them may match
+    if not text:
+        return [], []
+    condition = "(" + " OR ".join(f"{expression} LIKE ?" for expression in expressions) + ")"
+    return [condition], [f"%{text}%"] * len(expressions)
+
+
+def selected_row(table):
+    # First selected row of a QTableView, or None
+    rows = table.selectionModel().selectedRows()
+    return rows[0].row() if rows else None
@@ -1,10 +1,12 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit,
+    QTableView, QFormLayout, QLineEdit,
     QMessageBox, QDialog, QTextEdit, QComboBox, QHeaderView
 )
 from PyQt6.QtCore import Qt
 
+from views.paged_table_model import KeysetTableModel, search_condition, selected_row
+
 
 class PositionDialog(QDialog):
     def __init__(self, db_manager, position=None, parent=None):
@@ -122,15 +124,21 @@ class PositionViewGUI(QWidget):
 
         layout.addLayout(header_layout)
 
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Position Title", "Competence Level", "Description", "Requirements"
-        ])
+        # Table, loaded a page at a time as it scrolls
+        self.model = KeysetTableModel(
+            self.db_manager,
+            columns="poste_id, titre_poste, niveau_competence, description, requirements",
+            source="Poste_Competence",
+            key="poste_id",
+            headers=["ID", "Position Title", "Competence Level", "Description", "Requirements"],
+            format_row=lambda pos: [str(pos[0]), pos[1], pos[2] or "", pos[3] or "", pos[4] or ""],
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setAlternatingRowColors(True)
 
@@ -160,44 +168,19 @@ class PositionViewGUI(QWidget):
 
     def load_positions(self):
         try:
-            self.db_manager.cursor.execute('SELECT * FROM Poste_Competence')
-            positions = self.db_manager.cursor.fetchall()
-
-            self.table.setRowCount(0)  # Clear the table
-
-            for row_num, pos in enumerate(positions):
-                self.table.insertRow(row_num)
-
-                # ID
-                self.table.setItem(row_num, 0, QTableWidgetItem(str(pos[0])))
-
-                # Position Title
-                self.table.setItem(row_num, 1, QTableWidgetItem(pos[1]))
-
-                # Competence Level
-                self.table.setItem(row_num, 2, QTableWidgetItem(pos[2] or ""))
-
-                # Description
-                self.table.setItem(row_num, 3, QTableWidgetItem(pos[3] or ""))
-
-                # Requirements
-                self.table.setItem(row_num, 4, QTableWidgetItem(pos[4] or ""))
-
+            self.model.reload()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading positions: {str(e)}")
 
     def filter_positions(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            match_found = False
-
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match_found = True
-                    break
-
-            self.table.setRowHidden(row, not match_found)
+        # Filtered in the query, so rows not loaded yet are searched too
+        conditions, params = search_condition(
+            ["titre_poste", "niveau_competence", "description", "requirements"], self.search_input.text()
+        )
+        try:
+            self.model.set_filter(conditions, params)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading positions: {str(e)}")
 
     def add_position(self):
         dialog = PositionDialog(self.db_manager, parent=self)
@@ -206,13 +189,12 @@ class PositionViewGUI(QWidget):
             QMessageBox.information(self, "Success", "Position added successfully")
 
     def edit_position(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a position to edit")
             return
 
-        selected_row = selected_rows[0].row()
-        position_id = int(self.table.item(selected_row, 0).text())
+        position_id = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute("SELECT * FROM Poste_Competence WHERE poste_id = ?", (position_id,))
@@ -229,14 +211,13 @@ class PositionViewGUI(QWidget):
             QMessageBox.critical(self, "Error", f"Error editing position: {str(e)}")
 
     def delete_position(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a position to delete")
             return
 
-        selected_row = selected_rows[0].row()
-        position_id = int(self.table.item(selected_row, 0).text())
-        position_title = self.table.item(selected_row, 1).text()
+        position_id = self.model.row_key(row)
+        position_title = self.model.row_text(row, 1)
 
         # Check if the position has employees
         try:
@@ -271,26 +252,26 @@ class PositionViewGUI(QWidget):
                 QMessageBox.critical(self, "Error", f"Error deleting position: {str(e)}")
 
     def view_position_employees(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a position to view employees")
             return
 
-        selected_row = selected_rows[0].row()
-        position_id = int(self.table.item(selected_row, 0).text())
-        position_title = self.table.item(selected_row, 1).text()
+        position_id = self.model.row_key(row)
+        position_title = self.model.row_text(row, 1)
 
         try:
-            self.db_manager.cursor.execute('''
-                SELECT e.rfid, e.nom, e.prenom, eq.nom_equipe
-                FROM Employe e
-                LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id
-                WHERE e.poste_id = ?
-            ''', (position_id,))
-
-            employees = self.db_manager.cursor.fetchall()
-
-            if not employees:
+            employees = KeysetTableModel(
+                self.db_manager,
+                columns="e.rfid, e.nom, e.prenom, eq.nom_equipe",
+                source="Employe e LEFT JOIN Equipe eq ON e.equipe_id = eq.equipe_id",
+                key="e.rfid",
+                headers=["RFID", "Last Name", "First Name", "Team"],
+                format_row=lambda emp: [str(emp[0]), str(emp[1]), str(emp[2]), str(emp[3] or "")]
+            )
+            employees.set_filter(["e.poste_id = ?"], [position_id])
+
+            if employees.rowCount() == 0:
                 QMessageBox.information(self, "Position Employees", f"Position {position_title} has no employees")
                 return
 
@@ -302,20 +283,11 @@ class PositionViewGUI(QWidget):
             layout = QVBoxLayout(dialog)
 
             # Create table for employees
-            employee_table = QTableWidget()
-            employee_table.setColumnCount(4)
-            employee_table.setHorizontalHeaderLabels(["RFID", "Last Name", "First Name", "Team"])
+            employee_table = QTableView()
+            employee_table.setModel(employees)
             employee_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
             employee_table.setAlternatingRowColors(True)
 
-            # Populate table
-            for row_num, emp in enumerate(employees):
-                employee_table.insertRow(row_num)
-                employee_table.setItem(row_num, 0, QTableWidgetItem(str(emp[0])))
-                employee_table.setItem(row_num, 1, QTableWidgetItem(str(emp[1])))
-                employee_table.setItem(row_num, 2, QTableWidgetItem(str(emp[2])))
-                employee_table.setItem(row_num, 3, QTableWidgetItem(str(emp[3] or "")))
-
             layout.addWidget(employee_table)
 
             # Close button
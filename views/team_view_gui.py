@@ -1,10 +1,12 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QTableWidget, QTableWidgetItem, QFormLayout, QLineEdit,
+    QTableView, QFormLayout, QLineEdit,
     QMessageBox, QDialog, QTextEdit, QHeaderView
 )
 from PyQt6.QtCore import Qt
 
+from views.paged_table_model import KeysetTableModel, search_condition, selected_row
+
 
 class TeamDialog(QDialog):
     def __init__(self, db_manager, team=None, parent=None):
@@ -111,15 +113,21 @@ class TeamViewGUI(QWidget):
 
         layout.addLayout(header_layout)
 
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels([
-            "ID", "Team Name", "Team Leader", "Description"
-        ])
+        # Table, loaded a page at a time as it scrolls
+        self.model = KeysetTableModel(
+            self.db_manager,
+            columns="equipe_id, nom_equipe, chef_equipe, description",
+            source="Equipe",
+            key="equipe_id",
+            headers=["ID", "Team Name", "Team Leader", "Description"],
+            format_row=lambda team: [str(team[0]), team[1], team[2] or "", team[3] or ""],
+            parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
 
         # Set table properties
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setAlternatingRowColors(True)
 
@@ -149,41 +157,17 @@ class TeamViewGUI(QWidget):
 
     def load_teams(self):
         try:
-            self.db_manager.cursor.execute('SELECT * FROM Equipe')
-            teams = self.db_manager.cursor.fetchall()
-
-            self.table.setRowCount(0)  # Clear the table
-
-            for row_num, team in enumerate(teams):
-                self.table.insertRow(row_num)
-
-                # ID
-                self.table.setItem(row_num, 0, QTableWidgetItem(str(team[0])))
-
-                # Team Name
-                self.table.setItem(row_num, 1, QTableWidgetItem(team[1]))
-
-                # Team Leader
-                self.table.setItem(row_num, 2, QTableWidgetItem(team[3] or ""))
-
-                # Description
-                self.table.setItem(row_num, 3, QTableWidgetItem(team[2] or ""))
-
+            self.model.reload()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error loading teams: {str(e)}")
 
     def filter_teams(self):
-        search_text = self.search_input.text().lower()
-        for row in range(self.table.rowCount()):
-            match_found = False
-
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item and search_text in item.text().lower():
-                    match_found = True
-                    break
-
-            self.table.setRowHidden(row, not match_found)
+        # Filtered in the query, so rows not loaded yet are searched too
+        conditions, params = search_condition(["nom_equipe", "chef_equipe", "description"], self.search_input.text())
+        try:
+            self.model.set_filter(conditions, params)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Error loading teams: {str(e)}")
 
     def add_team(self):
         dialog = TeamDialog(self.db_manager, parent=self)
@@ -192,13 +176,12 @@ class TeamViewGUI(QWidget):
             QMessageBox.information(self, "Success", "Team added successfully")
 
     def edit_team(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a team to edit")
             return
 
-        selected_row = selected_rows[0].row()
-        team_id = int(self.table.item(selected_row, 0).text())
+        team_id = self.model.row_key(row)
 
         try:
             self.db_manager.cursor.execute("SELECT * FROM Equipe WHERE equipe_id = ?", (team_id,))
@@ -215,14 +198,13 @@ class TeamViewGUI(QWidget):
             QMessageBox.critical(self, "Error", f"Error editing team: {str(e)}")
 
     def delete_team(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a team to delete")
             return
 
-        selected_row = selected_rows[0].row()
-        team_id = int(self.table.item(selected_row, 0).text())
-        team_name = self.table.item(selected_row, 1).text()
+        team_id = self.model.row_key(row)
+        team_name = self.model.row_text(row, 1)
 
         # Check if the team has employees
         try:
@@ -260,26 +242,26 @@ class TeamViewGUI(QWidget):
                 QMessageBox.critical(self, "Error", f"Error deleting team: {str(e)}")
 
     def view_team_members(self):
-        selected_rows = self.table.selectedItems()
-        if not selected_rows:
+        row = selected_row(self.table)
+        if row is None:
             QMessageBox.warning(self, "Selection Required", "Please select a team to view members")
             return
 
-        selected_row = selected_rows[0].row()
-        team_id = int(self.table.item(selected_row, 0).text())
-        team_name = self.table.item(selected_row, 1).text()
+        team_id = self.model.row_key(row)
+        team_name = self.model.row_text(row, 1)
 
         try:
-            self.db_manager.cursor.execute('''
-                SELECT e.rfid, e.nom, e.prenom, pc.titre_poste
-                FROM Employe e
-                LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id
-                WHERE e.equipe_id = ?
-            ''', (team_id,))
-
-            employees = self.db_manager.cursor.fetchall()
-
-            if not employees:
+            members = KeysetTableModel(
+                self.db_manager,
+                columns="e.rfid, e.nom, e.prenom, pc.titre_poste",
+                source="Employe e LEFT JOIN Poste_Competence pc ON e.poste_id = pc.poste_id",
+                key="e.rfid",
+                headers=["RFID", "Last Name", "First Name", "Position"],
+                format_row=lambda emp: [str(emp[0]), str(emp[1]), str(emp[2]), str(emp[3] or "")]
+            )
+            members.set_filter(["e.equipe_id = ?"], [team_id])
+
+            if members.rowCount() == 0:
                 QMessageBox.information(self, "Team Members", f"Team {team_name} has no members")
                 return
 
@@ -291,20 +273,11 @@ class TeamViewGUI(QWidget):
             layout = QVBoxLayout(dialog)
 
             # Create table for members
-            member_table = QTableWidget()
-            member_table.setColumnCount(4)
-            member_table.setHorizontalHeaderLabels(["RFID", "Last Name", "First Name", "Position"])
+            member_table = QTableView()
+            member_table.setModel(members)
             member_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
             member_table.setAlternatingRowColors(True)
 
-            # Populate table
-            for row_num, emp in enumerate(employees):
-                member_table.insertRow(row_num)
-                member_table.setItem(row_num, 0, QTableWidgetItem(str(emp[0])))
-                member_table.setItem(row_num, 1, QTableWidgetItem(str(emp[1])))
-                member_table.setItem(row_num, 2, QTableWidgetItem(str(emp[2])))
-                member_table.setItem(row_num, 3, QTableWidgetItem(str(emp[3] or "")))
-
             layout.addWidget(member_table)
 
             # Close button